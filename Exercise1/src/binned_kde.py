@@ -0,0 +1,160 @@
+"""
+Module for Gaussian kernel density estimation of many groups at once by binning
+the values of all groups onto grids and convolving them with the kernel by FFT
+"""
+import numpy as np
+
+# Minimum and maximum number of grid points the densities are computed on
+# before they are interpolated onto the requested evaluation points
+GRID_SIZE = 1024
+MAX_GRID_SIZE = 16384
+
+# Grid points per bandwidth that are needed to resolve the kernel
+POINTS_PER_BANDWIDTH = 4
+
+# Number of bandwidths the computation grid extends beyond the data, so that
+# the kernel mass of the outermost values does not wrap around in the FFT
+KERNEL_SUPPORT = 4
+
+
+def group_moments(values, codes, n_groups):
+    """Function to compute count, mean, standard deviation, min and max per group"""
+    counts = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    sums = np.bincount(codes, weights=values, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        squares = np.bincount(
+            codes, weights=(values - means[codes]) ** 2, minlength=n_groups
+        )
+        stds = np.sqrt(squares / (counts - 1))
+
+    minima = np.full(n_groups, np.inf)
+    maxima = np.full(n_groups, -np.inf)
+    np.minimum.at(minima, codes, values)
+    np.maximum.at(maxima, codes, values)
+    return counts, stds, minima, maxima
+
+
+def select_bandwidths(bandwidth, counts, stds):
+    """
+    Function to get the bandwidth of every group, either a fixed bandwidth or
+    one selected by Scott's or Silverman's rule (as in scipy's gaussian_kde,
+    which seaborn's kdeplot uses)
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if bandwidth == "scott":
+            return stds * counts ** (-1 / 5)
+        if bandwidth == "silverman":
+            return stds * (counts * 3 / 4) ** (-1 / 5)
+    return np.full(len(counts), float(bandwidth))
+
+
+def linear_binning(values, codes, positions, n_groups, grid_size):
+    """
+    Function to distribute every value onto its two neighbouring grid points of
+    its group's grid, weighted by the distance to them
+    """
+    lower = np.clip(np.floor(positions).astype(np.int64), 0, grid_size - 2)
+    weight = np.clip(positions - lower, 0, 1)
+    flat = codes * grid_size + lower
+    size = n_groups * grid_size
+    bins = np.bincount(flat, weights=1 - weight, minlength=size)
+    bins += np.bincount(flat + 1, weights=weight, minlength=size)
+    return bins.reshape(n_groups, grid_size)
+
+
+def fft_convolve_gaussian(bins, spacings, bandwidths):
+    """
+    Function to convolve the binned counts of all groups with Gaussian kernels
+    of the groups' bandwidths in one batched FFT, using the Fourier transform
+    of the Gaussian instead of a sampled kernel
+    """
+    n_groups, grid_size = bins.shape
+    padded_size = 2 * grid_size  # Zero padding prevents circular convolution
+    frequencies = np.fft.rfftfreq(padded_size)[None, :] / spacings[:, None]
+    kernel = np.exp(-2 * (np.pi * frequencies * bandwidths[:, None]) ** 2)
+    transformed = np.fft.rfft(bins, n=padded_size, axis=1) * kernel
+    return np.fft.irfft(transformed, n=padded_size, axis=1)[:, :grid_size]
+
+
+def shared_grid_size(extents, bandwidths):
+    """
+    Function to choose one number of grid points for all groups that resolves
+    the kernel of every group, as a power of two between GRID_SIZE and
+    MAX_GRID_SIZE
+    """
+    if len(extents) == 0:
+        return GRID_SIZE
+    needed = np.max(extents / bandwidths) * POINTS_PER_BANDWIDTH
+    return int(np.clip(2 ** np.ceil(np.log2(needed)), GRID_SIZE, MAX_GRID_SIZE))
+
+
+def binned_kde(values, codes, n_groups, bandwidth="scott", cut=3, points=200):
+    """
+    Function to estimate the Gaussian KDE of every group of values, where codes
+    holds the group number of every value. The density of each group is
+    evaluated at equidistant points from cut bandwidths below its
+    minimum to cut bandwidths above its maximum. Returns the evaluation points,
+    the densities (one row per group) and the bandwidths. Groups without a
+    valid bandwidth (e.g. without variance for a selected bandwidth) have NaN
+    densities.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.asarray(codes, dtype=np.int64)
+    valid = ~np.isnan(values)
+    values, codes = values[valid], codes[valid]
+
+    counts, stds, minima, maxima = group_moments(values, codes, n_groups)
+    bandwidths = select_bandwidths(bandwidth, counts, stds)
+    usable = (counts > 0) & np.isfinite(bandwidths) & (bandwidths > 0)
+    bandwidths = np.where(usable, bandwidths, 1.0)
+    minima = np.where(usable, minima, 0.0)
+    maxima = np.where(usable, maxima, 0.0)
+
+    # Compute on grids that contain the kernel support of all values
+    support = max(cut, KERNEL_SUPPORT) * bandwidths
+    grid_start = minima - support
+    extents = maxima - minima + 2 * support
+    grid_size = shared_grid_size(extents[usable], bandwidths[usable])
+    spacings = extents / (grid_size - 1)
+    positions = (values - grid_start[codes]) / spacings[codes]
+    bins = linear_binning(values, codes, positions, n_groups, grid_size)
+    density = fft_convolve_gaussian(bins, spacings, bandwidths)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        density /= (counts * spacings)[:, None]
+
+    # Interpolate linearly onto the evaluation points of every group
+    steps = np.linspace(0, 1, points)[None, :]
+    grid = (minima - cut * bandwidths)[:, None] + steps * (
+        maxima - minima + 2 * cut * bandwidths
+    )[:, None]
+    grid_positions = (grid - grid_start[:, None]) / spacings[:, None]
+    lower = np.clip(np.floor(grid_positions).astype(np.int64), 0, grid_size - 2)
+    weight = grid_positions - lower
+    evaluated = np.take_along_axis(density, lower, axis=1) * (1 - weight)
+    evaluated += np.take_along_axis(density, lower + 1, axis=1) * weight
+
+    # Rounding errors of the FFT can leave tiny negative densities
+    evaluated = np.maximum(evaluated, 0)
+    evaluated[~usable] = np.nan
+    grid[~usable] = np.nan
+    return grid, evaluated, np.where(usable, bandwidths, np.nan)
+
+
+def group_kdes(df, keys, metric, bandwidth="scott", cut=3, points=200):
+    """
+    Function to estimate the KDEs of a metric for all groups of a DataFrame in
+    one batched computation. Returns the group keys and the evaluation points,
+    densities and bandwidths with one row per group.
+    """
+    grouper = df.groupby(keys, sort=True, observed=True)
+    groups = grouper.size().index
+    grid, density, bandwidths = binned_kde(
+        df[metric].to_numpy(dtype=np.float64),
+        grouper.ngroup().to_numpy(),
+        len(groups),
+        bandwidth=bandwidth,
+        cut=cut,
+        points=points,
+    )
+    return groups, grid, density, bandwidths
@@ -1,17 +1,32 @@
-"""The math module is used to calculate the greatest common divisor."""
-import math
-
+"""
+This module calculates the expected distinct read efficiencies of block sizes
+that are not aligned with the storage block size of the underlying system
+"""
 import matplotlib.pyplot as plt
+import numpy as np
 
 
-def count_read_blocks(number, start, end):
+def distinct_read_efficiencies(block_sizes, storage_block_sizes):
     """
-    This function calculates to be expected read accesses when reading
-    from start to end and the number as the underlying system storage block size
+    This function calculates the to be expected efficiencies (distinct storage
+    blocks read / storage blocks read) when reading consecutive blocks of every
+    block size until the read position realigns with the storage blocks, for
+    all pairs of block sizes and storage block sizes at once (one row per
+    storage block size).
+
+    The reads realign after lcm(b, s) elements, i.e. after s / g blocks with
+    g = gcd(b, s), which span b / g distinct storage blocks. With b = q * s + r
+    every block touches q + 1 storage blocks, plus one more if its offset in
+    the storage block is above s - r. The offsets of the s / g blocks are the
+    multiples of g below s, r / g - 1 of them are above s - r (r = 0 touches
+    q storage blocks once).
     """
-    first_multiple = (start // number) * number
-    last_multiple = (end // number) * number
-    return ((last_multiple - first_multiple) // number) + 1
+    block_sizes = np.asarray(block_sizes, dtype=np.int64)[None, :]
+    storage_block_sizes = np.asarray(storage_block_sizes, dtype=np.int64)[:, None]
+    gcds = np.gcd(block_sizes, storage_block_sizes)
+    quotients, remainders = np.divmod(block_sizes, storage_block_sizes)
+    reads = (storage_block_sizes // gcds) * (quotients + 1) + remainders // gcds - 1
+    return (block_sizes // gcds) / reads
 
 
 def calculate_performances(a, b, storage_block_size):
@@ -23,26 +38,9 @@ def calculate_performances(a, b, storage_block_size):
     storage block size for later analysis of gcd efficiency in relation to expected
     read efficiency.
     """
-    performances = []
-    gcd_values = []
-
-    block_sizes = range(a, b + 1)
-
-    for block_size in block_sizes:
-        index = 0
-        reads = 0
-        while index % storage_block_size != 0 or reads == 0:
-            reads += count_read_blocks(
-                storage_block_size, index, index + block_size - 1
-            )
-            index += block_size
-        storage_blocks_read = index // storage_block_size
-        performance = storage_blocks_read / reads
-        performances.append(performance)
-
-        gcd_value = math.gcd(block_size, storage_block_size) / storage_block_size
-        gcd_values.append(gcd_value)
-
+    block_sizes = np.arange(a, b + 1)
+    performances = distinct_read_efficiencies(block_sizes, [storage_block_size])[0]
+    gcd_values = np.gcd(block_sizes, storage_block_size) / storage_block_size
     return block_sizes, performances, gcd_values
 
 
@@ -50,12 +48,24 @@ SIZE_STORAGE_BLOCK = 4096
 A = 1
 B = 5 * SIZE_STORAGE_BLOCK
 
+# Storage block sizes of the device classes: sectors, pages, large blocks and
+# huge pages
+STORAGE_BLOCK_SIZES = [512, 4096, 65536, 2097152]
+
 sizes_blocks, efficiencies, gcds = calculate_performances(A, B, SIZE_STORAGE_BLOCK)
+sweep_efficiencies = distinct_read_efficiencies(sizes_blocks, STORAGE_BLOCK_SIZES)
 
 with open("../res/distinct_read_efficiencies.txt", "w", encoding="utf8") as file:
     for blocksize, efficiency in zip(sizes_blocks, efficiencies):
         file.write(f"{blocksize}, {efficiency}\n")
 
+with open(
+    "../res/distinct_read_efficiencies_storage_blocks.txt", "w", encoding="utf8"
+) as file:
+    file.write(", ".join(["Block_Size"] + list(map(str, STORAGE_BLOCK_SIZES))) + "\n")
+    for blocksize, efficiency in zip(sizes_blocks, sweep_efficiencies.T):
+        file.write(", ".join([str(blocksize)] + list(map(str, efficiency))) + "\n")
+
 plt.plot(sizes_blocks, efficiencies, label="Distinct Read Efficiency")
 plt.xlabel("Block Size")
 plt.ylabel("Distinct Read Efficiency")
@@ -96,3 +106,24 @@ plt.savefig(
     "../vis_gcd_block_size_multiples/gcd_vs_io_performance_analysis.pdf",
     format="pdf",
 )
+plt.close()
+
+for storage_block_size, storage_efficiencies in zip(
+    STORAGE_BLOCK_SIZES, sweep_efficiencies
+):
+    plt.plot(
+        sizes_blocks,
+        storage_efficiencies,
+        label=f"Storage Block Size {storage_block_size}",
+    )
+plt.xlabel("Block Size")
+plt.ylabel("Distinct Read Efficiency")
+plt.title("Distinct Read Efficiency vs. Block Size per Storage Block Size")
+plt.xscale("log")
+plt.legend()
+plt.grid(True)
+plt.savefig(
+    "../vis_gcd_block_size_multiples/storage_blocks_io_performance_analysis.pdf",
+    format="pdf",
+)
+plt.close()
@@ -0,0 +1,360 @@
+"""
+Module for running experiment campaigns of the External Memory Merge Sort
+binary. An experiment matrix file replaces the hard-coded loops of
+perform_analysis in main.c: every cell of the matrix runs the binary once as a
+subprocess in a private temporary directory, pinned to its own core, and its
+result line is appended to the results file. Completed cells are recorded, so
+an interrupted campaign resumes where it stopped.
+"""
+import concurrent.futures
+import itertools
+import json
+import os
+import queue
+import sys
+import tempfile
+import time
+
+import input_generator
+import resource_accounting
+import results_loader
+
+MATRIX_PATH = "experiment_matrix.json"
+
+# Settings of the matrix file that can be left out
+MATRIX_DEFAULTS = {
+    "binary": "../bin/main.out",
+    "results_path": "../res/results.txt",
+    "trace_path": "../res/trace.jsonl",
+    "accounting_path": resource_accounting.ACCOUNTING_PATH,
+    "temp_dir": None,
+    "input_cache_dir": input_generator.CACHE_DIR,
+    "distributions": ["rand"],
+    "workers": 1,
+    "pin_cpus": True,
+    "runs_on_file": 1,
+    "max_classical": 10000000,
+    "timeout": None,
+}
+
+# Parameters of a cell, in the nesting order of the loops of perform_analysis
+CELL_KEYS = [
+    "Sort_Option",
+    "Distribution",
+    "File_Seed",
+    "Input_Size",
+    "Block_Size",
+    "Run",
+]
+
+# Inputs generated by the binary itself with rand(), as in perform_analysis
+RAND_DISTRIBUTION = "rand"
+
+# Header line as printed by perform_analysis
+HEADER = (
+    " ".join(
+        f"{column:>15}"
+        for column in [
+            "File_Seed",
+            "Input_Size",
+            "Block_Size",
+            "Input_MB",
+            "Block_MB",
+            "Elapsed_Wall",
+            "Elapsed_CPU",
+            "Classical_Wall",
+            "Classical_CPU",
+            "Merge_Rounds",
+            "Classical_Rounds",
+            "Sort_Option",
+        ]
+    )
+    + f" {'Host_Name':>25}\n\n"
+)
+
+
+def load_matrix(matrix_path):
+    """Function to read an experiment matrix file and fill in the defaults"""
+    with open(matrix_path, encoding="utf8") as f:
+        matrix = MATRIX_DEFAULTS | json.load(f)
+    for key in ["sort_options", "file_seeds", "input_sizes", "block_sizes"]:
+        if not matrix.get(key):
+            raise ValueError(f"The experiment matrix needs a non-empty '{key}'")
+    for distribution in matrix["distributions"]:
+        if distribution not in input_generator.DISTRIBUTIONS + [RAND_DISTRIBUTION]:
+            raise ValueError(f"Unknown distribution '{distribution}'")
+    return matrix
+
+
+def experiment_cells(matrix):
+    """Function to list all cells of the matrix in the order of perform_analysis"""
+    return [
+        dict(zip(CELL_KEYS, values))
+        for values in itertools.product(
+            matrix["sort_options"],
+            matrix["distributions"],
+            matrix["file_seeds"],
+            matrix["input_sizes"],
+            matrix["block_sizes"],
+            range(matrix["runs_on_file"]),
+        )
+    ]
+
+
+def cell_key(cell):
+    """Function to get the key of a cell that identifies it across runs"""
+    return ",".join(str(cell[key]) for key in CELL_KEYS)
+
+
+def ledger_path(matrix_path):
+    """Function to get the path of the record of completed cells of a matrix"""
+    return matrix_path + ".done"
+
+
+def cell_results_path(matrix, cell, key="results_path"):
+    """
+    Function to get the results (or trace) file of a cell. The paths of the
+    matrix may contain {distribution} to write every distribution to its own
+    file.
+    """
+    return matrix[key].format(distribution=cell["Distribution"])
+
+
+def read_ledger(path):
+    """
+    Function to read the records of the cells of a matrix run so far, without
+    a last record that is still (or was only partially) written
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf8") as f:
+        return [json.loads(line) for line in f if line.endswith("\n") and line.strip()]
+
+
+def completed_cells(path):
+    """Function to read the keys of the successfully completed cells"""
+    return {record["Key"] for record in read_ledger(path) if record["Status"] == "ok"}
+
+
+def available_cpus():
+    """Function to get the cores this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+def run_binary(cell, matrix, cpu):
+    """
+    Function to run the binary for one cell in a private temporary directory,
+    pinned to the core cpu (if not None). Returns the record of the cell with
+    the result line printed by the binary, its trace and the OS-level
+    accounting of the process.
+    """
+    with tempfile.TemporaryDirectory(
+        prefix="external_merge_sort_", dir=matrix["temp_dir"]
+    ) as bin_dir:
+        generate_input = cell["Distribution"] == RAND_DISTRIBUTION
+        if not generate_input:
+            input_generator.copy_input(
+                cell["Distribution"],
+                cell["File_Seed"],
+                cell["Input_Size"],
+                os.path.join(bin_dir, "input.bin"),
+                matrix["input_cache_dir"],
+            )
+        command = [
+            matrix["binary"],
+            str(cell["File_Seed"]),
+            str(cell["Input_Size"]),
+            str(cell["Block_Size"]),
+            str(cell["Sort_Option"]),
+            str(matrix["max_classical"]),
+            bin_dir,
+            str(int(generate_input)),
+        ]
+        start = time.perf_counter()
+        stdout_path = os.path.join(bin_dir, "stdout.txt")
+        stderr_path = os.path.join(bin_dir, "stderr.txt")
+        with open(stdout_path, "w", encoding="utf8") as out, open(
+            stderr_path, "w", encoding="utf8"
+        ) as err:
+            return_code, accounting = resource_accounting.run_accounted(
+                command, out, err, cpu, matrix["timeout"]
+            )
+        duration = time.perf_counter() - start
+        with open(stdout_path, encoding="utf8") as out, open(
+            stderr_path, encoding="utf8"
+        ) as err:
+            stdout, stderr = out.read(), err.read()
+        trace_lines = []
+        if os.path.exists(os.path.join(bin_dir, "trace.jsonl")):
+            with open(os.path.join(bin_dir, "trace.jsonl"), encoding="utf8") as f:
+                trace_lines = [
+                    json.dumps(
+                        json.loads(line) | {"Distribution": cell["Distribution"]}
+                    )
+                    for line in f
+                    if line.strip()
+                ]
+
+    lines = [line for line in stdout.splitlines() if results_loader.is_data_line(line)]
+    ok = return_code == 0 and len(lines) > 0
+    return {
+        "Key": cell_key(cell),
+        **cell,
+        "Status": "ok" if ok else "failed",
+        "Return_Code": return_code,
+        "CPU": cpu,
+        "Duration": duration,
+        "Line": lines[-1] if ok else None,
+        "Trace": trace_lines if ok else None,
+        "Accounting": accounting,
+        "Error": None if ok else (stderr or stdout)[-1000:],
+    }
+
+
+def run_cell(cell, matrix, cpus):
+    """
+    Function to run the binary for one cell on a core taken from the queue
+    cpus. A cell whose run raises an error (e.g. a missing binary or input
+    file) is recorded as failed, so the other cells keep running.
+    """
+    cpu = cpus.get()
+    start = time.perf_counter()
+    try:
+        return run_binary(cell, matrix, cpu)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        return {
+            "Key": cell_key(cell),
+            **cell,
+            "Status": "failed",
+            "Return_Code": None,
+            "CPU": cpu,
+            "Duration": time.perf_counter() - start,
+            "Line": None,
+            "Trace": None,
+            "Accounting": None,
+            "Error": repr(error)[-1000:],
+        }
+    finally:
+        cpus.put(cpu)
+
+
+def accounting_line(record):
+    """
+    Function to get the JSON line of the accounting of a cell, next to the
+    columns of its result line
+    """
+    result = results_loader.parse_lines([record["Line"]]).iloc[0].to_dict()
+    line = {key: record[key] for key in CELL_KEYS} | result | record["Accounting"]
+    return json.dumps(line, default=lambda value: value.item())
+
+
+def append_lines(path, lines, header=None, missing_only=False):
+    """
+    Function to append lines to a file, after the header if the file is new.
+    With missing_only, the lines the file holds already are skipped.
+    """
+    new = not os.path.exists(path)
+    if missing_only and not new:
+        with open(path, encoding="utf8") as f:
+            existing = set(f.read().splitlines())
+        lines = [line for line in lines if line not in existing]
+    with open(path, "a", encoding="utf8") as f:
+        if new and header:
+            f.write(header)
+        f.writelines(line + "\n" for line in lines)
+
+
+def write_record(matrix, record, missing_only=False):
+    """
+    Function to append the result line, the trace and the accounting of a
+    successfully completed cell to their files
+    """
+    append_lines(
+        cell_results_path(matrix, record),
+        [record["Line"]],
+        HEADER,
+        missing_only,
+    )
+    append_lines(
+        cell_results_path(matrix, record, "trace_path"),
+        record["Trace"],
+        missing_only=missing_only,
+    )
+    append_lines(
+        cell_results_path(matrix, record, "accounting_path"),
+        [accounting_line(record)],
+        missing_only=missing_only,
+    )
+
+
+def recover_ledger(matrix, path):
+    """
+    Function to repair the files of a campaign that was interrupted while
+    recording a cell. A cell is recorded before its lines are written, so
+    a partially written last record is dropped (the cell runs again), and the
+    lines of the last complete record are written where they are missing.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    records = read_ledger(path)
+    if records and records[-1]["Status"] == "ok":
+        write_record(matrix, records[-1], missing_only=True)
+
+
+def run_experiments(matrix_path=MATRIX_PATH, workers=None):
+    """
+    Function to run all cells of an experiment matrix that did not complete
+    yet, with workers concurrent runs (from the matrix file if None). Every
+    finished cell is appended to the record of cells of the matrix file and
+    then to its results file (in the format of main.c, to be read with
+    results_loader).
+    Returns the number of completed and failed cells.
+    """
+    matrix = load_matrix(matrix_path)
+    cells = experiment_cells(matrix)
+    recover_ledger(matrix, ledger_path(matrix_path))
+    done = completed_cells(ledger_path(matrix_path))
+    pending = [cell for cell in cells if cell_key(cell) not in done]
+    print(f"{len(cells) - len(pending)} of {len(cells)} cells already completed")
+
+    if workers is None:
+        workers = matrix["workers"]
+    cpus = queue.Queue()
+    pinned = (
+        available_cpus()
+        if matrix["pin_cpus"] and hasattr(os, "sched_setaffinity")
+        else []
+    )
+    if pinned and workers > len(pinned):
+        raise ValueError(f"Cannot pin {workers} workers to {len(pinned)} cores")
+    for worker in range(workers):
+        cpus.put(pinned[worker] if pinned else None)
+
+    counts = {"ok": 0, "failed": 0}
+    # The workers only wait for their subprocess, so threads are sufficient
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_cell, cell, matrix, cpus) for cell in pending]
+        for future in concurrent.futures.as_completed(futures):
+            record = future.result()
+            # Record the cell first, so its lines can be written again if the
+            # campaign is interrupted before they are all written
+            with open(ledger_path(matrix_path), "a", encoding="utf8") as f:
+                f.write(json.dumps(record) + "\n")
+            if record["Status"] == "ok":
+                write_record(matrix, record)
+            counts[record["Status"]] += 1
+            print(
+                f"[{sum(counts.values())}/{len(pending)}] {record['Key']}: "
+                f"{record['Status']} ({record['Duration']:.1f} s)"
+            )
+    return counts
+
+
+if __name__ == "__main__":
+    run_experiments(sys.argv[1] if len(sys.argv) > 1 else MATRIX_PATH)
@@ -0,0 +1,191 @@
+"""
+Module implementing the External Memory Merge Sort algorithm of main.c with
+NumPy block buffers on binary files of 32-bit integers. The initial partition
+sorts runs of blocks_in_memory blocks, the merge rounds merge fan_in runs at a
+time with a heap-based k-way merge, so that only log_k(N / M) merge rounds pass
+over the data instead of log_2(N / M).
+"""
+import heapq
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+INT_DTYPE = np.dtype("<i4")
+BLOCKS_IN_MEMORY = 3
+
+# Input generated like in main.c (rand() of glibc has RAND_MAX = 2^31 - 1)
+INPUT_PATH = "../bin/input.bin"
+OUTPUT_PATH = "../bin/output.bin"
+RAND_MAX = 2**31 - 1
+SEED = 0
+INPUT_SIZE = 10000000
+BLOCK_SIZES = [10000, 100000, 1000000]
+FAN_INS = [2, 4, 16]
+
+
+def read_block(f, offset, count):
+    """Function to read count integers from the element offset of a file"""
+    f.seek(offset * INT_DTYPE.itemsize)
+    return np.fromfile(f, dtype=INT_DTYPE, count=count)
+
+
+def initial_partition(input_path, output_path, block_size, blocks_in_memory):
+    """
+    Function to sort the input file in runs of blocks_in_memory blocks (the
+    memory size M) into the output file. Returns the number of runs.
+    """
+    run_length = block_size * blocks_in_memory
+    runs = 0
+    with open(input_path, "rb") as f_in, open(output_path, "wb") as f_out:
+        while True:
+            buffer = np.fromfile(f_in, dtype=INT_DTYPE, count=run_length)
+            if len(buffer) == 0:
+                break
+            buffer.sort()
+            buffer.tofile(f_out)
+            runs += 1
+    return runs
+
+
+def merge_runs(f_in, f_out, run_starts, run_ends, block_size):
+    """
+    Function to merge sorted runs [start, end) of the input file into the
+    output file with one block buffer per run.
+
+    A heap holds the last value of the buffer of every run. All buffered values
+    up to the smallest of these last values precede every value that was not
+    read yet, so they are merged and written in one step, and the buffer of the
+    run with the smallest last value is refilled.
+    """
+    buffers = [
+        read_block(f_in, start, min(block_size, end - start))
+        for start, end in zip(run_starts, run_ends)
+    ]
+    positions = [0] * len(buffers)
+    offsets = [start + len(buffer) for start, buffer in zip(run_starts, buffers)]
+    heap = [(int(buffer[-1]), run) for run, buffer in enumerate(buffers) if len(buffer)]
+    heapq.heapify(heap)
+
+    while heap:
+        bound, run = heapq.heappop(heap)
+        pieces = []
+        for other, buffer in enumerate(buffers):
+            position = positions[other]
+            end = int(np.searchsorted(buffer[position:], bound, side="right"))
+            if end:
+                pieces.append(buffer[position : position + end])
+                positions[other] = position + end
+        if pieces:
+            merged = np.concatenate(pieces)
+            if len(pieces) > 1:
+                merged.sort(kind="stable")
+            merged.tofile(f_out)
+
+        count = min(block_size, run_ends[run] - offsets[run])
+        if count > 0:
+            buffers[run] = read_block(f_in, offsets[run], count)
+            positions[run] = 0
+            offsets[run] += count
+            heapq.heappush(heap, (int(buffers[run][-1]), run))
+        else:
+            buffers[run] = buffers[run][:0]
+            positions[run] = 0
+
+
+def merge_round(input_path, output_path, input_size, run_length, block_size, fan_in):
+    """
+    Function to merge every fan_in consecutive sorted runs of run_length
+    integers of the input file into one run of the output file
+    """
+    with open(input_path, "rb") as f_in, open(output_path, "wb") as f_out:
+        for group_start in range(0, input_size, run_length * fan_in):
+            run_starts = list(
+                range(
+                    group_start,
+                    min(group_start + run_length * fan_in, input_size),
+                    run_length,
+                )
+            )
+            run_ends = [min(start + run_length, input_size) for start in run_starts]
+            merge_runs(f_in, f_out, run_starts, run_ends, block_size)
+
+
+def clear_file(path):
+    """Function to truncate a file"""
+    open(path, "wb").close()
+
+
+def external_merge_sort(
+    input_path,
+    output_path,
+    block_size,
+    blocks_in_memory=BLOCKS_IN_MEMORY,
+    fan_in=None,
+):
+    """
+    Function to sort a binary file of integers like perform_analysis in main.c:
+    the initial partition and the merge rounds alternate between the two files,
+    and every pass truncates the file it read. The fan-in defaults to the blocks
+    in memory minus the output block (2 in main.c).
+    Returns the metrics of main.c and the path of the file holding the result.
+    """
+    if fan_in is None:
+        fan_in = blocks_in_memory - 1
+    if fan_in < 2:
+        raise ValueError(f"The fan-in must be at least 2, got {fan_in}")
+    input_size = os.path.getsize(input_path) // INT_DTYPE.itemsize
+
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+
+    initial_partition(input_path, output_path, block_size, blocks_in_memory)
+    clear_file(input_path)
+    input_path, output_path = output_path, input_path
+
+    run_length = block_size * blocks_in_memory
+    merge_rounds = 0
+    while run_length < input_size:
+        merge_rounds += 1
+        merge_round(input_path, output_path, input_size, run_length, block_size, fan_in)
+        clear_file(input_path)
+        input_path, output_path = output_path, input_path
+        run_length *= fan_in
+
+    return {
+        "Input_Size": input_size,
+        "Block_Size": block_size,
+        "Fan_In": fan_in,
+        "External_Wall_Clock_Time": time.perf_counter() - start_wall,
+        "External_CPU_Time": time.process_time() - start_cpu,
+        "Merge_Rounds": merge_rounds,
+        "Sorted_Path": input_path,
+    }
+
+
+def generate_input(input_path, input_size, seed=SEED):
+    """Function to write a file of uniformly random integers in [0, RAND_MAX]"""
+    rng = np.random.default_rng(seed)
+    rng.integers(0, RAND_MAX, size=input_size, endpoint=True, dtype=INT_DTYPE).tofile(
+        input_path
+    )
+
+
+if __name__ == "__main__":
+    results = []
+    for block_size in BLOCK_SIZES:
+        for fan_in in FAN_INS:
+            generate_input(INPUT_PATH, INPUT_SIZE)
+            expected = np.sort(np.fromfile(INPUT_PATH, dtype=INT_DTYPE))
+            result = external_merge_sort(
+                INPUT_PATH,
+                OUTPUT_PATH,
+                block_size,
+                blocks_in_memory=fan_in + 1,
+                fan_in=fan_in,
+            )
+            sorted_values = np.fromfile(result.pop("Sorted_Path"), dtype=INT_DTYPE)
+            result["Sorted"] = np.array_equal(sorted_values, expected)
+            results.append(result)
+    print(pd.DataFrame(results).to_string(index=False))
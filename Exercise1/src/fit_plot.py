@@ -1,85 +1,72 @@
 """
 This module is for the visualization of correlation between measured run times and
 assumed functions to test how strong the linear relationship of the measured run times
-with the assumed functions are when the input size increases. 
-We expect to see a peak of the correlation coefficient when the run times lie in 
+with the assumed functions are when the input size increases.
+We expect to see a peak of the correlation coefficient when the run times lie in
 Theta(assumed function), i.e, scale the same as that function, apart from a scalar
-coefficient. 
+coefficient.
 """
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import seaborn as sns
 from scipy.interpolate import interp1d
 
-for metric in [
-    "External_Wall_Clock_Time",
-    "Classical_Wall_Clock_Time",
-    "Merge_Rounds",
-    "Classical_Rounds",
-]:
-    for relationship in [
-        "Coefficient",
-        "Rsquared",
-        "Correlation",
-    ]:
-        df = pd.read_csv(
-            f"../res/results_fit_{metric}.txt",
-            header=None,
-            names=[
-                "Block Size",
-                "Function",
-                "Coefficient",
-                "Rsquared",
-                "Correlation",
-                "p_Value",
-                "Residuals",
-            ],
-        )
-
-        df["Function"] = pd.to_numeric(df["Function"], errors="coerce")
-        df[relationship] = pd.to_numeric(df[relationship], errors="coerce")
-        df = df.dropna(subset=["Function", relationship])
-        df = df.sort_values(by="Function")
-        block_sizes = df["Block Size"].unique()
-
-        marker_color_mapping = {
-            0.04: ("X", "blue"),
-            0.4: ("o", "red"),
-            4: ("s", "green"),
-            40: ("D", "purple"),
-            1000: ("x", "orange"),
+import fit
+import scaling_fit
+
+# Stored fit arrays of every relationship
+RELATIONSHIPS = {
+    "Coefficient": "coefficients",
+    "Rsquared": "r_squared",
+    "Correlation": "correlation",
+}
+
+# Compare with the functions n^p log(n)
+LOG_POWER = 1
+
+marker_color_mapping = {
+    0.04: ("X", "blue"),
+    0.4: ("o", "red"),
+    4: ("s", "green"),
+    40: ("D", "purple"),
+    1000: ("x", "orange"),
+}
+
+for metric in fit.METRICS:
+    # The arrays are read from the file one at a time when they are accessed,
+    # so every needed array is read once and the others are not read at all
+    with scaling_fit.load_fits(fit.FIT_PATH.format(metric=metric)) as fits:
+        fit_axes = {key: fits[key] for key in ["powers", "log_powers", "groups"]}
+        _, log_power_index, _ = scaling_fit.fit_index(fit_axes, log_power=LOG_POWER)
+        relationship_values = {
+            relationship: fits[key][:, log_power_index, :]
+            for relationship, key in RELATIONSHIPS.items()
         }
+        log_power_residuals = fits["residuals"][:, log_power_index]
+    powers = fit_axes["powers"]
+    block_sizes = fit_axes["groups"]
 
+    for relationship, values in relationship_values.items():
         fig, ax = plt.subplots(figsize=(10, 10))
-        ALREADY_LABELED = False
         for i, block_size in enumerate(block_sizes):
-            df_block = df[df["Block Size"] == block_size]
+            valid = ~np.isnan(values[:, i])
+            block_powers, block_values = powers[valid], values[valid, i]
+            max_index = np.argmax(block_values)
 
-            max_corr_row = df_block[
-                df_block[relationship] == df_block[relationship].max()
-            ]
-
-            f = interp1d(df_block["Function"], df_block[relationship], kind="cubic")
-            smooth_curve = np.linspace(
-                df_block["Function"].min(), df_block["Function"].max(), 1000
-            )
+            f = interp1d(block_powers, block_values, kind="cubic")
+            smooth_curve = np.linspace(block_powers.min(), block_powers.max(), 1000)
             interpolated_values = f(smooth_curve)
 
-            for j, row in df_block.iterrows():
-                x = row["Function"]
-                y = row[relationship]
-                if j == max_corr_row.index[0]:
-                    marker, color = marker_color_mapping[block_size]
-                    ax.scatter(
-                        x,
-                        y,
-                        color=color,
-                        marker=marker,
-                        label=f"Max. ({block_size} MB)",
-                    )
-                else:
-                    ax.scatter(x, y, color="blue")
+            others = np.arange(len(block_values)) != max_index
+            ax.scatter(block_powers[others], block_values[others], color="blue")
+            marker, color = marker_color_mapping[block_size]
+            ax.scatter(
+                block_powers[max_index],
+                block_values[max_index],
+                color=color,
+                marker=marker,
+                label=f"Max. ({block_size} MB)",
+            )
 
             ax.plot(
                 smooth_curve, interpolated_values, label=f"Block Size {block_size} MB"
@@ -100,16 +87,15 @@ for metric in [
 
     fig, axes = plt.subplots(len(block_sizes), 1, figsize=(10, 5 * len(block_sizes)))
 
+    # Only show the residuals of the integer powers
+    integer_powers = np.flatnonzero(powers % 1 == 0)
+    residuals = log_power_residuals[integer_powers]
     for i, block_size in enumerate(block_sizes):
-        df_block = df[df["Block Size"] == block_size]
-
-        max_corr_row = df_block[df_block[relationship] == df_block[relationship].max()]
-
         ax = axes[i]
 
-        for j, row in df_block.iterrows():
-            residuals = [float(r) for r in row["Residuals"].split(";")]
-            sns.kdeplot(residuals, ax=ax, label=rf'$n^{row["Function"]} \log n$')
+        for power, power_residuals in zip(powers[integer_powers], residuals[:, i]):
+            power_residuals = power_residuals[~np.isnan(power_residuals)]
+            sns.kdeplot(power_residuals, ax=ax, label=rf"$n^{{{power:g}}} \log n$")
 
         ax.set_xlabel("Residuals")
         ax.set_ylabel("Density")
@@ -0,0 +1,65 @@
+"""
+Module for computing quantiles of several metrics for all groups of a DataFrame
+in one aggregation step
+"""
+import numpy as np
+import pandas as pd
+
+QUANTILE_NAMES = {0.25: "q1", 0.5: "median", 0.75: "q3"}
+
+
+def quantile_name(quantile):
+    """Function to get the column suffix of a quantile, e.g. median for 0.5"""
+    return QUANTILE_NAMES.get(quantile, f"q{quantile:g}")
+
+
+def sorted_group_quantiles(sorted_values, starts, counts, quantiles):
+    """
+    Function to interpolate quantiles linearly (like pandas) for all groups of
+    values that are sorted by group and then by value. NaN values have to be
+    sorted to the end of their group and are excluded by the counts.
+    """
+    positions = (counts[:, None] - 1) * quantiles[None, :]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    fraction = positions - lower
+
+    # Groups without values point outside of the array, they are masked below
+    last = len(sorted_values) - 1
+    lower_values = sorted_values[np.clip(starts[:, None] + lower, 0, last)]
+    upper_values = sorted_values[np.clip(starts[:, None] + upper, 0, last)]
+
+    result = lower_values + (upper_values - lower_values) * fraction
+    result[counts == 0] = np.nan
+    return result
+
+
+def grouped_quantiles(df, keys, metrics, quantiles=(0.25, 0.5, 0.75)):
+    """
+    Function to compute the requested quantiles of all metrics for all groups
+    of df in one pass over the data sorted by group and value. Returns a summary
+    table indexed by the keys with one column per metric and quantile, e.g.
+    External_Wall_Clock_Time_median, and an IQR column per metric if the
+    quartiles are requested.
+    """
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    grouper = df.groupby(keys, sort=True, observed=True)
+    codes = grouper.ngroup().to_numpy()
+    group_sizes = grouper.size()
+    ends = np.cumsum(group_sizes.to_numpy())
+    starts = ends - group_sizes.to_numpy()
+
+    summary = pd.DataFrame(index=group_sizes.index)
+    for metric in metrics:
+        values = df[metric].to_numpy(dtype=np.float64)
+        # Sort by group first and by value second, NaN values go last
+        order = np.lexsort((values, codes))
+        counts = np.bincount(
+            codes[~np.isnan(values)], minlength=len(group_sizes)
+        ).astype(np.int64)
+        result = sorted_group_quantiles(values[order], starts, counts, quantiles)
+        for i, quantile in enumerate(quantiles):
+            summary[f"{metric}_{quantile_name(quantile)}"] = result[:, i]
+        if 0.25 in quantiles and 0.75 in quantiles:
+            summary[f"{metric}_IQR"] = summary[f"{metric}_q3"] - summary[f"{metric}_q1"]
+    return summary
@@ -1,159 +1,159 @@
 """
-Module to perform hypothesis test regarding the block size 
+Module to perform hypothesis test regarding the block size
 parameter of the External Memory Merge Sort (and Classical Merge Sort)
 algorithm
 """
-import numpy as np
+import hashlib
+
 import pandas as pd
-from scipy.stats import ttest_ind
+
+import output_manifest
+import pairwise_ttest
+import results_loader
 
 RESULTS_PATH = "../res/results_block_size_analysis.txt"
 
-df = pd.read_csv(RESULTS_PATH, delimiter=",", header=None, engine="python", skiprows=1)
-df.columns = [
-    "File_Seed",
-    "Input_size",
-    "Block_Size",
-    "Input_MB",
-    "Block_Size_MB",
-    "External_Wall_Clock_Time",
-    "External_CPU_Time",
-    "Classical_Wall_Clock_Time",
-    "Classical_CPU_Time",
-    "Merge_Rounds",
-    "Classical_Rounds",
-    "Host_Name",
-]
-
-# Process columns (except Host_Name)
-for column in df.columns:
-    if column != "Host_Name":
-        df[column] = df[column].apply(
-            lambda x: float(x.strip(" MB,").replace(",", ""))
-            if isinstance(x, str)
-            else x
-        )
-
-df["Host_Name"] = (
-    df["Host_Name"].str.replace(" ", "").replace({"BookBook-Pro-2.local": "MacBook"})
-)
-
-block_sizes = df["Block_Size"].unique()
-file_seeds = df["File_Seed"].unique()
-
-hypothesis_test_results = []
-
-
-def perform_hypothesis_tests():
+# Table of all test results, keyed by a hash of the results file in its first line
+TESTS_PATH = "../res/hypothesis_tests.csv"
+KEY_PREFIX = "# key: "
+METRICS = ["Classical_Wall_Clock_Time", "External_Wall_Clock_Time"]
+
+# Student's t-test (as scipy's ttest_ind by default) or Welch's t-test
+EQUAL_VAR = True
+
+
+def compute_hypothesis_tests(df, metrics=None, equal_var=EQUAL_VAR):
+    """
+    Function to test all pairs of block sizes against each other, globally and
+    for every file seed, from the moments of every (metric, seed, block size)
+    group. Returns one row per test.
+    """
+    if metrics is None:
+        metrics = METRICS
+    moments = pairwise_ttest.group_moments(df, metrics, ["File_Seed", "Block_Size"])
+    global_moments = pairwise_ttest.combine_moments(moments, ["Metric", "Block_Size"])
+
+    global_tests = pairwise_ttest.pairwise_ttests(
+        global_moments, ["Metric"], "Block_Size", equal_var=equal_var
+    )
+    global_tests.insert(1, "File_Seed", "Global")
+    seed_tests = pairwise_ttest.pairwise_ttests(
+        moments, ["Metric", "File_Seed"], "Block_Size", equal_var=equal_var
+    )
+    seed_tests["File_Seed"] = seed_tests["File_Seed"].astype(str)
+
+    tests = pd.concat([global_tests, seed_tests], ignore_index=True)
+    tests["Comparison"] = (
+        tests["Block_Size_1"].astype(str) + " vs " + tests["Block_Size_2"].astype(str)
+    )
+    # Report the metrics in the requested order, global tests first
+    tests["Metric"] = pd.Categorical(tests["Metric"], categories=metrics)
+    tests["Per_Seed"] = tests["File_Seed"] != "Global"
+    tests = tests.sort_values(["Metric", "Per_Seed"], kind="stable")
+    return tests.drop(columns="Per_Seed").reset_index(drop=True)
+
+
+def print_hypothesis_tests(tests):
+    """Function to print the report of all hypothesis tests"""
+    lines = []
+    for (metric, file_seed), group in tests.groupby(
+        ["Metric", "File_Seed"], sort=False, observed=True
+    ):
+        if file_seed == "Global":
+            lines.append("Global analysis on metric: " + metric)
+        else:
+            lines.append("File seed: " + file_seed + "\tMetric: " + metric)
+        for test in group.rename(columns={"p-value": "p_value"}).itertuples():
+            if file_seed == "Global":
+                lines.append(
+                    f"T-test between Block Size {test.Block_Size_1} and "
+                    f"Block Size {test.Block_Size_2}:"
+                )
+            else:
+                lines.append(
+                    f"T-test for File Seed {file_seed}, "
+                    f"Block Size {test.Block_Size_1} vs Block Size {test.Block_Size_2}:"
+                )
+            lines.append(
+                f"T-statistic: {test.t_statistic}, p-value: {test.p_value}, "
+                f"Cohen's d: {test.cohen_d}"
+            )
+            if test.Result == "Reject":
+                lines.append(
+                    "Reject null hypothesis: There is a significant difference"
+                )
+            else:
+                lines.append(
+                    "Fail to reject null hypothesis: No significant difference"
+                )
+        lines.append("")
+    print("\n".join(lines))
+
+
+def file_digest(file_path):
+    """Function to hash the content of a file"""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def tests_key(results_path=RESULTS_PATH):
+    """Function to key the test results by their input file and test parameters"""
+    return output_manifest.digest(file_digest(results_path), METRICS, EQUAL_VAR)
+
+
+def save_hypothesis_tests(tests, key, tests_path=TESTS_PATH):
+    """Function to store the test results together with the key of their inputs"""
+    with open(tests_path, "w", encoding="utf8") as file:
+        file.write(KEY_PREFIX + key + "\n")
+        tests.to_csv(file, index=False)
+
+
+def read_hypothesis_tests(key, tests_path=TESTS_PATH):
+    """
+    Function to read the stored test results if they were computed from inputs
+    with the same key, otherwise None
+    """
+    try:
+        with open(tests_path, "r", encoding="utf8") as file:
+            if file.readline().strip() != KEY_PREFIX + key:
+                return None
+            return pd.read_csv(file, dtype={"File_Seed": str})
+    except OSError:
+        return None
+
+
+def perform_hypothesis_tests(results_path=RESULTS_PATH, tests_path=TESTS_PATH):
     """
     Function to perform hypothesis tests to distinguish the effects
     of small changes in the block size parameter for the External Memory
-    Merge Sort algorithm
+    Merge Sort algorithm. Prints the report and refreshes the stored table.
     """
-    for metric in ["Classical_Wall_Clock_Time", "External_Wall_Clock_Time"]:
-        print("Global analysis on metric: " + metric)
-        for _, i in enumerate(block_sizes):
-            for j in range(i + 1, len(block_sizes)):
-                block_size_1 = block_sizes[i]
-                block_size_2 = block_sizes[j]
+    key = tests_key(results_path)
+    df = results_loader.load_results(results_path, results_loader.HOST_ALIASES)
+    tests = compute_hypothesis_tests(df)
+    print_hypothesis_tests(tests)
+    save_hypothesis_tests(tests, key, tests_path)
+    return tests
 
-                data1 = df[df["Block_Size"] == block_size_1][metric]
-                data2 = df[df["Block_Size"] == block_size_2][metric]
 
-                t_statistic, p_value = ttest_ind(data1, data2)
+def load_hypothesis_tests(
+    results_path=RESULTS_PATH, tests_path=TESTS_PATH, refresh=False
+):
+    """
+    Function to load the stored test results. They are only recomputed (without
+    printing the report) if the results file changed or refresh is set.
+    """
+    key = tests_key(results_path)
+    tests = None if refresh else read_hypothesis_tests(key, tests_path)
+    if tests is None:
+        df = results_loader.load_results(results_path, results_loader.HOST_ALIASES)
+        tests = compute_hypothesis_tests(df)
+        save_hypothesis_tests(tests, key, tests_path)
+    return tests
 
-                mean_diff = data1.mean() - data2.mean()
-                pooled_std_dev = np.sqrt((data1.var() + data2.var()) / 2)
-                cohen_d = mean_diff / pooled_std_dev
 
-                print(
-                    f"T-test between Block Size {block_size_1} and Block Size {block_size_2}:"
-                )
-                print(
-                    f"T-statistic: {t_statistic}, p-value: {p_value}, Cohen's d: {cohen_d}"
-                )
-                if p_value < 0.05:
-                    print("Reject null hypothesis: There is a significant difference")
-                    hypothesis_test_results.append(
-                        {
-                            "Metric": metric,
-                            "Comparison": f"{block_size_1} vs {block_size_2}",
-                            "File_Seed": "Global",
-                            "Result": "Reject",
-                            "p-value": p_value,
-                            "cohen_d": cohen_d,
-                        }
-                    )
-                else:
-                    print("Fail to reject null hypothesis: No significant difference")
-                    hypothesis_test_results.append(
-                        {
-                            "Metric": metric,
-                            "Comparison": f"{block_size_1} vs {block_size_2}",
-                            "File_Seed": "Global",
-                            "Result": "Not Reject",
-                            "p-value": p_value,
-                            "cohen_d": cohen_d,
-                        }
-                    )
-        print()
-
-        for file_seed in file_seeds:
-            print("File seed: " + str(file_seed) + "\tMetric: " + metric)
-            for _, i in enumerate(block_sizes):
-                for j in range(i + 1, len(block_sizes)):
-                    block_size_1 = block_sizes[i]
-                    block_size_2 = block_sizes[j]
-
-                    data1 = df[
-                        (df["Block_Size"] == block_size_1)
-                        & (df["File_Seed"] == file_seed)
-                    ][metric]
-                    data2 = df[
-                        (df["Block_Size"] == block_size_2)
-                        & (df["File_Seed"] == file_seed)
-                    ][metric]
-
-                    t_statistic, p_value = ttest_ind(data1, data2)
-
-                    mean_diff = data1.mean() - data2.mean()
-                    pooled_std_dev = np.sqrt((data1.var() + data2.var()) / 2)
-                    cohen_d = mean_diff / pooled_std_dev
-
-                    print(
-                        f"T-test for File Seed {file_seed}, \
-                            Block Size {block_size_1} vs Block Size {block_size_2}:"
-                    )
-                    print(
-                        f"T-statistic: {t_statistic}, p-value: {p_value}, Cohen's d: {cohen_d}"
-                    )
-                    if p_value < 0.05:
-                        print(
-                            "Reject null hypothesis: There is a significant difference"
-                        )
-                        hypothesis_test_results.append(
-                            {
-                                "Metric": metric,
-                                "Comparison": f"{block_size_1} vs {block_size_2}",
-                                "File_Seed": f"{file_seed}",
-                                "Result": "Reject",
-                                "p-value": p_value,
-                                "cohen_d": cohen_d,
-                            }
-                        )
-                    else:
-                        print(
-                            "Fail to reject null hypothesis: No significant difference"
-                        )
-                        hypothesis_test_results.append(
-                            {
-                                "Metric": metric,
-                                "Comparison": f"{block_size_1} vs {block_size_2}",
-                                "File_Seed": f"{file_seed}",
-                                "Result": "Not Reject",
-                                "p-value": p_value,
-                                "cohen_d": cohen_d,
-                            }
-                        )
-            print()
-    return hypothesis_test_results
+if __name__ == "__main__":
+    perform_hypothesis_tests()
@@ -0,0 +1,147 @@
+"""
+Module for generating the binary input files of the External Memory Merge Sort
+algorithm with vectorized block writes, for several data distributions. Every
+(distribution, seed, input size) file is generated once into a cache directory
+and reused by later runs.
+"""
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+INT_DTYPE = np.dtype("<i4")
+RAND_MAX = 2**31 - 1
+CACHE_DIR = "../bin/inputs"
+
+# Number of integers generated and written at once
+GENERATION_BLOCK = 1 << 22
+
+# Nearly sorted: this fraction of the elements is moved by up to the distance
+NEARLY_SORTED_FRACTION = 0.01
+NEARLY_SORTED_DISTANCE = 1000
+FEW_UNIQUE_VALUES = 16
+ZIPF_EXPONENT = 1.5
+
+DISTRIBUTIONS = [
+    "uniform",
+    "sorted",
+    "reverse",
+    "nearly_sorted",
+    "few_unique",
+    "zipf",
+    "organ_pipe",
+]
+
+# Settings of the example run
+INPUT_SIZE = 10000000
+SEED = 0
+
+
+def block_rng(distribution, seed, block):
+    """
+    Function to get the random generator of one generation block, so every
+    block can be generated independently of the others
+    """
+    key = zlib.crc32(distribution.encode())
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(key, block)))
+
+
+def ramp(indices, length):
+    """Function to map the indices 0..length-1 increasingly onto 0..RAND_MAX"""
+    values = np.floor(indices * ((RAND_MAX + 1) / length))
+    return np.minimum(values, RAND_MAX)
+
+
+def generate_block(distribution, seed, input_size, start, stop):
+    """Function to generate the elements start to stop of an input file"""
+    rng = block_rng(distribution, seed, start // GENERATION_BLOCK)
+    size = stop - start
+    indices = np.arange(start, stop, dtype=np.float64)
+    if distribution == "uniform":
+        values = rng.integers(0, RAND_MAX, size=size, endpoint=True)
+    elif distribution == "sorted":
+        values = ramp(indices, input_size)
+    elif distribution == "reverse":
+        values = ramp(input_size - 1 - indices, input_size)
+    elif distribution == "nearly_sorted":
+        # Move some elements of the sorted block to a nearby position
+        keys = np.arange(size, dtype=np.float64)
+        moved = rng.random(size) < NEARLY_SORTED_FRACTION
+        keys[moved] += rng.uniform(
+            -NEARLY_SORTED_DISTANCE, NEARLY_SORTED_DISTANCE, moved.sum()
+        )
+        values = ramp(indices, input_size)[np.argsort(keys, kind="stable")]
+    elif distribution == "few_unique":
+        values = rng.integers(0, FEW_UNIQUE_VALUES, size=size) * (
+            RAND_MAX // (FEW_UNIQUE_VALUES - 1)
+        )
+    elif distribution == "zipf":
+        values = np.minimum(rng.zipf(ZIPF_EXPONENT, size=size), RAND_MAX)
+    elif distribution == "organ_pipe":
+        # Increasing over the first half and decreasing over the second half
+        half = (input_size + 1) // 2
+        values = ramp(np.minimum(indices, input_size - 1 - indices), half)
+    else:
+        raise ValueError(
+            f"Unknown distribution '{distribution}', choose one of {DISTRIBUTIONS}"
+        )
+    return values.astype(INT_DTYPE)
+
+
+def write_input(path, distribution, seed, input_size):
+    """
+    Function to write an input file block by block. The file is written under a
+    temporary name and renamed at the end, so no partial file is ever visible.
+    """
+    directory = os.path.dirname(path) or "."
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            for start in range(0, input_size, GENERATION_BLOCK):
+                stop = min(start + GENERATION_BLOCK, input_size)
+                generate_block(distribution, seed, input_size, start, stop).tofile(f)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def input_cache_path(distribution, seed, input_size, cache_dir=CACHE_DIR):
+    """Function to get the path of the cached input file of a setting"""
+    return os.path.join(cache_dir, f"{distribution}_{seed}_{input_size}.bin")
+
+
+def cached_input(distribution, seed, input_size, cache_dir=CACHE_DIR):
+    """Function to get the path of an input file, generating it if not cached"""
+    path = input_cache_path(distribution, seed, input_size, cache_dir)
+    if (
+        not os.path.exists(path)
+        or os.path.getsize(path) != input_size * INT_DTYPE.itemsize
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        write_input(path, distribution, seed, input_size)
+    return path
+
+
+def copy_input(distribution, seed, input_size, input_path, cache_dir=CACHE_DIR):
+    """
+    Function to place an input file at input_path (as a copy, because the
+    External Memory Merge Sort algorithm truncates its input file)
+    """
+    shutil.copyfile(cached_input(distribution, seed, input_size, cache_dir), input_path)
+
+
+if __name__ == "__main__":
+    for distribution in DISTRIBUTIONS:
+        start = time.perf_counter()
+        path = cached_input(distribution, SEED, INPUT_SIZE)
+        values = np.memmap(path, dtype=INT_DTYPE, mode="r")
+        print(
+            f"{distribution:>15}: {time.perf_counter() - start:8.3f} s, "
+            f"{len(np.unique(values)):>10} unique values, "
+            f"{np.count_nonzero(np.diff(values) < 0):>10} descents"
+        )
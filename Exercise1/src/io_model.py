@@ -0,0 +1,174 @@
+"""
+Module for selecting between I/O complexity, CPU complexity and combined models
+of the run times of the External Memory Merge Sort algorithm per host, and for
+predicting the run times of settings (N, B, M) that were not measured
+"""
+import numpy as np
+import pandas as pd
+
+import results_loader
+
+RESULTS_PATH = "../res/results_options_blocksize_scaling_analysis.txt"
+METRICS = ["External_Wall_Clock_Time", "External_CPU_Time"]
+GROUP_KEYS = ["Host_Name", "Sort_Option"]
+
+# Number of blocks of size B that fit into the memory M (as in main.c), and
+# number of runs merged per merge round (two input blocks, one output block)
+BLOCKS_IN_MEMORY = 3
+FAN_IN = 2
+
+# Settings (N, B, M) to predict the run times of, in number of integers
+PREDICTION_SETTINGS = pd.DataFrame(
+    {
+        "Input_Size": [100000000, 1000000000, 1000000000, 10000000000],
+        "Block_Size": [1000000, 1000000, 10000000, 10000000],
+        "Memory_Size": [3000000, 3000000, 30000000, 30000000],
+    }
+)
+
+
+def merge_rounds(input_size, memory_size, fan_in=FAN_IN):
+    """
+    Function to compute the number of merge rounds after the initial partition
+    into sorted runs of size M, which matches the measured Merge_Rounds
+    """
+    runs = np.ceil(np.asarray(input_size, dtype=np.float64) / memory_size)
+    return np.ceil(np.log(np.maximum(runs, 1)) / np.log(fan_in) - 1e-9)
+
+
+def model_features(input_size, block_size, memory_size):
+    """
+    Function to evaluate the terms of all models:
+    - IO: the textbook I/O complexity (N/B) log_{M/B}(N/B)
+    - IO_Passes: block transfers (N/B) (1 + merge rounds) of the implementation
+    - CPU: comparisons N log2(N) of sorting
+    """
+    input_size = np.asarray(input_size, dtype=np.float64)
+    block_size = np.asarray(block_size, dtype=np.float64)
+    memory_size = np.asarray(memory_size, dtype=np.float64)
+    blocks = input_size / block_size
+    with np.errstate(invalid="ignore", divide="ignore"):
+        io = blocks * np.maximum(np.log(blocks), 0) / np.log(memory_size / block_size)
+    return pd.DataFrame(
+        {
+            "IO": io,
+            "IO_Passes": blocks * (1 + merge_rounds(input_size, memory_size)),
+            "CPU": input_size * np.log2(input_size),
+        }
+    )
+
+
+# Terms of every model, all models have an intercept
+MODELS = {
+    "IO": ["IO"],
+    "IO_Passes": ["IO_Passes"],
+    "CPU": ["CPU"],
+    "Combined": ["IO_Passes", "CPU"],
+    "Combined_IO": ["IO", "CPU"],
+}
+
+
+def fit_model(features, observed, terms):
+    """
+    Function to fit a linear model of the terms with intercept by least squares.
+    Returns the coefficients, the residual sum of squares and the number of
+    parameters including the variance of the errors.
+    """
+    design = np.column_stack([np.ones(len(observed))] + [features[t] for t in terms])
+    coefficients, *_ = np.linalg.lstsq(design, observed, rcond=None)
+    residual_squares = float(np.sum((observed - design @ coefficients) ** 2))
+    return coefficients, residual_squares, design.shape[1] + 1
+
+
+def information_criteria(residual_squares, n_observations, n_parameters):
+    """Function to compute AIC and BIC of a model with Gaussian errors"""
+    log_likelihood = (
+        -n_observations
+        / 2
+        * (np.log(2 * np.pi * residual_squares / n_observations) + 1)
+    )
+    aic = 2 * n_parameters - 2 * log_likelihood
+    bic = n_parameters * np.log(n_observations) - 2 * log_likelihood
+    return aic, bic
+
+
+def select_models(df, metrics=None, models=None, blocks_in_memory=BLOCKS_IN_MEMORY):
+    """
+    Function to fit all models to every metric of every host (and sort option)
+    and to rank them by BIC. Returns one row per group, metric and model.
+    """
+    if metrics is None:
+        metrics = METRICS
+    if models is None:
+        models = MODELS
+    rows = []
+    for group, group_df in df.groupby(GROUP_KEYS, sort=True, observed=True):
+        features = model_features(
+            group_df["Input_Size"],
+            group_df["Block_Size"],
+            group_df["Block_Size"] * blocks_in_memory,
+        )
+        for metric in metrics:
+            observed = group_df[metric].to_numpy(np.float64)
+            valid = ~np.isnan(observed) & (observed >= 0)
+            total_squares = np.sum((observed[valid] - observed[valid].mean()) ** 2)
+            for model, terms in models.items():
+                coefficients, residual_squares, n_parameters = fit_model(
+                    features[valid], observed[valid], terms
+                )
+                aic, bic = information_criteria(
+                    residual_squares, int(valid.sum()), n_parameters
+                )
+                rows.append(
+                    dict(
+                        zip(GROUP_KEYS, group),
+                        Metric=metric,
+                        Model=model,
+                        Observations=int(valid.sum()),
+                        Coefficients=coefficients,
+                        Rsquared=1 - residual_squares / total_squares,
+                        AIC=aic,
+                        BIC=bic,
+                    )
+                )
+    selection = pd.DataFrame(rows)
+    by_group = selection.groupby(GROUP_KEYS + ["Metric"], sort=False)
+    selection["Delta_AIC"] = selection["AIC"] - by_group["AIC"].transform("min")
+    selection["Delta_BIC"] = selection["BIC"] - by_group["BIC"].transform("min")
+    selection["Rank"] = by_group["BIC"].rank(method="min").astype(int)
+    return selection.sort_values(GROUP_KEYS + ["Metric", "Rank"], ignore_index=True)
+
+
+def predict(selection, settings, models=None):
+    """
+    Function to predict the run times of settings (Input_Size, Block_Size,
+    Memory_Size) with the best model (by BIC) of every host and metric.
+    Returns one row per setting, host and metric.
+    """
+    if models is None:
+        models = MODELS
+    features = model_features(
+        settings["Input_Size"], settings["Block_Size"], settings["Memory_Size"]
+    )
+    predictions = []
+    for best in selection[selection["Rank"] == 1].itertuples(index=False):
+        terms = models[best.Model]
+        design = np.column_stack(
+            [np.ones(len(settings))] + [features[t] for t in terms]
+        )
+        prediction = settings.copy()
+        for key in GROUP_KEYS + ["Metric", "Model"]:
+            prediction[key] = getattr(best, key)
+        prediction["Predicted_Time"] = design @ best.Coefficients
+        predictions.append(prediction)
+    return pd.concat(predictions, ignore_index=True)
+
+
+if __name__ == "__main__":
+    results = results_loader.load_results(RESULTS_PATH)
+    model_selection = select_models(results)
+    print(
+        model_selection.drop(columns="Coefficients").to_string(index=False),
+        end="\n\n",
+    )
+    print(predict(model_selection, PREDICTION_SETTINGS).to_string(index=False))
@@ -0,0 +1,325 @@
+"""
+Module for following a running benchmark campaign in a self-refreshing HTML
+page. The results files are ingested into their results stores as they grow,
+which updates the per-configuration summaries and quantile sketches with the
+new runs only. Only the median/IQR and KDE figures of the slices that got new
+runs are rendered again (as HTML, without image exports), and at most
+MAX_SLICES_PER_REFRESH of them per refresh. The median/IQR figures are read
+off the sketches and the KDE figures use at most MAX_KDE_RUNS evenly spaced
+runs of every group, so the figures of a refresh cost about the same no
+matter how long the campaign has been running (only counting the runs of a
+slice in the store grows with it). The dashboard runs at the lowest
+scheduling priority so it can run on the benchmark host.
+"""
+import datetime
+import html
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib.pyplot as plt
+
+import experiment_driver
+import results_loader
+import results_store
+import visualization
+
+RESULTS_PATHS = ["../res/results.txt"]
+LIVE_PATH = "../vis/live"
+INDEX_PATH = f"{LIVE_PATH}/index.html"
+
+# Seconds between two refreshes of the results and of the page in the browser
+REFRESH_SECONDS = 30
+MAX_SLICES_PER_REFRESH = 4
+
+# Runs per block size, input size and host the KDE figures are estimated from
+MAX_KDE_RUNS = 1000
+
+# Scheduling priority of the dashboard (19 is the lowest) and the core it is
+# pinned to (None leaves the affinity unchanged), away from the benchmark runs
+NICENESS = 19
+DASHBOARD_CPU = None
+
+
+def new_state(results_path):
+    """Function to create the state of a followed results file"""
+    return {
+        "Results_Path": results_path,
+        "Store": None,
+        "Runs": 0,
+        "Pending": set(),
+        "Figures": {},
+        "Updated": None,
+    }
+
+
+def affected_slices(connection, new_runs):
+    """
+    Function to get the sort option, host and file seed slices of the last
+    new_runs runs of a store, including the global slices over all hosts
+    and file seeds they belong to
+    """
+    rows = connection.execute(
+        "SELECT DISTINCT Sort_Option, Host_Name, File_Seed FROM runs "
+        "WHERE rowid > (SELECT MAX(rowid) FROM runs) - ?",
+        (new_runs,),
+    ).fetchall()
+    slices = set()
+    for sort_option, host_name, file_seed in rows:
+        for host in [host_name, "-1"]:
+            for seed in [file_seed, -1]:
+                slices.add((sort_option, host, seed))
+    return slices
+
+
+def slice_priority(key):
+    """
+    Function to order the pending slices: the global slices first, since they
+    change with every new run, then the slices of the hosts and file seeds
+    """
+    _, host_name, file_seed = key
+    return (host_name != "-1", file_seed != -1, str(key))
+
+
+def live_file_name(results_path, prefix, sort_option, host_name, file_seed):
+    """Function to get the dashboard file of a figure of a slice"""
+    name = os.path.basename(
+        visualization.slice_file_name(prefix, "html", sort_option, host_name, file_seed)
+    )
+    stem = os.path.splitext(os.path.basename(results_path))[0]
+    return os.path.join(LIVE_PATH, f"{stem}_{name}")
+
+
+def replace_file(path, write):
+    """
+    Function to write a file under a temporary name and rename it, so the
+    browser never loads a partially written page
+    """
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix=".html.tmp"
+    )
+    os.close(descriptor)
+    try:
+        write(temp_path)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def render_live_slice(connection, results_path, sort_option, host_name, file_seed):
+    """
+    Function to render the median/IQR figure (from the quantile sketches) and
+    the KDE figure (from at most MAX_KDE_RUNS runs per group) of a slice into
+    the dashboard directory. Returns their paths, or None for a slice without
+    runs.
+    """
+    df_slice = visualization.select_slice(
+        connection, sort_option, host_name, file_seed, MAX_KDE_RUNS
+    )
+    if df_slice.empty:
+        return None
+    block_sizes = df_slice["Block_Size"].unique()
+    summary = visualization.slice_summary(connection, sort_option, host_name, file_seed)
+    if visualization.FILTER_OUTLIERS:
+        df_slice = visualization.filter_outliers(df_slice, summary)
+
+    figures = {
+        "visualization": visualization.median_figure(
+            summary, visualization.block_size_palette(block_sizes, "husl"), host_name
+        ),
+        "kde_plot": visualization.kde_figure(
+            df_slice,
+            visualization.block_size_palette(block_sizes, "Reds"),
+            visualization.block_size_palette(block_sizes, "Blues"),
+        ),
+    }
+    paths = []
+    for prefix, fig in figures.items():
+        path = live_file_name(results_path, prefix, sort_option, host_name, file_seed)
+        # Reference one shared plotly.js file instead of embedding it
+        replace_file(
+            path,
+            lambda temp_path: fig.write_html(temp_path, include_plotlyjs="directory"),
+        )
+        paths.append(path)
+    return paths
+
+
+def ingest_state(state):
+    """
+    Function to ingest the new runs of a followed results file (if it exists
+    yet) and mark the slices they belong to as pending, all slices when the
+    file is seen for the first time
+    """
+    if not os.path.exists(state["Results_Path"]):
+        return
+    opened = state["Store"] is None
+    if opened:
+        state["Store"] = results_store.open_store(
+            results_store.store_path(state["Results_Path"])
+        )
+    new_runs = results_store.ingest(
+        state["Store"], state["Results_Path"], results_loader.HOST_ALIASES
+    )
+    if opened:
+        # Render the slices of the runs ingested before the dashboard started
+        new_runs = results_store.read_source(state["Store"])[2]
+    if new_runs:
+        state["Runs"] = results_store.read_source(state["Store"])[2]
+        state["Pending"] |= affected_slices(state["Store"], new_runs)
+        state["Updated"] = datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def render_pending(states, max_slices=MAX_SLICES_PER_REFRESH):
+    """
+    Function to render at most max_slices pending slices of all followed
+    results files, the others stay pending for the next refreshes
+    """
+    pending = sorted(
+        (slice_priority(key), index, key)
+        for index, state in enumerate(states)
+        for key in state["Pending"]
+    )
+    for _, index, key in pending[:max_slices]:
+        state = states[index]
+        state["Pending"].discard(key)
+        paths = render_live_slice(state["Store"], state["Results_Path"], *key)
+        if paths is not None:
+            state["Figures"][key] = paths
+
+
+def slice_title(sort_option, host_name, file_seed):
+    """Function to describe a slice, e.g. sort option 1, all hosts, seed 3"""
+    host = "all hosts" if host_name == "-1" else f"host {host_name}"
+    seed = "all file seeds" if file_seed == -1 else f"file seed {file_seed}"
+    return f"Sort option {sort_option}, {host}, {seed}"
+
+
+def progress_table(state):
+    """
+    Function to render the runs and the median external and classical wall
+    clock times of every configuration of a followed results file as a table
+    """
+    summary = results_store.query_quantiles(
+        state["Store"],
+        ["Sort_Option", "Host_Name", "Input_Size", "Block_Size"],
+        visualization.KDE_COLUMNS,
+        quantiles=(0.5,),
+    )
+    runs = results_store.query_summaries(
+        state["Store"],
+        group_by=["Sort_Option", "Host_Name", "Input_Size", "Block_Size"],
+    ).set_index(["Sort_Option", "Host_Name", "Input_Size", "Block_Size"])["Runs"]
+    return summary.join(runs).reset_index().to_html(index=False, float_format="%.6f")
+
+
+def write_index(states, campaign=None, index_path=INDEX_PATH):
+    """
+    Function to write the dashboard page, which reloads itself every
+    REFRESH_SECONDS: the progress of the campaign, a table of the
+    configurations and the figures of all rendered slices
+    """
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<meta http-equiv='refresh' content='{REFRESH_SECONDS}'>",
+        "<title>Benchmark Campaign</title></head><body>",
+        "<h1>Benchmark Campaign</h1>",
+        f"<p>Page written {datetime.datetime.now().isoformat(timespec='seconds')}</p>",
+    ]
+    if campaign is not None:
+        parts.append(
+            f"<p>{campaign['Completed']} of {campaign['Cells']} cells completed</p>"
+        )
+    for state in states:
+        parts.append(f"<h2>{html.escape(state['Results_Path'])}</h2>")
+        if state["Store"] is None:
+            parts.append("<p>No results yet</p>")
+            continue
+        parts.append(
+            f"<p>{state['Runs']} runs, last new run seen {state['Updated']}, "
+            f"{len(state['Pending'])} slices waiting to be rendered</p>"
+        )
+        parts.append(progress_table(state))
+        for key in sorted(state["Figures"], key=slice_priority):
+            parts.append(f"<h3>{html.escape(slice_title(*key))}</h3>")
+            for path in state["Figures"][key]:
+                parts.append(
+                    f"<iframe src='{html.escape(os.path.basename(path))}' "
+                    "width='49%' height='500' frameborder='0'></iframe>"
+                )
+    parts.append("</body></html>")
+
+    def write(temp_path):
+        with open(temp_path, "w", encoding="utf8") as f:
+            f.write("\n".join(parts))
+
+    replace_file(index_path, write)
+
+
+def campaign_progress(matrix_path):
+    """Function to count the completed cells of an experiment matrix"""
+    matrix = experiment_driver.load_matrix(matrix_path)
+    return {
+        "Completed": len(
+            experiment_driver.completed_cells(
+                experiment_driver.ledger_path(matrix_path)
+            )
+        ),
+        "Cells": len(experiment_driver.experiment_cells(matrix)),
+    }
+
+
+def matrix_results_paths(matrix_path):
+    """Function to get the results files written by an experiment matrix"""
+    matrix = experiment_driver.load_matrix(matrix_path)
+    return sorted(
+        {
+            experiment_driver.cell_results_path(matrix, {"Distribution": distribution})
+            for distribution in matrix["distributions"]
+        }
+    )
+
+
+def watch(
+    results_paths=RESULTS_PATHS,
+    matrix_path=None,
+    max_slices=MAX_SLICES_PER_REFRESH,
+    refreshes=None,
+):
+    """
+    Function to follow results files (or the results files of an experiment
+    matrix) and refresh the dashboard every REFRESH_SECONDS, forever or for
+    the given number of refreshes
+    """
+    os.nice(NICENESS)
+    if DASHBOARD_CPU is not None:
+        os.sched_setaffinity(0, {DASHBOARD_CPU})
+    plt.switch_backend("Agg")
+    os.makedirs(LIVE_PATH, exist_ok=True)
+    if matrix_path is not None:
+        results_paths = matrix_results_paths(matrix_path)
+    states = [new_state(path) for path in results_paths]
+
+    refresh = 0
+    while refreshes is None or refresh < refreshes:
+        start = time.perf_counter()
+        for state in states:
+            ingest_state(state)
+        render_pending(states, max_slices)
+        campaign = campaign_progress(matrix_path) if matrix_path else None
+        write_index(states, campaign)
+        elapsed = time.perf_counter() - start
+        print(f"Refreshed {INDEX_PATH} in {elapsed:.3f} s")
+        refresh += 1
+        if refreshes is None or refresh < refreshes:
+            time.sleep(max(REFRESH_SECONDS - elapsed, 0))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1].endswith(".json"):
+        watch(matrix_path=sys.argv[1])
+    else:
+        watch(sys.argv[1:] or RESULTS_PATHS)
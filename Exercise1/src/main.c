@@ -4,7 +4,8 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
-#include <sys/time.h> // For run time performance metric
+#include <sys/resource.h> // For the peak resident set size of the trace
+#include <sys/time.h>     // For run time performance metric
 #include <time.h>     // For run time performance metric
 #include <unistd.h>   // For acquiring the host name
 
@@ -15,6 +16,76 @@
 #define GLOBAL_STEP 0
 #define BREAKPOINT_FAILED 1
 #define NUM_THREADS 4
+#define TRACE_PATH "../res/trace.jsonl"
+
+// Calls and bytes of the I/O of the current phase, counted by the traced_*
+// wrappers, and the CPU time of the internal sort in initial_partition
+struct io_counters {
+  long freads, fwrites, fseeks;
+  long long bytes_read, bytes_written;
+  double sort_cpu;
+};
+static struct io_counters io_counters;
+static struct timeval phase_start_wall;
+static clock_t phase_start_cpu;
+
+size_t traced_fread(void *buffer, size_t size, size_t count, FILE *fp) {
+  size_t read = fread(buffer, size, count, fp);
+  io_counters.freads++;
+  io_counters.bytes_read += (long long)(read * size);
+  return read;
+}
+
+size_t traced_fwrite(const void *buffer, size_t size, size_t count, FILE *fp) {
+  size_t written = fwrite(buffer, size, count, fp);
+  io_counters.fwrites++;
+  io_counters.bytes_written += (long long)(written * size);
+  return written;
+}
+
+int traced_fseek(FILE *fp, long offset, int whence) {
+  io_counters.fseeks++;
+  return fseek(fp, offset, whence);
+}
+
+double seconds_between(struct timeval *start, struct timeval *end) {
+  return (end->tv_sec - start->tv_sec) +
+         (end->tv_usec - start->tv_usec) / 1000000.0;
+}
+
+void start_phase() {
+  memset(&io_counters, 0, sizeof(io_counters));
+  gettimeofday(&phase_start_wall, NULL);
+  phase_start_cpu = clock();
+}
+
+// Append one JSON line with the times (relative to run_start) and the I/O
+// counters of the phase that started with the last start_phase(), and the peak
+// RSS of the process so far (ru_maxrss never decreases, so it is cumulative)
+void end_phase(FILE *trace_fp, const char *run_fields, const char *phase,
+               int round, struct timeval *run_start) {
+  clock_t end_cpu = clock();
+  struct timeval end_wall;
+  gettimeofday(&end_wall, NULL);
+  if (trace_fp == NULL) {
+    return;
+  }
+  struct rusage usage;
+  getrusage(RUSAGE_SELF, &usage);
+  fprintf(trace_fp,
+          "{%s, \"Phase\": \"%s\", \"Round\": %d, \"Start\": %.6f, "
+          "\"End\": %.6f, \"CPU\": %.6f, \"Sort_CPU\": %.6f, "
+          "\"Freads\": %ld, \"Fwrites\": %ld, \"Fseeks\": %ld, "
+          "\"Bytes_Read\": %lld, \"Bytes_Written\": %lld, "
+          "\"Process_Peak_RSS_KB\": %ld}\n",
+          run_fields, phase, round,
+          seconds_between(run_start, &phase_start_wall),
+          seconds_between(run_start, &end_wall),
+          ((double)(end_cpu - phase_start_cpu)) / CLOCKS_PER_SEC,
+          io_counters.sort_cpu, io_counters.freads, io_counters.fwrites,
+          io_counters.fseeks, io_counters.bytes_read, io_counters.bytes_written,
+          usage.ru_maxrss);
+}
 
 int compare_ints(const void *a, const void *b) {
   int int_a = *((int *)a);
@@ -94,8 +165,8 @@ void merge_round(char *input_file, char *output_file, long input_size,
           printf("SPECIAL (one-sided): i: %d, i_1: %d\n", i, i_1);
 #endif
 
-          fseek(input_fp, (i - (i % block_size)) * sizeof(int), SEEK_SET);
-          fread(buffer_1, sizeof(int), i_1 - i + (i % block_size), input_fp);
+          traced_fseek(input_fp, (i - (i % block_size)) * sizeof(int), SEEK_SET);
+          traced_fread(buffer_1, sizeof(int), i_1 - i + (i % block_size), input_fp);
 
 #if DEBUG
           printf("SPECIAL (one-sided): Buffer 1: ");
@@ -125,7 +196,7 @@ void merge_round(char *input_file, char *output_file, long input_size,
 #endif
 
             if (k % block_size == 0) {
-              fwrite(output_buffer, sizeof(int), block_size, output_fp);
+              traced_fwrite(output_buffer, sizeof(int), block_size, output_fp);
 #if DEBUG
               printf("SPECIAL (one-sided): Wrote to output file\n");
               printf("SPECIAL (one-sided): Output Buffer: ");
@@ -150,7 +221,7 @@ void merge_round(char *input_file, char *output_file, long input_size,
         // Write remaining data in output_buffer if k is not a multiple of
         // block_size
         if (k % block_size != 0) {
-          fwrite(output_buffer, sizeof(int), k % block_size, output_fp);
+          traced_fwrite(output_buffer, sizeof(int), k % block_size, output_fp);
 #if DEBUG
           printf("SPECIAL (one-sided): Wrote remaining to output file\n");
           printf("SPECIAL (one-sided): Output Buffer: ");
@@ -182,8 +253,8 @@ void merge_round(char *input_file, char *output_file, long input_size,
 #if DEBUG
           printf("SPECIAL (one-sided): j: %d, j_1: %d\n", j, j_1);
 #endif
-          fseek(input_fp, (j - (j % block_size)) * sizeof(int), SEEK_SET);
-          fread(buffer_2, sizeof(int), j_1 - j + (j % block_size), input_fp);
+          traced_fseek(input_fp, (j - (j % block_size)) * sizeof(int), SEEK_SET);
+          traced_fread(buffer_2, sizeof(int), j_1 - j + (j % block_size), input_fp);
 
 #if DEBUG
           printf("SPECIAL (one-sided): Buffer 2: ");
@@ -213,7 +284,7 @@ void merge_round(char *input_file, char *output_file, long input_size,
 #endif
 
             if (k % block_size == 0) {
-              fwrite(output_buffer, sizeof(int), block_size, output_fp);
+              traced_fwrite(output_buffer, sizeof(int), block_size, output_fp);
 #if DEBUG
               printf("SPECIAL (one-sided): Wrote to output file\n");
               printf("SPECIAL (one-sided): Output Buffer: ");
@@ -239,7 +310,7 @@ void merge_round(char *input_file, char *output_file, long input_size,
         // Write remaining data in output_buffer if k is not a multiple of
         // block_size
         if (k % block_size != 0) {
-          fwrite(output_buffer, sizeof(int), k % block_size, output_fp);
+          traced_fwrite(output_buffer, sizeof(int), k % block_size, output_fp);
 #if DEBUG
           printf("SPECIAL (one-sided): Wrote remaining to output file\n");
           printf("SPECIAL (one-sided): Output Buffer: ");
@@ -282,8 +353,8 @@ void merge_round(char *input_file, char *output_file, long input_size,
 #if DEBUG
       printf("i: %d, i_1: %d\n", i, i_1);
 #endif
-      fseek(input_fp, (i - (i % block_size)) * sizeof(int), SEEK_SET);
-      fread(buffer_1, sizeof(int), i_1 - i + (i % block_size), input_fp);
+      traced_fseek(input_fp, (i - (i % block_size)) * sizeof(int), SEEK_SET);
+      traced_fread(buffer_1, sizeof(int), i_1 - i + (i % block_size), input_fp);
 #if DEBUG
       printf("j: %d, j_1: %d\n", j, j_1);
 #endif
@@ -294,8 +365,8 @@ void merge_round(char *input_file, char *output_file, long input_size,
       printf("j: %d, j_1: %d\n", j, j_1);
 #endif
 
-      fseek(input_fp, (j - (j % block_size)) * sizeof(int), SEEK_SET);
-      fread(buffer_2, sizeof(int), j_1 - j + (j % block_size), input_fp);
+      traced_fseek(input_fp, (j - (j % block_size)) * sizeof(int), SEEK_SET);
+      traced_fread(buffer_2, sizeof(int), j_1 - j + (j % block_size), input_fp);
 #if DEBUG
       printf("Buffer 1: ");
       for (int b = 0; b < block_size; b++) {
@@ -336,7 +407,7 @@ void merge_round(char *input_file, char *output_file, long input_size,
         k++;
 
         if (k % block_size == 0) {
-          fwrite(output_buffer, sizeof(int), block_size, output_fp);
+          traced_fwrite(output_buffer, sizeof(int), block_size, output_fp);
 #if DEBUG
           printf("Wrote to output file\n");
           printf("Output Buffer: ");
@@ -405,8 +476,8 @@ void merge_round(char *input_file, char *output_file, long input_size,
 #if DEBUG
     printf("i: %d, i_1: %d\n", i, i_1);
 #endif
-    fseek(input_fp, (i - (i % block_size)) * sizeof(int), SEEK_SET);
-    fread(buffer_1, sizeof(int), i_1 - i + (i % block_size), input_fp);
+    traced_fseek(input_fp, (i - (i % block_size)) * sizeof(int), SEEK_SET);
+    traced_fread(buffer_1, sizeof(int), i_1 - i + (i % block_size), input_fp);
 #if DEBUG
     printf("j: %d, j_1: %d\n", j, j_1);
 #endif
@@ -415,7 +486,7 @@ void merge_round(char *input_file, char *output_file, long input_size,
       i++;
       k++;
       if (k % block_size == 0) {
-        fwrite(output_buffer, sizeof(int), block_size, output_fp);
+        traced_fwrite(output_buffer, sizeof(int), block_size, output_fp);
 #if DEBUG
         printf("Wrote remaining to output file\n");
         printf("Output Buffer: ");
@@ -454,7 +525,7 @@ void merge_round(char *input_file, char *output_file, long input_size,
       j++;
       k++;
       if (k % block_size == 0) {
-        fwrite(output_buffer, sizeof(int), block_size, output_fp);
+        traced_fwrite(output_buffer, sizeof(int), block_size, output_fp);
 #if DEBUG
         printf("Wrote remaining to output file\n");
         printf("Output Buffer: ");
@@ -474,8 +545,8 @@ void merge_round(char *input_file, char *output_file, long input_size,
 #if DEBUG
     printf("j: %d, j_1: %d\n", j, j_1);
 #endif
-    fseek(input_fp, (j - (j % block_size)) * sizeof(int), SEEK_SET);
-    fread(buffer_2, sizeof(int), j_1 - j + (j % block_size), input_fp);
+    traced_fseek(input_fp, (j - (j % block_size)) * sizeof(int), SEEK_SET);
+    traced_fread(buffer_2, sizeof(int), j_1 - j + (j % block_size), input_fp);
 #if DEBUG
     printf("j: %d, j_1: %d\n", j, j_1);
 #endif
@@ -513,7 +584,7 @@ void merge_round(char *input_file, char *output_file, long input_size,
 #endif
   // Write remaining data in output_buffer if k is not a multiple of block_size
   if (k % block_size != 0) {
-    fwrite(output_buffer, sizeof(int), k % block_size, output_fp);
+    traced_fwrite(output_buffer, sizeof(int), k % block_size, output_fp);
 #if DEBUG
     printf("Wrote remaining to output file\n");
     printf("Output Buffer: ");
@@ -545,8 +616,9 @@ int initial_partition(char *input_file, char *output_file, int block_size,
   }
   int merge_rounds = 0;
   size_t size;
-  while ((size = fread(buffer, sizeof(int), block_size * blocks_in_memory,
+  while ((size = traced_fread(buffer, sizeof(int), block_size * blocks_in_memory,
                        f_in)) > 0) {
+    clock_t sort_start = clock();
     if (internal_sort_option == 0) {
       merge_rounds = classical_merge_sort(buffer, (int)size);
     } else if (internal_sort_option == 1) {
@@ -554,7 +626,8 @@ int initial_partition(char *input_file, char *output_file, int block_size,
     } else if (internal_sort_option == 2) {
       qsort(buffer, size, sizeof(int), compare_binary);
     }
-    fwrite(buffer, sizeof(int), size, f_out);
+    io_counters.sort_cpu += ((double)(clock() - sort_start)) / CLOCKS_PER_SEC;
+    traced_fwrite(buffer, sizeof(int), size, f_out);
   }
 
   free(buffer);
@@ -839,6 +912,187 @@ void test_merge_round() {
   }
 }
 
+int run_configuration(int file_count, long input_size, int block_size,
+                      int internal_sort_option, long max_classical,
+                      int blocks_in_memory, const char *bin_dir,
+                      const char *result_path, const char *trace_path,
+                      int generate_input) {
+  // The input and output files of the run are placed in bin_dir
+  char input_path[4096], output_path[4096];
+  snprintf(input_path, sizeof(input_path), "%s/input.bin", bin_dir);
+  snprintf(output_path, sizeof(output_path), "%s/output.bin", bin_dir);
+
+  long stream_block_size = blocks_in_memory * block_size;
+
+  // Otherwise the input file was placed in bin_dir, e.g. by the experiment
+  // driver from the cached inputs of src/input_generator.py
+  if (generate_input) {
+    // Set random seed for current input file
+    srand(file_count);
+
+    // Create input file
+    FILE *input_fp = fopen(input_path, "wb");
+    if (input_fp == NULL) {
+      printf("Error opening input file.\n");
+      return 1;
+    }
+
+    // Create input file {
+    for (long long i = 0; i < input_size; i++) {
+      int random_number = rand();
+      fwrite(&random_number, sizeof(int), 1, input_fp);
+    }
+    fclose(input_fp);
+    // Create input file }
+  }
+
+  char *input_file = input_path;
+  char *output_file = output_path;
+
+  struct timeval start_wall, end_wall, classical_start_wall, classical_end_wall;
+  clock_t start_cpu, end_cpu, classical_start_cpu, classical_end_cpu;
+  long seconds, useconds, classical_seconds, classical_useconds;
+  double elapsed_wall, elapsed_cpu, classical_elapsed_wall,
+      classical_elapsed_cpu;
+
+  // Get host name
+  char hostname[256];
+  if (gethostname(hostname, sizeof(hostname)) != 0) {
+    perror("Error getting hostname");
+    exit(1);
+  }
+
+  // Every phase appends a line to the trace, identified by these fields
+  FILE *trace_fp = NULL;
+  if (trace_path != NULL) {
+    trace_fp = fopen(trace_path, "a");
+    if (trace_fp == NULL) {
+      printf("Error opening trace file.\n");
+      return 1;
+    }
+  }
+  struct timeval run_start;
+  gettimeofday(&run_start, NULL);
+  char run_fields[512];
+  snprintf(run_fields, sizeof(run_fields),
+           "\"File_Seed\": %d, \"Input_Size\": %ld, \"Block_Size\": %d, "
+           "\"Sort_Option\": %d, \"Host_Name\": \"%s\", "
+           "\"Run_Start\": %ld.%06ld",
+           file_count, input_size, block_size, internal_sort_option, hostname,
+           (long)run_start.tv_sec, (long)run_start.tv_usec);
+
+  // Run classical merge sort if the input file is small enough
+  int classical_merge_rounds = 0;
+  if (input_size <= max_classical) {
+    // Measure time
+    gettimeofday(&classical_start_wall, NULL);
+    classical_start_cpu = clock();
+    start_phase();
+    classical_merge_rounds =
+        initial_partition(input_file, output_file, input_size,
+                          1 /* block(s) in memory */, input_size, 0);
+    end_phase(trace_fp, run_fields, "Classical", 0, &run_start);
+    // Measure time
+    classical_end_cpu = clock();
+    gettimeofday(&classical_end_wall, NULL);
+    classical_seconds = classical_end_wall.tv_sec - classical_start_wall.tv_sec;
+    classical_useconds =
+        classical_end_wall.tv_usec - classical_start_wall.tv_usec;
+    classical_elapsed_wall = classical_seconds + classical_useconds / 1000000.0;
+    classical_elapsed_cpu =
+        ((double)(classical_end_cpu - classical_start_cpu)) / CLOCKS_PER_SEC;
+  } else {
+    classical_elapsed_wall = nan("0");
+    classical_elapsed_cpu = nan("0");
+  }
+
+  // Measure time
+  gettimeofday(&start_wall, NULL);
+  start_cpu = clock();
+
+  // Perform phase 1
+  start_phase();
+  initial_partition(input_file, output_file, block_size, blocks_in_memory,
+                    input_size, internal_sort_option);
+  end_phase(trace_fp, run_fields, "Initial_Partition", 0, &run_start);
+
+  start_phase();
+  clear_file(input_file);
+  end_phase(trace_fp, run_fields, "Clear_File", 0, &run_start);
+
+  // Switch roles of input_file and output_file
+  char *temp_fp = input_file;
+  input_file = output_file;
+  output_file = temp_fp;
+
+  int merge_rounds = 0;
+
+  // Perform phase 2
+  while (stream_block_size < input_size) {
+    merge_rounds++;
+    start_phase();
+    merge_round(input_file, output_file, input_size, stream_block_size,
+                block_size);
+    end_phase(trace_fp, run_fields, "Merge_Round", merge_rounds, &run_start);
+
+    // Clear contents of the first parameter file
+    start_phase();
+    FILE *input_fp = fopen(input_file, "wb");
+    if (input_fp == NULL) {
+      printf("Error opening input file.\n");
+      return 1;
+    }
+    fclose(input_fp);
+    end_phase(trace_fp, run_fields, "Clear_File", merge_rounds, &run_start);
+
+    // Switch roles of input_file and output_file
+    char *temp_fp = input_file;
+    input_file = output_file;
+    output_file = temp_fp;
+
+    stream_block_size *= 2;
+  }
+
+  // Measure time
+  end_cpu = clock();
+  gettimeofday(&end_wall, NULL);
+  seconds = end_wall.tv_sec - start_wall.tv_sec;
+  useconds = end_wall.tv_usec - start_wall.tv_usec;
+  elapsed_wall = seconds + useconds / 1000000.0;
+  elapsed_cpu = ((double)(end_cpu - start_cpu)) / CLOCKS_PER_SEC;
+
+  if (trace_fp != NULL) {
+    fclose(trace_fp);
+  }
+
+  printf("%15d,%15ld,%15ld,%15.2f MB,%15.2f "
+         "MB,%15.6f,%15.6f,%15.6f,%15.6f,%15d,%15d,%15d,%25s\n",
+         file_count, (long)input_size, (long)block_size, input_size / 250000.0,
+         block_size / 250000.0, elapsed_wall, elapsed_cpu,
+         classical_elapsed_wall, classical_elapsed_cpu, merge_rounds,
+         classical_merge_rounds, internal_sort_option, hostname);
+
+  // Append to result file (the experiment driver collects stdout instead)
+  if (result_path == NULL) {
+    return 0;
+  }
+  FILE *file;
+  file = fopen(result_path, "a");
+  if (file == NULL) {
+    printf("Error opening file.\n");
+    exit(1);
+  }
+  fprintf(file,
+          "%15d,%15ld,%15ld,%15.2f MB,%15.2f "
+          "MB,%15.6f,%15.6f,%15.6f,%15.6f,%15d,%15d,%15d,%25s\n",
+          file_count, (long)input_size, (long)block_size, input_size / 250000.0,
+          block_size / 250000.0, elapsed_wall, elapsed_cpu,
+          classical_elapsed_wall, classical_elapsed_cpu, merge_rounds,
+          classical_merge_rounds, internal_sort_option, hostname);
+  fclose(file);
+  return 0;
+}
+
 void perform_analysis() {
   /**
    * These are some relevant input sizes
@@ -951,141 +1205,13 @@ void perform_analysis() {
           }
           */
           for (int run = 0; run < num_runs_on_file; run++) {
-            // Set random seed for current input file
-            srand(file_count);
-
-            // Create input file
-            FILE *input_fp = fopen("../bin/input.bin", "wb");
-            if (input_fp == NULL) {
-              printf("Error opening input file.\n");
+            if (run_configuration(file_count, input_size, block_size,
+                                  internal_sort_option, max_classical,
+                                  blocks_in_memory, "../bin",
+                                  "../res/results.txt", TRACE_PATH,
+                                  1) != 0) {
               return;
             }
-
-            long stream_block_size = blocks_in_memory * block_size;
-
-            // Create input file {
-            for (long long i = 0; i < input_size; i++) {
-              int random_number = rand();
-              fwrite(&random_number, sizeof(int), 1, input_fp);
-            }
-            fclose(input_fp);
-            // Create input file }
-
-            char *input_file = "../bin/input.bin";
-            char *output_file = "../bin/output.bin";
-
-            struct timeval start_wall, end_wall, classical_start_wall,
-                classical_end_wall;
-            clock_t start_cpu, end_cpu, classical_start_cpu, classical_end_cpu;
-            long seconds, useconds, classical_seconds, classical_useconds;
-            double elapsed_wall, elapsed_cpu, classical_elapsed_wall,
-                classical_elapsed_cpu;
-
-            // Run classical merge sort if the input file is small enough
-            int classical_merge_rounds = 0;
-            if (input_size <= max_classical) {
-              // Measure time
-              gettimeofday(&classical_start_wall, NULL);
-              classical_start_cpu = clock();
-              classical_merge_rounds =
-                  initial_partition(input_file, output_file, input_size,
-                                    1 /* block(s) in memory */, input_size, 0);
-              // Measure time
-              classical_end_cpu = clock();
-              gettimeofday(&classical_end_wall, NULL);
-              classical_seconds =
-                  classical_end_wall.tv_sec - classical_start_wall.tv_sec;
-              classical_useconds =
-                  classical_end_wall.tv_usec - classical_start_wall.tv_usec;
-              classical_elapsed_wall =
-                  classical_seconds + classical_useconds / 1000000.0;
-              classical_elapsed_cpu =
-                  ((double)(classical_end_cpu - classical_start_cpu)) /
-                  CLOCKS_PER_SEC;
-            } else {
-              classical_elapsed_wall = nan("0");
-              classical_elapsed_cpu = nan("0");
-            }
-
-            // Measure time
-            gettimeofday(&start_wall, NULL);
-            start_cpu = clock();
-
-            // Perform phase 1
-            initial_partition(input_file, output_file, block_size,
-                              blocks_in_memory, input_size,
-                              internal_sort_option);
-
-            clear_file(input_file);
-
-            // Switch roles of input_file and output_file
-            char *temp_fp = input_file;
-            input_file = output_file;
-            output_file = temp_fp;
-
-            int merge_rounds = 0;
-
-            // Perform phase 2
-            while (stream_block_size < input_size) {
-              merge_rounds++;
-              merge_round(input_file, output_file, input_size,
-                          stream_block_size, block_size);
-
-              // Clear contents of the first parameter file
-              FILE *input_fp = fopen(input_file, "wb");
-              if (input_fp == NULL) {
-                printf("Error opening input file.\n");
-                return;
-              }
-              fclose(input_fp);
-
-              // Switch roles of input_file and output_file
-              char *temp_fp = input_file;
-              input_file = output_file;
-              output_file = temp_fp;
-
-              stream_block_size *= 2;
-            }
-
-            // Measure time
-            end_cpu = clock();
-            gettimeofday(&end_wall, NULL);
-            seconds = end_wall.tv_sec - start_wall.tv_sec;
-            useconds = end_wall.tv_usec - start_wall.tv_usec;
-            elapsed_wall = seconds + useconds / 1000000.0;
-            elapsed_cpu = ((double)(end_cpu - start_cpu)) / CLOCKS_PER_SEC;
-
-            // Get host name
-            char hostname[256];
-            if (gethostname(hostname, sizeof(hostname)) != 0) {
-              perror("Error getting hostname");
-              exit(1);
-            }
-
-            printf("%15d,%15ld,%15ld,%15.2f MB,%15.2f "
-                   "MB,%15.6f,%15.6f,%15.6f,%15.6f,%15d,%15d,%15d,%25s\n",
-                   file_count, (long)input_size, (long)block_size,
-                   input_size / 250000.0, block_size / 250000.0, elapsed_wall,
-                   elapsed_cpu, classical_elapsed_wall, classical_elapsed_cpu,
-                   merge_rounds, classical_merge_rounds, internal_sort_option,
-                   hostname);
-
-            // Append to result file
-            FILE *file;
-            file = fopen("../res/results.txt", "a");
-            if (file == NULL) {
-              printf("Error opening file.\n");
-              exit(1);
-            }
-            fprintf(file,
-                    "%15d,%15ld,%15ld,%15.2f MB,%15.2f "
-                    "MB,%15.6f,%15.6f,%15.6f,%15.6f,%15d,%15d,%15d,%25s\n",
-                    file_count, (long)input_size, (long)block_size,
-                    input_size / 250000.0, block_size / 250000.0, elapsed_wall,
-                    elapsed_cpu, classical_elapsed_wall, classical_elapsed_cpu,
-                    merge_rounds, classical_merge_rounds, internal_sort_option,
-                    hostname);
-            fclose(file);
 #if GLOBAL_STEP
             while (getchar() != '\n') {
             }
@@ -1097,7 +1223,25 @@ void perform_analysis() {
   }
 }
 
-int main() {
+int main(int argc, char *argv[]) {
+  // Run a single configuration, e.g. from the experiment driver
+  // (src/experiment_driver.py), which collects the result line from stdout and
+  // the trace from bin_dir/trace.jsonl
+  if (argc > 1) {
+    if (argc != 7 && argc != 8) {
+      printf("Usage: %s file_seed input_size block_size sort_option "
+             "max_classical bin_dir [generate_input]\n",
+             argv[0]);
+      return 1;
+    }
+    int generate_input = argc == 8 ? atoi(argv[7]) : 1;
+    char trace_path[4096];
+    snprintf(trace_path, sizeof(trace_path), "%s/trace.jsonl", argv[6]);
+    return run_configuration(atoi(argv[1]), atol(argv[2]), atoi(argv[3]),
+                             atoi(argv[4]), atol(argv[5]), 3, argv[6], NULL,
+                             trace_path, generate_input);
+  }
+
   int do_test = 0;
   do_test ? test_merge_round() : perform_analysis();
   return 0;
@@ -0,0 +1,172 @@
+"""
+Module for testing the run times of all groups of runs for normality at once.
+The moment based tests (Jarque-Bera, Anderson-Darling) are computed on arrays
+of all groups, the Shapiro-Wilk tests of the groups by a pool of processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2, norm, shapiro
+
+GROUP_KEYS = ["File_Seed", "Input_Size", "Block_Size"]
+METRICS = ["External_Wall_Clock_Time", "Classical_Wall_Clock_Time"]
+ALPHA = 0.05
+
+# Minimum number of runs of a group to be tested (required by Shapiro-Wilk)
+MIN_GROUP_SIZE = 3
+
+# None uses one worker per CPU, 1 tests everything in the current process
+NORMALITY_WORKERS = None
+GROUPS_PER_TASK = 256
+
+
+def sorted_groups(values, codes, n_groups):
+    """
+    Function to sort the values by group and by value within the groups.
+    Returns the sorted values and codes and the start and size of every group.
+    """
+    order = np.lexsort((values, codes))
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(sizes) - sizes
+    return values[order], codes[order], starts, sizes
+
+
+def moment_tests(values, codes, starts, sizes):
+    """
+    Function to compute skewness, excess kurtosis, and the Jarque-Bera and
+    Anderson-Darling statistics and p-values of all groups from the sorted
+    values (as scipy's jarque_bera and anderson, but for all groups at once)
+    """
+    n_groups = len(sizes)
+    counts = sizes.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.bincount(codes, weights=values, minlength=n_groups) / counts
+        deviations = values - means[codes]
+        moments = [
+            np.bincount(codes, weights=deviations**power, minlength=n_groups) / counts
+            for power in (2, 3, 4)
+        ]
+        skewness = moments[1] / moments[0] ** 1.5
+        kurtosis = moments[2] / moments[0] ** 2 - 3
+        jarque_bera = counts / 6 * (skewness**2 + kurtosis**2 / 4)
+
+        # Anderson-Darling: compare the sorted standardized values of every
+        # group with the ones mirrored at the group's median position
+        std_devs = np.sqrt(moments[0] * counts / (counts - 1))
+        standardized = deviations / std_devs[codes]
+        ranks = np.arange(len(values)) - starts[codes]
+        mirrored = starts[codes] + sizes[codes] - 1 - ranks
+        terms = (2 * ranks + 1) / counts[codes]
+        terms *= norm.logcdf(standardized) + norm.logsf(standardized[mirrored])
+        anderson = -counts - np.bincount(codes, weights=terms, minlength=n_groups)
+
+    return pd.DataFrame(
+        {
+            "Skewness": skewness,
+            "Kurtosis": kurtosis,
+            "Jarque_Bera_Statistic": jarque_bera,
+            "Jarque_Bera_p_value": chi2.sf(jarque_bera, 2),
+            "Anderson_Statistic": anderson,
+            "Anderson_p_value": anderson_p_values(anderson, counts),
+        }
+    )
+
+
+def anderson_p_values(statistics, counts):
+    """
+    Function to approximate the p-values of Anderson-Darling statistics for
+    normality with estimated mean and variance (D'Agostino and Stephens, 1986)
+    """
+    with np.errstate(invalid="ignore", over="ignore"):
+        adjusted = statistics * (1 + 0.75 / counts + 2.25 / counts**2)
+        return np.select(
+            [adjusted >= 0.6, adjusted >= 0.34, adjusted >= 0.2, adjusted < 0.2],
+            [
+                np.exp(1.2937 - 5.709 * adjusted + 0.0186 * adjusted**2),
+                np.exp(0.9177 - 4.279 * adjusted - 1.38 * adjusted**2),
+                1 - np.exp(-8.318 + 42.796 * adjusted - 59.938 * adjusted**2),
+                1 - np.exp(-13.436 + 101.14 * adjusted - 223.73 * adjusted**2),
+            ],
+            default=np.nan,
+        )
+
+
+def shapiro_p_values(groups):
+    """Function to compute the Shapiro-Wilk p-values of a batch of groups"""
+    return [shapiro(group).pvalue for group in groups]
+
+
+def shapiro_tests(groups, workers=NORMALITY_WORKERS):
+    """Function to compute the Shapiro-Wilk p-values of all groups in batches"""
+    batches = [
+        groups[start : start + GROUPS_PER_TASK]
+        for start in range(0, len(groups), GROUPS_PER_TASK)
+    ]
+    if workers == 1 or len(batches) <= 1:
+        p_values = map(shapiro_p_values, batches)
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            p_values = list(executor.map(shapiro_p_values, batches))
+    return np.array([p for batch in p_values for p in batch], dtype=np.float64)
+
+
+def normality_tests(df, metrics=None, keys=None, workers=NORMALITY_WORKERS):
+    """
+    Function to test the runs of every group and metric for normality with the
+    Shapiro-Wilk, Anderson-Darling and Jarque-Bera tests. Groups with less
+    than MIN_GROUP_SIZE runs or without variance are not tested (NaN p-values).
+    Returns one row per group and metric.
+    """
+    if metrics is None:
+        metrics = METRICS
+    if keys is None:
+        keys = GROUP_KEYS
+    values = df[keys + metrics].melt(
+        id_vars=keys, value_vars=metrics, var_name="Metric"
+    )
+    values = values.dropna(subset=["value"])
+    grouper = values.groupby(keys + ["Metric"], sort=True, observed=True)
+    groups = grouper.size().index.to_frame(index=False)
+
+    sorted_values, codes, starts, sizes = sorted_groups(
+        values["value"].to_numpy(np.float64),
+        grouper.ngroup().to_numpy(),
+        len(groups),
+    )
+    tests = groups.assign(Runs=sizes).join(
+        moment_tests(sorted_values, codes, starts, sizes)
+    )
+
+    testable = (sizes >= MIN_GROUP_SIZE) & (
+        sorted_values[starts + sizes - 1] > sorted_values[starts]
+    )
+    split = np.split(sorted_values, (starts + sizes)[:-1])
+    tests["Shapiro_p_value"] = np.nan
+    tests.loc[testable, "Shapiro_p_value"] = shapiro_tests(
+        [group for group, test in zip(split, testable) if test], workers
+    )
+    p_value_columns = ["Jarque_Bera_p_value", "Anderson_p_value"]
+    tests.loc[~testable, p_value_columns + ["Anderson_Statistic"]] = np.nan
+    return tests
+
+
+def normal_proportions(tests, test="Shapiro_p_value", alpha=ALPHA):
+    """
+    Function to compute the proportion of files (file seeds) on which the run
+    times are normally distributed according to a test, for every metric,
+    input size and block size
+    """
+    tested = tests.dropna(subset=[test])
+    return (
+        (tested[test] > alpha)
+        .groupby(
+            [tested["Metric"], tested["Input_Size"], tested["Block_Size"]],
+            sort=True,
+            observed=True,
+        )
+        .mean()
+        .rename("Proportion")
+        .reset_index()
+    )
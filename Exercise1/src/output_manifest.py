@@ -0,0 +1,59 @@
+"""
+Module for keying output artifacts by a hash of their exact input data and
+plotting parameters, so that only outputs whose inputs changed are rebuilt
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+
+def digest(*parts):
+    """
+    Function to hash the inputs of an artifact. DataFrame parts are hashed by
+    their values (independent of the index), all other parts by their JSON
+    representation.
+    """
+    sha = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            sha.update(",".join(map(str, part.columns)).encode("utf8"))
+            sha.update(pd.util.hash_pandas_object(part, index=False).to_numpy())
+        else:
+            sha.update(json.dumps(part, sort_keys=True, default=str).encode("utf8"))
+    return sha.hexdigest()
+
+
+def load_manifest(manifest_path):
+    """Function to load the artifact hashes of the last run, keyed by output path"""
+    try:
+        with open(manifest_path, "r", encoding="utf8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_path, manifest):
+    """Function to store the artifact hashes of the current run"""
+    with open(manifest_path, "w", encoding="utf8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+
+def is_current(manifest, output_paths, key):
+    """Function to check whether all outputs exist and were built from the same inputs"""
+    return all(
+        manifest.get(path) == key and os.path.exists(path) for path in output_paths
+    )
+
+
+def stale_outputs(manifest, current_outputs):
+    """
+    Function to list the outputs of earlier runs that the current run does not
+    produce anymore, e.g. of slices or groups without data
+    """
+    return sorted(
+        path
+        for path in manifest
+        if path not in current_outputs and os.path.exists(path)
+    )
@@ -0,0 +1,166 @@
+"""
+Module for verifying the output of the External Memory Merge Sort algorithm
+without a sorted reference copy. The output file is memory-mapped and checked
+for sortedness in large vectorized chunks, and input and output are compared by
+an order-independent hash of their multisets, computed in one streaming pass
+over each file.
+"""
+import concurrent.futures
+import os
+import shutil
+import time
+
+import numpy as np
+
+import external_merge_sort
+import input_generator
+
+INT_DTYPE = np.dtype("<i4")
+
+# Number of integers checked at once, and per task of a worker process
+CHUNK_ELEMENTS = 1 << 22
+# Number of integers hashed at once, so that the hashes stay in the CPU cache
+HASH_ELEMENTS = 1 << 16
+TASK_ELEMENTS = 1 << 27
+VERIFY_WORKERS = None
+
+# Constants of the splitmix64 finalizer
+MIX_INCREMENT = np.uint64(0x9E3779B97F4A7C15)
+MIX_MULTIPLIER_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_MULTIPLIER_2 = np.uint64(0x94D049BB133111EB)
+
+# Settings of the example run
+INPUT_SIZE = 10000000
+BLOCK_SIZE = 100000
+DISTRIBUTION = "uniform"
+SEED = 0
+INPUT_PATH = "../bin/input.bin"
+OUTPUT_PATH = "../bin/output.bin"
+
+
+def hash_sum(values):
+    """
+    Function to sum the 64-bit hashes (splitmix64 finalizer) of 32-bit integers
+    modulo 2^64. The hashes are computed in place in parts of HASH_ELEMENTS.
+    """
+    hashes = np.empty(min(len(values), HASH_ELEMENTS), dtype=np.uint64)
+    shifted = np.empty_like(hashes)
+    total = 0
+    for start in range(0, len(values), HASH_ELEMENTS):
+        part = values[start : start + HASH_ELEMENTS]
+        z, z_shifted = hashes[: len(part)], shifted[: len(part)]
+        z[...] = part.view(np.uint32)
+        z += MIX_INCREMENT
+        for shift, multiplier in [(30, MIX_MULTIPLIER_1), (27, MIX_MULTIPLIER_2)]:
+            np.right_shift(z, np.uint64(shift), out=z_shifted)
+            z ^= z_shifted
+            z *= multiplier
+        np.right_shift(z, np.uint64(31), out=z_shifted)
+        z ^= z_shifted
+        total += int(z.sum(dtype=np.uint64))
+    return total % 2**64
+
+
+def range_summary(path, start, stop, check_order, chunk_elements=CHUNK_ELEMENTS):
+    """
+    Function to summarize the elements start to stop of a file: the number of
+    elements, the sum of the element hashes and of the elements (both modulo
+    2^64, so they do not depend on the order) and, if check_order, the index of
+    the first element that is smaller than its predecessor (-1 if none)
+    """
+    values = np.memmap(path, dtype=INT_DTYPE, mode="r")
+    hashes = 0
+    value_sum = 0
+    first_descent = -1
+    previous = values[start - 1] if start > 0 else None
+    for chunk_start in range(start, stop, chunk_elements):
+        chunk = np.asarray(
+            values[chunk_start : min(chunk_start + chunk_elements, stop)]
+        )
+        hashes += hash_sum(chunk)
+        value_sum += int(chunk.sum(dtype=np.int64))
+        if check_order and first_descent < 0:
+            if previous is not None and chunk[0] < previous:
+                first_descent = chunk_start
+            else:
+                descents = chunk[1:] < chunk[:-1]
+                if descents.any():
+                    first_descent = chunk_start + 1 + int(np.argmax(descents))
+            previous = chunk[-1]
+    return {
+        "Size": stop - start,
+        "Hash_Sum": hashes % 2**64,
+        "Value_Sum": value_sum % 2**64,
+        "First_Descent": first_descent,
+    }
+
+
+def file_summary(path, check_order=False, workers=VERIFY_WORKERS):
+    """
+    Function to summarize a whole file, in ranges of TASK_ELEMENTS elements on
+    a pool of workers processes (in this process if workers is 1)
+    """
+    size = os.path.getsize(path) // INT_DTYPE.itemsize
+    tasks = [
+        (path, start, min(start + TASK_ELEMENTS, size), check_order)
+        for start in range(0, size, TASK_ELEMENTS)
+    ]
+    if workers == 1 or len(tasks) <= 1:
+        summaries = [range_summary(*task) for task in tasks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count()
+        ) as executor:
+            summaries = list(executor.map(range_summary, *zip(*tasks)))
+
+    descents = [s["First_Descent"] for s in summaries if s["First_Descent"] >= 0]
+    return {
+        "Size": size,
+        "Hash_Sum": sum(s["Hash_Sum"] for s in summaries) % 2**64,
+        "Value_Sum": sum(s["Value_Sum"] for s in summaries) % 2**64,
+        "First_Descent": min(descents) if descents else -1,
+    }
+
+
+def multiset_hash(path, workers=VERIFY_WORKERS):
+    """
+    Function to compute the order-independent hash of the integers of a file,
+    e.g. of an input file before the sort truncates it
+    """
+    summary = file_summary(path, check_order=False, workers=workers)
+    return summary["Size"], summary["Hash_Sum"], summary["Value_Sum"]
+
+
+def verify_output(input_hash, output_path, workers=VERIFY_WORKERS):
+    """
+    Function to check that the output file is sorted and holds the same
+    multiset as the input with the hash input_hash (from multiset_hash).
+    Returns the results of both checks, the first descent (-1 if none) and
+    the throughput.
+    """
+    start = time.perf_counter()
+    summary = file_summary(output_path, check_order=True, workers=workers)
+    elapsed = time.perf_counter() - start
+    output_hash = (summary["Size"], summary["Hash_Sum"], summary["Value_Sum"])
+    return {
+        "Output_Size": summary["Size"],
+        "Sorted": summary["First_Descent"] < 0,
+        "First_Descent": summary["First_Descent"],
+        "Same_Multiset": output_hash == tuple(input_hash),
+        "Elapsed": elapsed,
+        "MB_per_Second": summary["Size"] * INT_DTYPE.itemsize / 1e6 / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    cached_path = input_generator.cached_input(DISTRIBUTION, SEED, INPUT_SIZE)
+    input_hash = multiset_hash(cached_path)
+
+    shutil.copyfile(cached_path, INPUT_PATH)
+    result = external_merge_sort.external_merge_sort(
+        INPUT_PATH, OUTPUT_PATH, BLOCK_SIZE
+    )
+    print(verify_output(input_hash, result["Sorted_Path"]))
+
+    # A cached input is not sorted, but holds the same multiset as itself
+    print(verify_output(input_hash, cached_path))
@@ -0,0 +1,445 @@
+"""
+Module for simulating the page cache behaviour of the External Memory Merge
+Sort algorithm of main.c. The block accesses of the initial partition and of
+all merge rounds are generated as arrays and replayed against an LRU page cache
+with readahead and writeback of dirty pages, to predict the reads and writes of
+the storage device.
+"""
+import numpy as np
+import pandas as pd
+
+INT_SIZE = 4
+PAGE_SIZE = 4096
+BLOCKS_IN_MEMORY = 3
+
+# Page cache of 1 GiB, readahead window of 128 KiB (Linux default) and
+# writeback of the oldest dirty pages above 20 % of the page cache
+CACHE_PAGES = 262144
+READAHEAD_PAGES = 32
+DIRTY_RATIO = 0.2
+
+INPUT_FILE = 0
+OUTPUT_FILE = 1
+
+STAT_COLUMNS = [
+    "Read_Calls",
+    "Write_Calls",
+    "Pages_Read",
+    "Pages_Written",
+    "Cache_Hits",
+    "Device_Read_Requests",
+    "Device_Read_Pages",
+    "Device_Write_Pages",
+    "Discarded_Dirty_Pages",
+]
+
+# Kinds of the accesses of a trace, in the order they happen at the same time
+READ_1, READ_2, WRITE = 0, 1, 2
+
+
+def ragged_arange(counts):
+    """Function to concatenate np.arange(count) for all counts"""
+    counts = np.asarray(counts, dtype=np.int64)
+    ends = np.cumsum(counts)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts)
+
+
+def sequential_trace(input_size, chunk_size, file, write):
+    """Function to generate the accesses of reading or writing a file in chunks"""
+    starts = np.arange(0, input_size, chunk_size, dtype=np.int64)
+    return {
+        "file": np.full(len(starts), file),
+        "start": starts,
+        "end": np.minimum(starts + chunk_size, input_size),
+        "write": np.full(len(starts), write),
+    }
+
+
+def partition_trace(input_size, block_size, blocks_in_memory, input_file, output_file):
+    """
+    Function to generate the accesses of initial_partition: read blocks_in_memory
+    blocks, sort them in memory and write them to the output file
+    """
+    chunk_size = block_size * blocks_in_memory
+    starts = np.arange(0, input_size, chunk_size, dtype=np.int64)
+    ends = np.minimum(starts + chunk_size, input_size)
+    return {
+        "file": np.column_stack(
+            [np.full(len(starts), input_file), np.full(len(starts), output_file)]
+        ).ravel(),
+        "start": np.repeat(starts, 2),
+        "end": np.repeat(ends, 2),
+        "write": np.tile([False, True], len(starts)),
+    }
+
+
+def merge_round_trace(
+    input_size, block_size, stream_block_size, input_file, output_file
+):
+    """
+    Function to generate the accesses of merge_round, which merges pairs of
+    sorted runs of stream_block_size elements. Whenever one of the two input
+    blocks is used up, both input buffers are read again from the start of
+    their blocks (fseek to i - i % block_size), and the output buffer is
+    appended to the output file whenever it is full.
+
+    Which input block is used up first depends on the data. The trace assumes
+    the expected order for uniformly random data (as generated by main.c): the
+    b-th block of a run of length L is used up after b * block_size * (L1 + L2)
+    / L elements of the pair were merged.
+    """
+    pair_starts = np.arange(0, input_size, 2 * stream_block_size, dtype=np.int64)
+    length_1 = np.minimum(stream_block_size, input_size - pair_starts)
+    length_2 = np.clip(input_size - pair_starts - stream_block_size, 0, None)
+    length_2 = np.minimum(length_2, stream_block_size)
+    total = length_1 + length_2
+    blocks_1 = -(-length_1 // block_size)
+    blocks_2 = -(-length_2 // block_size)
+    pairs = np.arange(len(pair_starts))
+
+    # Refill events: the start of every pair and every used up block of a run
+    refill_1 = ragged_arange(blocks_1)
+    refill_2 = ragged_arange(np.maximum(blocks_2 - 1, 0)) + 1
+    event_pairs = np.concatenate(
+        [
+            np.repeat(pairs, blocks_1),
+            np.repeat(pairs, np.maximum(blocks_2 - 1, 0)),
+        ]
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        times = np.concatenate(
+            [
+                refill_1
+                * block_size
+                * total[np.repeat(pairs, blocks_1)]
+                / length_1[np.repeat(pairs, blocks_1)],
+                refill_2
+                * block_size
+                * total[np.repeat(pairs, np.maximum(blocks_2 - 1, 0))]
+                / length_2[np.repeat(pairs, np.maximum(blocks_2 - 1, 0))],
+            ]
+        )
+    # Current block of both runs at every refill event
+    current_1 = np.floor(times * length_1[event_pairs] / total[event_pairs])
+    current_1 = np.minimum(current_1 // block_size, blocks_1[event_pairs] - 1)
+    current_2 = np.floor(times * length_2[event_pairs] / total[event_pairs])
+    current_2 = np.minimum(current_2 // block_size, blocks_2[event_pairs] - 1)
+    current_1[: len(refill_1)] = refill_1
+    current_2[len(refill_1) :] = refill_2
+
+    read_1_start = pair_starts[event_pairs] + current_1.astype(np.int64) * block_size
+    read_1_end = np.minimum(
+        read_1_start + block_size, pair_starts[event_pairs] + length_1[event_pairs]
+    )
+    has_2 = blocks_2[event_pairs] > 0
+    run_2_start = pair_starts[event_pairs] + length_1[event_pairs]
+    read_2_start = run_2_start + np.maximum(current_2, 0).astype(np.int64) * block_size
+    read_2_end = np.minimum(
+        read_2_start + block_size, run_2_start + length_2[event_pairs]
+    )
+
+    # The output buffer is written whenever block_size elements were merged
+    blocks_out = -(-total // block_size)
+    write_pairs = np.repeat(pairs, blocks_out)
+    write_offsets = ragged_arange(blocks_out) * block_size
+    write_start = pair_starts[write_pairs] + write_offsets
+    write_end = np.minimum(
+        write_start + block_size, pair_starts[write_pairs] + total[write_pairs]
+    )
+
+    accesses = pd.DataFrame(
+        {
+            "pair": np.concatenate([event_pairs, event_pairs[has_2], write_pairs]),
+            "time": np.concatenate(
+                [
+                    times,
+                    times[has_2],
+                    (write_end - pair_starts[write_pairs]) - 0.5,
+                ]
+            ),
+            "kind": np.concatenate(
+                [
+                    np.full(len(times), READ_1),
+                    np.full(int(has_2.sum()), READ_2),
+                    np.full(len(write_pairs), WRITE),
+                ]
+            ),
+            "start": np.concatenate([read_1_start, read_2_start[has_2], write_start]),
+            "end": np.concatenate([read_1_end, read_2_end[has_2], write_end]),
+        }
+    )
+    order = np.lexsort(
+        (
+            accesses["kind"].to_numpy(),
+            accesses["time"].to_numpy(),
+            accesses["pair"].to_numpy(),
+        )
+    )
+    accesses = accesses.iloc[order]
+    write = accesses["kind"].to_numpy() == WRITE
+    return {
+        "file": np.where(write, output_file, input_file),
+        "start": accesses["start"].to_numpy(),
+        "end": accesses["end"].to_numpy(),
+        "write": write,
+    }
+
+
+def new_cache(file_pages, cache_pages, readahead_pages, dirty_pages):
+    """
+    Function to create an empty LRU page cache for two files of file_pages
+    pages. Every access of a page gives it a new, increasing stamp. The cache
+    holds the pages of the cache_pages most recent live stamps, the frontier is
+    the oldest stamp that can still be cached.
+    """
+    return {
+        "file_pages": file_pages,
+        "cache_pages": cache_pages,
+        "readahead_pages": readahead_pages,
+        "dirty_pages": dirty_pages,
+        "last_stamp": np.full(2 * file_pages, -1, dtype=np.int64),
+        "live": np.zeros(1 << 20, dtype=bool),
+        "dirty": np.zeros(1 << 20, dtype=bool),
+        "next_stamp": 0,
+        "frontier": 0,
+        "cached": 0,
+        "dirty_frontier": 0,
+        "dirty_count": 0,
+        "stats": dict.fromkeys(STAT_COLUMNS, 0),
+    }
+
+
+def scan_stamps(flags, start, stop, count):
+    """
+    Function to find the end of the range from start that contains count set
+    flags (or stop if there are less)
+    """
+    while start < stop and count > 0:
+        end = min(stop, start + 2 * count + 64)
+        found = np.cumsum(flags[start:end])
+        if len(found) and found[-1] >= count:
+            return start + int(np.searchsorted(found, count)) + 1
+        count -= int(found[-1]) if len(found) else 0
+        start = end
+    return start
+
+
+def evict(cache):
+    """Function to evict the least recently used pages above the cache size"""
+    excess = cache["cached"] - cache["cache_pages"]
+    if excess <= 0:
+        return
+    start = cache["frontier"]
+    end = scan_stamps(cache["live"], start, cache["next_stamp"], excess)
+    live = cache["live"][start:end]
+    written = int(np.count_nonzero(live & cache["dirty"][start:end]))
+    cache["stats"]["Device_Write_Pages"] += written
+    cache["dirty_count"] -= written
+    cache["cached"] -= int(np.count_nonzero(live))
+    cache["live"][start:end] = False
+    cache["dirty"][start:end] = False
+    cache["frontier"] = end
+
+
+def write_back(cache):
+    """Function to write the oldest dirty pages above the dirty limit back"""
+    excess = cache["dirty_count"] - cache["dirty_pages"]
+    if excess <= 0:
+        return
+    start = max(cache["dirty_frontier"], cache["frontier"])
+    end = scan_stamps(cache["dirty"], start, cache["next_stamp"], excess)
+    written = int(np.count_nonzero(cache["dirty"][start:end]))
+    cache["stats"]["Device_Write_Pages"] += written
+    cache["dirty_count"] -= written
+    cache["dirty"][start:end] = False
+    cache["dirty_frontier"] = end
+
+
+def touch(cache, pages, dirty):
+    """Function to access pages (in order), which makes them most recently used"""
+    if len(pages) == 0:
+        return
+    old = cache["last_stamp"][pages]
+    resident = old >= cache["frontier"]
+    resident_stamps = old[resident]
+    was_dirty = cache["dirty"][resident_stamps]
+    cache["live"][resident_stamps] = False
+    cache["dirty"][resident_stamps] = False
+
+    start = cache["next_stamp"]
+    end = start + len(pages)
+    if end > len(cache["live"]):
+        size = max(2 * len(cache["live"]), end)
+        for key in ["live", "dirty"]:
+            grown = np.zeros(size, dtype=bool)
+            grown[: len(cache[key])] = cache[key]
+            cache[key] = grown
+    new_dirty = (
+        np.ones(len(pages), dtype=bool) if dirty else np.zeros(len(pages), dtype=bool)
+    )
+    if not dirty:
+        new_dirty[resident] = was_dirty
+    cache["live"][start:end] = True
+    cache["dirty"][start:end] = new_dirty
+    cache["last_stamp"][pages] = np.arange(start, end)
+    cache["next_stamp"] = end
+    cache["cached"] += len(pages) - len(resident_stamps)
+    cache["dirty_count"] += int(np.count_nonzero(new_dirty)) - int(
+        np.count_nonzero(was_dirty)
+    )
+    evict(cache)
+    write_back(cache)
+
+
+def page_range(cache, file, start, end):
+    """Function to get the cache pages of the elements start to end of a file"""
+    first = start * INT_SIZE // PAGE_SIZE
+    last = (end * INT_SIZE - 1) // PAGE_SIZE
+    return file * cache["file_pages"] + np.arange(first, last + 1)
+
+
+def read(cache, file, start, end):
+    """
+    Function to read elements of a file through the cache. Every missing page
+    starts a device read of the readahead window from that page on.
+    """
+    stats = cache["stats"]
+    pages = page_range(cache, file, start, end)
+    resident = cache["last_stamp"][pages] >= cache["frontier"]
+    missing = pages[~resident]
+    stats["Read_Calls"] += 1
+    stats["Pages_Read"] += len(pages)
+    stats["Cache_Hits"] += len(pages) - len(missing)
+
+    window_end = pages[0]
+    index = 0
+    file_end = (file + 1) * cache["file_pages"]
+    while index < len(missing):
+        window_end = min(missing[index] + cache["readahead_pages"], file_end)
+        stats["Device_Read_Requests"] += 1
+        index = int(np.searchsorted(missing, window_end))
+    readahead = np.arange(pages[-1] + 1, max(window_end, pages[-1] + 1))
+    readahead = readahead[cache["last_stamp"][readahead] < cache["frontier"]]
+    stats["Device_Read_Pages"] += len(missing) + len(readahead)
+
+    touch(cache, pages, dirty=False)
+    touch(cache, readahead, dirty=False)
+
+
+def write(cache, file, start, end):
+    """Function to write elements of a file into the cache (as dirty pages)"""
+    pages = page_range(cache, file, start, end)
+    cache["stats"]["Write_Calls"] += 1
+    cache["stats"]["Pages_Written"] += len(pages)
+    touch(cache, pages, dirty=True)
+
+
+def truncate(cache, file):
+    """Function to drop all pages of a file, dirty pages are not written back"""
+    pages = file * cache["file_pages"] + np.arange(cache["file_pages"])
+    stamps = cache["last_stamp"][pages]
+    stamps = stamps[stamps >= cache["frontier"]]
+    discarded = int(np.count_nonzero(cache["dirty"][stamps]))
+    cache["stats"]["Discarded_Dirty_Pages"] += discarded
+    cache["dirty_count"] -= discarded
+    cache["cached"] -= len(stamps)
+    cache["live"][stamps] = False
+    cache["dirty"][stamps] = False
+    cache["last_stamp"][pages] = -1
+
+
+def flush(cache):
+    """Function to write all dirty pages back"""
+    written = cache["dirty_count"]
+    cache["stats"]["Device_Write_Pages"] += written
+    cache["dirty"][:] = False
+    cache["dirty_count"] = 0
+
+
+def replay(cache, trace):
+    """Function to replay the accesses of a trace against the cache"""
+    for file, start, end, is_write in zip(
+        trace["file"].tolist(),
+        trace["start"].tolist(),
+        trace["end"].tolist(),
+        trace["write"].tolist(),
+    ):
+        if is_write:
+            write(cache, file, start, end)
+        else:
+            read(cache, file, start, end)
+
+
+def simulate(
+    input_size,
+    block_size,
+    blocks_in_memory=BLOCKS_IN_MEMORY,
+    cache_pages=CACHE_PAGES,
+    readahead_pages=READAHEAD_PAGES,
+    dirty_ratio=DIRTY_RATIO,
+    generate_input=True,
+):
+    """
+    Function to simulate the page cache during the generation of the input
+    file (optional), the initial partition and all merge rounds of the External
+    Memory Merge Sort algorithm as in main.c. Returns the predicted accesses,
+    cache hits and device reads and writes of every phase (in pages).
+    """
+    file_pages = -(-input_size * INT_SIZE // PAGE_SIZE)
+    cache = new_cache(
+        file_pages, cache_pages, readahead_pages, int(dirty_ratio * cache_pages)
+    )
+    phases = []
+
+    def run_phase(phase, *traces):
+        before = dict(cache["stats"])
+        for trace in traces:
+            if trace is None:
+                flush(cache)
+            elif isinstance(trace, int):
+                truncate(cache, trace)
+            else:
+                replay(cache, trace)
+        phases.append(
+            {"Phase": phase}
+            | {key: cache["stats"][key] - before[key] for key in STAT_COLUMNS}
+        )
+
+    input_file, output_file = INPUT_FILE, OUTPUT_FILE
+    if generate_input:
+        run_phase(
+            "Generate",
+            input_file,
+            sequential_trace(input_size, block_size, input_file, True),
+        )
+    run_phase(
+        "Initial_Partition",
+        output_file,
+        partition_trace(
+            input_size, block_size, blocks_in_memory, input_file, output_file
+        ),
+        input_file,
+    )
+    input_file, output_file = output_file, input_file
+
+    stream_block_size = blocks_in_memory * block_size
+    merge_rounds = 0
+    while stream_block_size < input_size:
+        merge_rounds += 1
+        run_phase(
+            f"Merge_Round_{merge_rounds}",
+            output_file,
+            merge_round_trace(
+                input_size, block_size, stream_block_size, input_file, output_file
+            ),
+            input_file,
+        )
+        input_file, output_file = output_file, input_file
+        stream_block_size *= 2
+    run_phase("Flush", None)
+
+    return pd.DataFrame(phases)
+
+
+if __name__ == "__main__":
+    print(simulate(10000000, 100000).to_string(index=False))
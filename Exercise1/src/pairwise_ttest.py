@@ -0,0 +1,106 @@
+"""
+Module for performing all pairwise two-sample t-tests between the groups of a
+DataFrame from their sufficient statistics (count, mean and variance) instead
+of from the raw values of every pair
+"""
+import numpy as np
+import pandas as pd
+from scipy.stats import t as t_distribution
+
+ALPHA = 0.05
+
+
+def group_moments(df, metrics, keys):
+    """
+    Function to compute count, mean and variance of every metric for every
+    group in one pass. Returns one row per metric and group.
+    """
+    values = df[keys].join(df[metrics].astype("float64"))
+    moments = values.groupby(keys, sort=True, observed=True)[metrics].agg(
+        ["count", "mean", "var"]
+    )
+    moments.columns = moments.columns.set_names(["Metric", None])
+    return moments.stack(level="Metric").reset_index()
+
+
+def combine_moments(moments, keys):
+    """
+    Function to combine the moments of groups into the moments of the coarser
+    groups given by keys, without going back to the raw values
+    """
+    sums = moments.assign(
+        total=moments["count"] * moments["mean"],
+        squares=moments["count"] * moments["mean"] ** 2
+        + (moments["count"] - 1) * moments["var"].fillna(0),
+    )
+    sums = sums.groupby(keys, sort=True, observed=True)[
+        ["count", "total", "squares"]
+    ].sum()
+    mean = sums["total"] / sums["count"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (sums["squares"] - sums["count"] * mean**2) / (sums["count"] - 1)
+    return pd.DataFrame(
+        {"count": sums["count"], "mean": mean, "var": var.clip(lower=0)}
+    ).reset_index()
+
+
+def t_statistics(n_1, mean_1, var_1, n_2, mean_2, var_2, equal_var=True):
+    """
+    Function to compute Student's (equal_var) or Welch's t statistics, degrees
+    of freedom and two-sided p-values from the moments of two samples
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if equal_var:
+            dof = n_1 + n_2 - 2
+            pooled_var = ((n_1 - 1) * var_1 + (n_2 - 1) * var_2) / dof
+            standard_error = np.sqrt(pooled_var * (1 / n_1 + 1 / n_2))
+        else:
+            se_1, se_2 = var_1 / n_1, var_2 / n_2
+            standard_error = np.sqrt(se_1 + se_2)
+            dof = (se_1 + se_2) ** 2 / (se_1**2 / (n_1 - 1) + se_2**2 / (n_2 - 1))
+        t_statistic = (mean_1 - mean_2) / standard_error
+    p_value = 2 * t_distribution.sf(np.abs(t_statistic), dof)
+    return t_statistic, dof, p_value
+
+
+def pairwise_ttests(moments, group_keys, pair_key, equal_var=True, alpha=ALPHA):
+    """
+    Function to test all pairs of pair_key values (e.g. block sizes) against
+    each other within every group given by group_keys (e.g. metric and file
+    seed). All tests are computed at once on arrays of shape (groups, pairs).
+    Returns one row per test with the t statistic, p-value, Cohen's d and
+    whether the null hypothesis of equal means is rejected at level alpha.
+    """
+    wide = moments.set_index(group_keys + [pair_key])[["count", "mean", "var"]]
+    wide = wide.unstack(pair_key)
+    pair_values = wide["count"].columns.to_numpy()
+    first, second = np.triu_indices(len(pair_values), k=1)
+
+    count = wide["count"].to_numpy(dtype=np.float64)
+    mean = wide["mean"].to_numpy(dtype=np.float64)
+    var = wide["var"].to_numpy(dtype=np.float64)
+
+    t_statistic, _, p_value = t_statistics(
+        count[:, first],
+        mean[:, first],
+        var[:, first],
+        count[:, second],
+        mean[:, second],
+        var[:, second],
+        equal_var=equal_var,
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pooled_std_dev = np.sqrt((var[:, first] + var[:, second]) / 2)
+        cohen_d = (mean[:, first] - mean[:, second]) / pooled_std_dev
+
+    # Only test pairs that were both measured in the group
+    measured = ~np.isnan(count[:, first]) & ~np.isnan(count[:, second])
+    rows, pairs = np.nonzero(measured)
+    tests = wide.index.to_frame(index=False).iloc[rows].reset_index(drop=True)
+    tests[f"{pair_key}_1"] = pair_values[first[pairs]]
+    tests[f"{pair_key}_2"] = pair_values[second[pairs]]
+    tests["t_statistic"] = t_statistic[rows, pairs]
+    tests["p-value"] = p_value[rows, pairs]
+    tests["cohen_d"] = cohen_d[rows, pairs]
+    tests["Result"] = np.where(tests["p-value"] < alpha, "Reject", "Not Reject")
+    return tests
@@ -0,0 +1,205 @@
+"""
+Module for streaming quantile sketches (merging t-digests) of run times. A
+sketch summarizes any number of runs in a bounded number of weighted centroids,
+can be updated as runs arrive and merged with the sketches of other file seeds
+and hosts. Outliers are filtered robustly with bounds around the median in
+units of the median absolute deviation (MAD), which are read off the sketch.
+"""
+import numpy as np
+
+# Compression of the t-digests: a sketch holds at most about COMPRESSION / 2
+# centroids, and groups of up to about COMPRESSION / 3 runs are kept exactly
+COMPRESSION = 200
+
+# Runs further than MAD_THRESHOLD scaled MADs from the median are outliers
+# (Iglewicz and Hoaglin), where the scaled MAD estimates the standard deviation
+# of normally distributed run times
+MAD_THRESHOLD = 3.5
+MAD_SCALE = 1.4826
+
+
+def new_digest():
+    """Function to create an empty sketch"""
+    return {
+        "Means": np.empty(0),
+        "Weights": np.empty(0),
+        "Min": np.nan,
+        "Max": np.nan,
+    }
+
+
+def digest_size(digest):
+    """Function to get the number of values summarized by a sketch"""
+    return float(digest["Weights"].sum())
+
+
+def compress(means, weights, compression=COMPRESSION):
+    """
+    Function to merge sorted centroids whose cumulative weights fall into the
+    same unit interval of the arcsine scale function k1. The scale is steep at
+    both tails, so the extreme values stay (nearly) exact, while the centroids
+    around the median may hold many values.
+    """
+    order = np.argsort(means, kind="stable")
+    means, weights = means[order], weights[order]
+    left = (np.cumsum(weights) - weights) / weights.sum()
+    scale = compression / (2 * np.pi) * np.arcsin(2 * left - 1)
+    clusters = np.floor(scale - scale[0]).astype(np.int64)
+    starts = np.flatnonzero(np.diff(clusters, prepend=-1))
+    cluster_weights = np.add.reduceat(weights, starts)
+    cluster_means = np.add.reduceat(means * weights, starts) / cluster_weights
+    return cluster_means, cluster_weights
+
+
+def merge_digests(digests, compression=COMPRESSION):
+    """Function to merge sketches, e.g. of several file seeds or hosts"""
+    digests = [digest for digest in digests if len(digest["Weights"])]
+    if not digests:
+        return new_digest()
+    means, weights = compress(
+        np.concatenate([digest["Means"] for digest in digests]),
+        np.concatenate([digest["Weights"] for digest in digests]),
+        compression,
+    )
+    return {
+        "Means": means,
+        "Weights": weights,
+        "Min": min(digest["Min"] for digest in digests),
+        "Max": max(digest["Max"] for digest in digests),
+    }
+
+
+def add_values(digest, values, compression=COMPRESSION):
+    """Function to update a sketch with new values (NaN values are skipped)"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return digest
+    update = {
+        "Means": values,
+        "Weights": np.ones(len(values)),
+        "Min": values.min(),
+        "Max": values.max(),
+    }
+    return merge_digests([digest, update], compression)
+
+
+def to_bytes(digest):
+    """Function to serialize a sketch as little-endian doubles"""
+    return (
+        np.concatenate(
+            [[digest["Min"], digest["Max"]], digest["Means"], digest["Weights"]]
+        )
+        .astype("<f8")
+        .tobytes()
+    )
+
+
+def from_bytes(data):
+    """Function to deserialize a sketch written by to_bytes"""
+    values = np.frombuffer(data, dtype="<f8")
+    centroids = (len(values) - 2) // 2
+    return {
+        "Means": values[2 : 2 + centroids].copy(),
+        "Weights": values[2 + centroids :].copy(),
+        "Min": float(values[0]),
+        "Max": float(values[1]),
+    }
+
+
+def interpolation_points(digest):
+    """
+    Function to get the cumulative weights and values between which the
+    quantile function is interpolated linearly: the minimum at 0, every
+    centroid at the middle of its weight and the maximum at the total weight
+    """
+    weights = digest["Weights"]
+    positions = np.concatenate([[0], np.cumsum(weights) - weights / 2, [weights.sum()]])
+    values = np.concatenate([[digest["Min"]], digest["Means"], [digest["Max"]]])
+    return positions, values
+
+
+def quantiles(digest, probabilities):
+    """Function to estimate quantiles of the values summarized by a sketch"""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    size = digest_size(digest)
+    if size == 0:
+        return np.full(probabilities.shape, np.nan)
+    positions, values = interpolation_points(digest)
+    return np.interp(probabilities * size, positions, values)
+
+
+def cdf(digest, x, side="right"):
+    """
+    Function to estimate the share of the summarized values up to x, the
+    inverse of quantiles. Where several centroids have the value x, the share
+    includes them (side "right") or not (side "left").
+    """
+    x = np.asarray(x, dtype=np.float64)
+    size = digest_size(digest)
+    if size == 0:
+        return np.full(x.shape, np.nan)
+    positions, values = interpolation_points(digest)
+    upper = np.clip(np.searchsorted(values, x, side=side), 1, len(values) - 1)
+    lower = upper - 1
+    width = values[upper] - values[lower]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(width > 0, (x - values[lower]) / width, 1.0)
+    position = positions[lower] + np.clip(fraction, 0, 1) * (
+        positions[upper] - positions[lower]
+    )
+    return np.where(x < values[0], 0.0, position / size)
+
+
+def median_absolute_deviation(digest):
+    """
+    Function to estimate the MAD of the summarized values, the distance d from
+    the median m such that half of the values lie within [m - d, m + d]. Since
+    the estimated CDF is linear between the values of the sketch, the share
+    within [m - d, m + d] is evaluated at the distances of all values from the
+    median and interpolated linearly between them.
+    """
+    median = float(quantiles(digest, 0.5))
+    _, values = interpolation_points(digest)
+    distances = np.unique(np.abs(values - median))
+    shares = np.maximum.accumulate(
+        cdf(digest, median + distances) - cdf(digest, median - distances, side="left")
+    )
+    return float(np.interp(0.5, shares, distances))
+
+
+def inlier_bounds(digest, threshold=MAD_THRESHOLD):
+    """
+    Function to get the range of values that are not outliers. Without any
+    spread around the median (a MAD of 0), no value is an outlier.
+    """
+    if digest_size(digest) == 0:
+        return np.nan, np.nan
+    median = float(quantiles(digest, 0.5))
+    spread = threshold * MAD_SCALE * median_absolute_deviation(digest)
+    if spread == 0:
+        return digest["Min"], digest["Max"]
+    return median - spread, median + spread
+
+
+def outlier_mask(digest, values, threshold=MAD_THRESHOLD):
+    """
+    Function to flag the values that are outliers with respect to a sketch,
+    e.g. new runs as they arrive (NaN values are not flagged)
+    """
+    low, high = inlier_bounds(digest, threshold)
+    values = np.asarray(values, dtype=np.float64)
+    return (values < low) | (values > high)
+
+
+def inlier_quantiles(digest, probabilities, threshold=MAD_THRESHOLD):
+    """
+    Function to estimate quantiles of the values that are not outliers, as
+    quantiles of the sketch truncated to the inlier bounds
+    """
+    low, high = inlier_bounds(digest, threshold)
+    if np.isnan(low):
+        return np.full(np.shape(probabilities), np.nan)
+    below, above = cdf(digest, [low, high])
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    return quantiles(digest, below + probabilities * (above - below))
@@ -0,0 +1,188 @@
+"""
+Module for distribution-free comparisons of the run times of block sizes with
+bootstrap confidence intervals of median differences and permutation tests,
+computed in batches on index matrices by a pool of processes
+"""
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import htest
+import results_loader
+
+RESULTS_PATH = htest.RESULTS_PATH
+RESAMPLING_PATH = "../res/resampling_tests.csv"
+METRICS = htest.METRICS
+
+N_RESAMPLES = 10000
+CONFIDENCE_LEVEL = 0.95
+ALPHA = 0.05
+
+# Base seed of all comparisons, every comparison and chunk gets its own stream
+# derived from it, so the results do not depend on the number of workers
+SEED = 42
+
+# Maximum number of elements of one index matrix, which bounds the memory of a chunk
+CHUNK_ELEMENTS = 1 << 22
+
+# None uses one worker per CPU, 1 computes everything in the current process
+RESAMPLING_WORKERS = None
+
+
+def comparison_rng(comparison_key, chunk_index):
+    """Function to create the random generator of one chunk of a comparison"""
+    key_hash = zlib.crc32(comparison_key.encode("utf8"))
+    return np.random.default_rng(
+        np.random.SeedSequence(SEED, spawn_key=(key_hash, chunk_index))
+    )
+
+
+def chunk_sizes(n_resamples, sample_size):
+    """Function to split the resamples of a comparison into chunks of bounded memory"""
+    rows = max(1, CHUNK_ELEMENTS // max(sample_size, 1))
+    return [min(rows, n_resamples - start) for start in range(0, n_resamples, rows)]
+
+
+def resample_chunk(data_1, data_2, comparison_key, chunk_index, size):
+    """
+    Function to compute one chunk of bootstrap median differences and to count
+    how many permuted median differences are at least as extreme as the
+    observed one
+    """
+    rng = comparison_rng(comparison_key, chunk_index)
+    n_1, n_2 = len(data_1), len(data_2)
+
+    # Bootstrap: resample both samples independently with replacement
+    bootstrap = np.median(
+        data_1[rng.integers(0, n_1, size=(size, n_1))], axis=1
+    ) - np.median(data_2[rng.integers(0, n_2, size=(size, n_2))], axis=1)
+
+    # Permutation: shuffle the pooled sample and split it into the two groups
+    pooled = np.concatenate([data_1, data_2])
+    permutations = rng.permuted(np.tile(np.arange(n_1 + n_2), (size, 1)), axis=1)
+    permuted = pooled[permutations]
+    permuted_difference = np.median(permuted[:, :n_1], axis=1) - np.median(
+        permuted[:, n_1:], axis=1
+    )
+    observed = np.median(data_1) - np.median(data_2)
+    # Tolerance for rounding errors of equal medians
+    extreme = np.abs(permuted_difference) >= np.abs(observed) * (1 - 1e-12)
+    return bootstrap, int(np.count_nonzero(extreme))
+
+
+def comparison_samples(df, metrics):
+    """
+    Function to collect the samples of all block size comparisons, globally and
+    for every file seed. Returns the comparisons and their two samples.
+    """
+    comparisons, samples = [], []
+    block_sizes = np.sort(df["Block_Size"].unique())
+    seed_groups = [("Global", df)] + [
+        (str(file_seed), group)
+        for file_seed, group in df.groupby("File_Seed", sort=True, observed=True)
+    ]
+    for metric in metrics:
+        for file_seed, group in seed_groups:
+            values = {
+                block_size: block_values[metric].dropna().to_numpy(np.float64)
+                for block_size, block_values in group.groupby("Block_Size")
+            }
+            for i, block_size_1 in enumerate(block_sizes):
+                for block_size_2 in block_sizes[i + 1 :]:
+                    if block_size_1 not in values or block_size_2 not in values:
+                        continue
+                    comparisons.append(
+                        {
+                            "Metric": metric,
+                            "File_Seed": file_seed,
+                            "Block_Size_1": block_size_1,
+                            "Block_Size_2": block_size_2,
+                            "Comparison": f"{block_size_1} vs {block_size_2}",
+                        }
+                    )
+                    samples.append((values[block_size_1], values[block_size_2]))
+    return pd.DataFrame(comparisons), samples
+
+
+def resampling_tests(
+    df,
+    metrics=None,
+    n_resamples=N_RESAMPLES,
+    confidence_level=CONFIDENCE_LEVEL,
+    workers=RESAMPLING_WORKERS,
+):
+    """
+    Function to compute bootstrap confidence intervals of the median difference
+    and permutation test p-values for all pairs of block sizes, globally and
+    for every file seed. The resamples of every comparison are split into
+    chunks that are computed by a pool of processes. Returns one row per
+    comparison.
+    """
+    if metrics is None:
+        metrics = METRICS
+    comparisons, samples = comparison_samples(df, metrics)
+
+    tasks = []
+    for index, (comparison, (data_1, data_2)) in enumerate(
+        zip(comparisons.itertuples(index=False), samples)
+    ):
+        if min(len(data_1), len(data_2)) < 2:
+            continue
+        key = "|".join(map(str, comparison))
+        sizes = chunk_sizes(n_resamples, len(data_1) + len(data_2))
+        tasks.extend(
+            (index, data_1, data_2, key, chunk_index, size)
+            for chunk_index, size in enumerate(sizes)
+        )
+
+    indices, *arguments = zip(*tasks) if tasks else [()]
+    if not tasks:
+        chunks = []
+    elif workers == 1:
+        chunks = list(map(resample_chunk, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            chunks = list(executor.map(resample_chunk, *arguments, chunksize=8))
+
+    bootstraps = [[] for _ in samples]
+    exceedances = np.zeros(len(samples), dtype=np.int64)
+    for index, (bootstrap, extreme) in zip(indices, chunks):
+        bootstraps[index].append(bootstrap)
+        exceedances[index] += extreme
+
+    tail = (1 - confidence_level) / 2
+    rows = []
+    for (data_1, data_2), bootstrap, extreme in zip(samples, bootstraps, exceedances):
+        if not bootstrap:
+            rows.append((np.nan, np.nan, np.nan, np.nan))
+            continue
+        bootstrap = np.concatenate(bootstrap)
+        ci_low, ci_high = np.quantile(bootstrap, [tail, 1 - tail])
+        rows.append(
+            (
+                np.median(data_1) - np.median(data_2),
+                ci_low,
+                ci_high,
+                (extreme + 1) / (len(bootstrap) + 1),
+            )
+        )
+    results = comparisons.join(
+        pd.DataFrame(
+            rows, columns=["median_difference", "ci_low", "ci_high", "p-value"]
+        )
+    )
+    results["Result"] = np.where(results["p-value"] < ALPHA, "Reject", "Not Reject")
+    return results
+
+
+if __name__ == "__main__":
+    resampling_results = resampling_tests(
+        results_loader.load_results(RESULTS_PATH, results_loader.HOST_ALIASES)
+    )
+    resampling_results.to_csv(RESAMPLING_PATH, index=False)
+    print(
+        resampling_results.groupby(["Metric", "Result"]).size().to_string(), end="\n\n"
+    )
@@ -0,0 +1,195 @@
+"""
+Module for the OS-level accounting of benchmark runs on Linux, without extra
+privileges. A run is waited for without reaping it, so the final counters of
+/proc/<pid>/io, /proc/<pid>/stat and /proc/<pid>/schedstat can still be read,
+and then reaped with wait4 for its resource usage. The overhead report
+attributes the gap between wall clock time and CPU time of the processes to
+its causes, next to the gap of the external merge sort alone.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+ACCOUNTING_PATH = "../res/accounting.jsonl"
+DELAY_ACCOUNTING_PATH = "/proc/sys/kernel/task_delayacct"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# Field of /proc/<pid>/stat (numbered as in man proc) with the block I/O delay
+BLKIO_DELAY_FIELD = 42
+
+# Fields of /proc/<pid>/io and their names
+IO_FIELDS = {
+    "rchar": "Read_Chars",
+    "wchar": "Write_Chars",
+    "syscr": "Read_Syscalls",
+    "syscw": "Write_Syscalls",
+    "read_bytes": "Read_Bytes",
+    "write_bytes": "Write_Bytes",
+    "cancelled_write_bytes": "Cancelled_Write_Bytes",
+}
+
+# Keys of a setting in the overhead report
+SETTING_KEYS = ["Host_Name", "Sort_Option", "Input_Size", "Block_Size"]
+
+
+def delay_accounting_enabled():
+    """
+    Function to check whether the kernel counts the block I/O delay of
+    processes. Kernels without the switch (before 5.14) always count it.
+    """
+    try:
+        with open(DELAY_ACCOUNTING_PATH, encoding="utf8") as f:
+            return f.read().strip() == "1"
+    except OSError:
+        return True
+
+
+def read_proc_accounting(pid):
+    """
+    Function to read the I/O counters, the block I/O delay and the time waited
+    on the run queue of a process from /proc (empty where not available). The
+    block I/O delay is NaN without kernel delay accounting, where it reads 0.
+    """
+    accounting = {}
+    try:
+        with open(f"/proc/{pid}/io", encoding="utf8") as f:
+            for line in f:
+                name, value = line.split(":")
+                if name in IO_FIELDS:
+                    accounting[IO_FIELDS[name]] = int(value)
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf8") as f:
+            # The fields start after the command name, which may contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        blkio_delay_ticks = int(fields[BLKIO_DELAY_FIELD - 3])
+        accounting["Blkio_Delay"] = (
+            blkio_delay_ticks / CLOCK_TICKS if delay_accounting_enabled() else np.nan
+        )
+    except (OSError, IndexError):
+        pass
+    try:
+        with open(f"/proc/{pid}/schedstat", encoding="utf8") as f:
+            accounting["Run_Queue_Wait"] = int(f.read().split()[1]) / 1e9
+    except (OSError, IndexError):
+        pass
+    return accounting
+
+
+def run_accounted(command, stdout, stderr, cpu=None, timeout=None):
+    """
+    Function to run a command (pinned to the core cpu if not None) and account
+    its resources. Returns the return code and the accounting of the process:
+    its wall clock time, the counters of /proc and the resource usage of wait4.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=stdout, stderr=stderr)
+    if cpu is not None:
+        os.sched_setaffinity(process.pid, {cpu})
+    timer = threading.Timer(timeout, process.kill) if timeout else None
+    if timer is not None:
+        timer.start()
+    try:
+        # Wait for the exit, but keep the process until /proc has been read
+        if hasattr(os, "waitid"):
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        wall = time.perf_counter() - start
+        accounting = read_proc_accounting(process.pid)
+        _, status, usage = os.wait4(process.pid, 0)
+    finally:
+        if timer is not None:
+            timer.cancel()
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    accounting |= {
+        "Process_Wall": wall,
+        "User_Time": usage.ru_utime,
+        "System_Time": usage.ru_stime,
+        "Peak_RSS_KB": usage.ru_maxrss,
+        "Major_Faults": usage.ru_majflt,
+        "Minor_Faults": usage.ru_minflt,
+        "Voluntary_Switches": usage.ru_nvcsw,
+        "Involuntary_Switches": usage.ru_nivcsw,
+        "Block_Inputs": usage.ru_inblock,
+        "Block_Outputs": usage.ru_oublock,
+    }
+    return process.returncode, accounting
+
+
+def load_accounting(accounting_path):
+    """Function to load the accounted runs (one JSON line per run)"""
+    accounting = pd.read_json(accounting_path, lines=True, dtype={"Host_Name": str})
+    for column in ["Blkio_Delay", "Run_Queue_Wait"]:
+        if column not in accounting:
+            accounting[column] = np.nan
+    return accounting
+
+
+def overhead_report(accounting):
+    """
+    Function to attribute the gap between the wall clock time and the CPU time
+    (user + system) of the processes of every setting (means over its runs):
+    - Run_Queue_Wait: runnable, but waiting for a core (other processes)
+    - Blkio_Delay: waiting for block I/O (only with kernel delay accounting)
+    - Other_Blocked: the rest of the gap, e.g. page cache writeback throttling
+    The system time share and the I/O and fault counters show the kernel work
+    behind the gap. The cache hit ratio is the share of the bytes read that
+    did not come from the storage device.
+    The counters cover the whole process, including the input generation and
+    the classical merge sort, so the gap of the external merge sort alone
+    (External_Gap, from its result line) is reported next to the gap of the
+    process (Process_Gap) rather than explained by the causes above.
+    """
+    df = accounting.copy()
+    df["CPU_Time"] = df["User_Time"] + df["System_Time"]
+    df["Process_Gap"] = (df["Process_Wall"] - df["CPU_Time"]).clip(lower=0)
+    df["External_Gap"] = (
+        df["External_Wall_Clock_Time"] - df["External_CPU_Time"]
+    ).clip(lower=0)
+    df["Other_Blocked"] = (
+        df["Process_Gap"] - df["Run_Queue_Wait"].fillna(0) - df["Blkio_Delay"].fillna(0)
+    ).clip(lower=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        df["System_Share"] = df["System_Time"] / df["CPU_Time"]
+        df["Cache_Hit_Ratio"] = 1 - df["Read_Bytes"] / df["Read_Chars"]
+
+    keys = SETTING_KEYS + (["Distribution"] if "Distribution" in df else [])
+    columns = [
+        "External_Wall_Clock_Time",
+        "External_CPU_Time",
+        "External_Gap",
+        "Process_Wall",
+        "CPU_Time",
+        "Process_Gap",
+        "Run_Queue_Wait",
+        "Blkio_Delay",
+        "Other_Blocked",
+        "System_Share",
+        "Cache_Hit_Ratio",
+        "Major_Faults",
+        "Minor_Faults",
+        "Voluntary_Switches",
+        "Involuntary_Switches",
+        "Read_Bytes",
+        "Write_Bytes",
+        "Read_Syscalls",
+        "Write_Syscalls",
+    ]
+    report = df.groupby(keys, sort=True)[columns].mean()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for cause in ["Run_Queue_Wait", "Blkio_Delay", "Other_Blocked"]:
+            report[f"{cause}_Share"] = report[cause] / report["Process_Gap"]
+    return report.reset_index()
+
+
+if __name__ == "__main__":
+    report = overhead_report(
+        load_accounting(sys.argv[1] if len(sys.argv) > 1 else ACCOUNTING_PATH)
+    )
+    print(report.to_string(index=False))
@@ -0,0 +1,276 @@
+"""
+Module for loading the padded text results of the algorithm analysis into typed
+DataFrames, with a binary sidecar cache that is only rebuilt when the source
+file changes
+"""
+import io
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Single column schema for all results files written by perform_analysis in main.c
+COLUMNS = [
+    "File_Seed",
+    "Input_Size",
+    "Block_Size",
+    "Input_MB",
+    "Block_Size_MB",
+    "External_Wall_Clock_Time",
+    "External_CPU_Time",
+    "Classical_Wall_Clock_Time",
+    "Classical_CPU_Time",
+    "Merge_Rounds",
+    "Classical_Rounds",
+    "Sort_Option",
+    "Host_Name",
+]
+
+DTYPES = {
+    "File_Seed": np.int32,
+    "Input_Size": np.int64,  # Input sizes of 10^10 do not fit into int32
+    "Block_Size": np.int32,
+    # The MB columns are used as exact keys (e.g. 0.04), which float32 cannot hold
+    "Input_MB": np.float64,
+    "Block_Size_MB": np.float64,
+    "External_Wall_Clock_Time": np.float32,
+    "External_CPU_Time": np.float32,
+    "Classical_Wall_Clock_Time": np.float32,
+    "Classical_CPU_Time": np.float32,
+    "Merge_Rounds": np.int32,
+    "Classical_Rounds": np.int32,
+    "Sort_Option": "category",
+    "Host_Name": "category",
+}
+
+CATEGORICAL_COLUMNS = [
+    column for column, dtype in DTYPES.items() if dtype == "category"
+]
+
+HOST_ALIASES = {"BookBook-Pro-2.local": "MacBook"}
+
+# Increase when the cache layout or the parsing changes to invalidate old caches
+CACHE_VERSION = 2
+SIGNATURE_LENGTH = 6
+
+# Number of bytes at the start of a results file used to detect rewritten files
+HEAD_BYTES = 4096
+
+
+def cache_path(results_path):
+    """Function to get the path of the binary sidecar cache of a results file"""
+    return results_path + ".cache.npz"
+
+
+def is_data_line(line):
+    """
+    Function to check whether a line of a results file holds a run, as opposed
+    to the header line or the blank lines that main.c prints before the runs
+    """
+    stripped = line.lstrip()
+    return stripped != "" and (stripped[0].isdigit() or stripped[0] == "-")
+
+
+def parse_lines(lines):
+    """
+    Function to parse data lines of a results file into a DataFrame with the
+    schema in COLUMNS. Files without the Sort_Option column (12 instead of 13
+    fields per line) get a missing Sort_Option.
+    """
+    lines = [line for line in lines if is_data_line(line)]
+    if not lines:
+        return empty_frame()
+
+    has_sort_option = lines[0].count(",") == len(COLUMNS) - 1
+    names = COLUMNS if has_sort_option else [c for c in COLUMNS if c != "Sort_Option"]
+
+    # Drop the unit suffix once for the whole text instead of once per cell
+    text = "\n".join(lines).replace(" MB", "")
+    df = pd.read_csv(
+        io.StringIO(text),
+        header=None,
+        names=names,
+        skipinitialspace=True,
+        engine="c",
+        na_values=["nan", "-nan"],
+        dtype={"Host_Name": str},
+    )
+    if not has_sort_option:
+        df["Sort_Option"] = np.nan
+    return to_schema(df[COLUMNS])
+
+
+def to_schema(df):
+    """Function to cast parsed columns to the compact dtypes of the schema"""
+    df = df.copy()
+    df["Host_Name"] = df["Host_Name"].astype(str).str.replace(" ", "")
+    for column, dtype in DTYPES.items():
+        if dtype == "category":
+            df[column] = df[column].astype("category")
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def empty_frame():
+    """Function to create an empty DataFrame with the schema in COLUMNS"""
+    return pd.DataFrame({column: pd.Series(dtype=DTYPES[column]) for column in COLUMNS})
+
+
+def read_complete_lines(results_path, offset=0):
+    """
+    Function to read the complete lines of a results file from a byte offset on.
+    A partially written last line is left for the next read. Returns the lines
+    and the byte offset after the last complete line.
+    """
+    with open(results_path, "rb") as file:
+        file.seek(offset)
+        data = file.read()
+    end = data.rfind(b"\n") + 1
+    return data[:end].decode("utf8").splitlines(), offset + end
+
+
+def head_digest(results_path, offset):
+    """
+    Function to hash the first bytes of a results file that were already
+    ingested, to notice when the file was rewritten instead of appended to
+    """
+    with open(results_path, "rb") as file:
+        return zlib.crc32(file.read(min(offset, HEAD_BYTES)))
+
+
+def source_signature(results_path, stat, offset, rows):
+    """
+    Function to describe the state of a results file when it was cached: its
+    size and modification time (stat, taken before the file was read, so that
+    lines appended while reading change them), the byte offset and row count
+    ingested so far, and a digest of its head
+    """
+    return np.array(
+        [
+            stat.st_size,
+            stat.st_mtime_ns,
+            CACHE_VERSION,
+            offset,
+            rows,
+            head_digest(results_path, offset),
+        ],
+        dtype=np.int64,
+    )
+
+
+def save_cache(df, results_path, signature):
+    """Function to store a parsed DataFrame column by column in an NPZ file"""
+    arrays = {"signature": signature}
+    for column in COLUMNS:
+        if column in CATEGORICAL_COLUMNS:
+            arrays[f"{column}__codes"] = df[column].cat.codes.to_numpy()
+            categories = df[column].cat.categories.to_numpy()
+            if categories.dtype == object:
+                categories = categories.astype(str)
+            arrays[f"{column}__categories"] = categories
+        else:
+            arrays[column] = df[column].to_numpy()
+    np.savez(cache_path(results_path), **arrays)
+
+
+def load_cache(results_path):
+    """
+    Function to load the cached DataFrame and its source signature, returning
+    (None, None) if there is no readable cache
+    """
+    try:
+        with np.load(cache_path(results_path), allow_pickle=False) as arrays:
+            signature = arrays["signature"]
+            if signature.shape != (SIGNATURE_LENGTH,):
+                return None, None
+            columns = {}
+            for column in COLUMNS:
+                if column in CATEGORICAL_COLUMNS:
+                    columns[column] = pd.Categorical.from_codes(
+                        arrays[f"{column}__codes"],
+                        categories=arrays[f"{column}__categories"],
+                    )
+                else:
+                    columns[column] = arrays[column]
+            return pd.DataFrame(columns), signature
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def append_rows(df, new_rows):
+    """Function to append newly parsed rows while keeping the categorical dtypes"""
+    if new_rows.empty:
+        return df
+    df = pd.concat([df, new_rows], ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype("category")
+    return df
+
+
+def is_unchanged(results_path, signature):
+    """Function to check whether a results file is still in its cached state"""
+    stat = os.stat(results_path)
+    return (
+        signature[0] == stat.st_size
+        and signature[1] == stat.st_mtime_ns
+        and signature[2] == CACHE_VERSION
+    )
+
+
+def is_appended(results_path, df, signature):
+    """
+    Function to check whether a results file only grew since it was cached, so
+    that only the lines after the cached byte offset need to be parsed
+    """
+    offset, rows = int(signature[3]), int(signature[4])
+    return (
+        signature[2] == CACHE_VERSION
+        and len(df) == rows
+        and os.stat(results_path).st_size >= offset
+        and head_digest(results_path, offset) == signature[5]
+    )
+
+
+def load_results(results_path, host_aliases=None, use_cache=True, incremental=False):
+    """
+    Function to load a results file into a DataFrame with the schema in COLUMNS.
+    The parsed data is kept in a binary sidecar cache next to the results file,
+    which is rebuilt only when the size or modification time of the file changes.
+    In incremental mode, a file that was only appended to since it was cached
+    (e.g. by a running perform_analysis campaign) is not parsed again, and only
+    the lines after the cached byte offset are parsed and appended to the cache.
+    """
+    df = None
+    if use_cache:
+        df, signature = load_cache(results_path)
+
+    if df is None or not is_unchanged(results_path, signature):
+        stat = os.stat(results_path)
+        if df is not None and incremental and is_appended(results_path, df, signature):
+            lines, offset = read_complete_lines(results_path, int(signature[3]))
+            df = append_rows(df, parse_lines(lines))
+        else:
+            lines, offset = read_complete_lines(results_path)
+            df = parse_lines(lines)
+        if use_cache:
+            save_cache(
+                df, results_path, source_signature(results_path, stat, offset, len(df))
+            )
+
+    if host_aliases:
+        df["Host_Name"] = (
+            df["Host_Name"]
+            .map(lambda host: host_aliases.get(host, host))
+            .astype("category")
+        )
+    return df
+
+
+def ingest_results(results_path, host_aliases=None):
+    """
+    Function to load a growing results file, parsing only the rows that were
+    appended since the last call
+    """
+    return load_results(results_path, host_aliases=host_aliases, incremental=True)
@@ -0,0 +1,477 @@
+"""
+Module for an embedded, indexed store of the results of the algorithm analysis.
+The runs of a results file are ingested into an SQLite database next to it,
+indexed by (Sort_Option, Host_Name, File_Seed, Input_Size, Block_Size), so that
+a slice is an index lookup instead of a scan over all runs. Per-configuration
+summaries (counts, sums, sums of squares, minima and maxima of the metrics) and
+quantile sketches of the run times are updated on every ingest, so aggregated
+data can be read without touching the runs. Like results_loader.ingest_results,
+an ingest only parses the lines that were appended to the results file since
+the last one.
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import grouped_quantiles
+import quantile_sketch
+import results_loader
+
+RESULTS_PATH = "../res/results.txt"
+
+# Keys of a configuration, in the order of the indexes
+KEY_COLUMNS = ["Sort_Option", "Host_Name", "File_Seed", "Input_Size", "Block_Size"]
+
+# Columns of the runs that are summarized per configuration
+METRIC_COLUMNS = [
+    "External_Wall_Clock_Time",
+    "External_CPU_Time",
+    "Classical_Wall_Clock_Time",
+    "Classical_CPU_Time",
+    "Merge_Rounds",
+    "Classical_Rounds",
+]
+
+# Columns of the runs with a quantile sketch per configuration
+SKETCH_COLUMNS = [
+    "External_Wall_Clock_Time",
+    "External_CPU_Time",
+    "Classical_Wall_Clock_Time",
+    "Classical_CPU_Time",
+]
+
+SQL_TYPES = {
+    "Sort_Option": "INTEGER",
+    "Host_Name": "TEXT",
+    "File_Seed": "INTEGER",
+    "Input_Size": "INTEGER",
+    "Block_Size": "INTEGER",
+    "Input_MB": "REAL",
+    "Block_Size_MB": "REAL",
+    "Merge_Rounds": "INTEGER",
+    "Classical_Rounds": "INTEGER",
+}
+
+# Increase when the layout of the store changes to rebuild old stores
+STORE_VERSION = 2
+
+
+def store_path(results_path):
+    """Function to get the path of the store of a results file"""
+    return results_path + ".sqlite"
+
+
+def summary_columns(metric):
+    """Function to get the names of the summary columns of a metric"""
+    return [
+        f"{metric}_{part}" for part in ["Count", "Sum", "Sum_Squares", "Min", "Max"]
+    ]
+
+
+def create_tables(connection):
+    """Function to create the tables and indexes of an empty store"""
+    run_columns = ", ".join(
+        f"{column} {SQL_TYPES.get(column, 'REAL')}" for column in results_loader.COLUMNS
+    )
+    summary_definitions = ", ".join(
+        f"{column} {'INTEGER' if column.endswith('_Count') else 'REAL'}"
+        for metric in METRIC_COLUMNS
+        for column in summary_columns(metric)
+    )
+    keys = ", ".join(KEY_COLUMNS)
+    connection.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS source (
+            Version INTEGER, Offset INTEGER, Rows INTEGER, Head_Digest INTEGER,
+            Host_Aliases TEXT
+        );
+        CREATE TABLE IF NOT EXISTS runs ({run_columns});
+        CREATE INDEX IF NOT EXISTS runs_by_configuration ON runs ({keys});
+        CREATE TABLE IF NOT EXISTS summaries (
+            {", ".join(f"{c} {SQL_TYPES[c]}" for c in KEY_COLUMNS)},
+            Runs INTEGER, {summary_definitions}, UNIQUE ({keys})
+        );
+        CREATE TABLE IF NOT EXISTS sketches (
+            {", ".join(f"{c} {SQL_TYPES[c]}" for c in KEY_COLUMNS)},
+            Metric TEXT, Digest BLOB, UNIQUE ({keys}, Metric)
+        );
+        """
+    )
+
+
+def open_store(path):
+    """
+    Function to open (and create if needed) a store. The write-ahead log lets
+    scripts and dashboards read the store while a campaign is ingested.
+    """
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    create_tables(connection)
+    return connection
+
+
+def read_source(connection):
+    """Function to get the state of the ingested results file (None if empty)"""
+    return connection.execute(
+        "SELECT Version, Offset, Rows, Head_Digest, Host_Aliases FROM source"
+    ).fetchone()
+
+
+def clear_store(connection):
+    """Function to remove all runs, summaries, sketches and the source state"""
+    for table in ["source", "runs", "summaries", "sketches"]:
+        connection.execute(f"DELETE FROM {table}")
+
+
+def run_records(df):
+    """
+    Function to convert parsed runs to rows of plain Python values. SQLite
+    stores NaN as NULL, and the INTEGER columns store whole floats as integers.
+    """
+    columns = []
+    for column in results_loader.COLUMNS:
+        values = df[column]
+        if column == "Sort_Option":
+            values = values.astype(np.float64)
+        columns.append(values.tolist())
+    return list(zip(*columns))
+
+
+def update_summaries(connection, first_rowid):
+    """
+    Function to add the runs from first_rowid on to the summaries of their
+    configurations. The sums and counts of the new runs are added to the stored
+    ones, so the summaries never need to read the older runs again.
+    """
+    aggregates = ["COUNT(*)"]
+    updates = ["Runs = Runs + excluded.Runs"]
+    for metric in METRIC_COLUMNS:
+        count, total, squares, minimum, maximum = summary_columns(metric)
+        aggregates += [
+            f"COUNT({metric})",
+            f"TOTAL({metric})",
+            f"TOTAL({metric} * {metric})",
+            f"MIN({metric})",
+            f"MAX({metric})",
+        ]
+        updates += [
+            f"{count} = {count} + excluded.{count}",
+            f"{total} = {total} + excluded.{total}",
+            f"{squares} = {squares} + excluded.{squares}",
+            f"{minimum} = MIN(COALESCE({minimum}, excluded.{minimum}), "
+            f"COALESCE(excluded.{minimum}, {minimum}))",
+            f"{maximum} = MAX(COALESCE({maximum}, excluded.{maximum}), "
+            f"COALESCE(excluded.{maximum}, {maximum}))",
+        ]
+    keys = ", ".join(KEY_COLUMNS)
+    # The WHERE clause tells SQLite that ON CONFLICT belongs to the INSERT
+    connection.execute(
+        f"""
+        INSERT INTO summaries
+        SELECT {keys}, {", ".join(aggregates)} FROM runs
+        WHERE rowid >= ? GROUP BY {keys}
+        ON CONFLICT ({keys}) DO UPDATE SET {", ".join(updates)}
+        """,
+        (first_rowid,),
+    )
+
+
+def key_values(keys):
+    """Function to convert the keys of a configuration to query parameters"""
+    return [
+        None if pd.isna(key) else key.item() if isinstance(key, np.generic) else key
+        for key in keys
+    ]
+
+
+def update_sketches(connection, df):
+    """
+    Function to add new runs to the quantile sketches of their configurations.
+    A sketch is replaced instead of upserted, because the UNIQUE constraint
+    does not hold for the missing Sort_Option of old results files.
+    """
+    condition = " AND ".join(f"{column} IS ?" for column in KEY_COLUMNS)
+    placeholders = ", ".join("?" * (len(KEY_COLUMNS) + 2))
+    for keys, group in df.groupby(KEY_COLUMNS, observed=True, dropna=False):
+        parameters = key_values(keys)
+        for metric in SKETCH_COLUMNS:
+            row = connection.execute(
+                f"SELECT Digest FROM sketches WHERE {condition} AND Metric = ?",
+                parameters + [metric],
+            ).fetchone()
+            digest = (
+                quantile_sketch.new_digest()
+                if row is None
+                else (quantile_sketch.from_bytes(row[0]))
+            )
+            digest = quantile_sketch.add_values(digest, group[metric])
+            connection.execute(
+                f"DELETE FROM sketches WHERE {condition} AND Metric = ?",
+                parameters + [metric],
+            )
+            connection.execute(
+                f"INSERT INTO sketches VALUES ({placeholders})",
+                parameters + [metric, quantile_sketch.to_bytes(digest)],
+            )
+
+
+def ingest(connection, results_path, host_aliases=None):
+    """
+    Function to ingest the runs of a results file that are not in the store
+    yet. If the file was rewritten instead of appended to, or the host aliases
+    changed, the store is rebuilt. Returns the number of ingested runs.
+    """
+    aliases = json.dumps(host_aliases or {}, sort_keys=True)
+    with connection:
+        # Take the write lock before reading the state of the store, so that
+        # concurrent ingests of the same file add every new run only once
+        connection.execute("BEGIN IMMEDIATE")
+        source = read_source(connection)
+        offset, rows = 0, 0
+        if source is not None:
+            version, stored_offset, stored_rows, digest, stored_aliases = source
+            if (
+                version == STORE_VERSION
+                and stored_aliases == aliases
+                and os.path.getsize(results_path) >= stored_offset
+                and results_loader.head_digest(results_path, stored_offset) == digest
+            ):
+                offset, rows = stored_offset, stored_rows
+
+        lines, new_offset = results_loader.read_complete_lines(results_path, offset)
+        if offset > 0 and new_offset == offset:
+            return 0
+        df = results_loader.parse_lines(lines)
+        if host_aliases:
+            df["Host_Name"] = df["Host_Name"].map(
+                lambda host: host_aliases.get(host, host)
+            )
+
+        if offset == 0:
+            clear_store(connection)
+        first_rowid = connection.execute(
+            "SELECT COALESCE(MAX(rowid), 0) + 1 FROM runs"
+        ).fetchone()[0]
+        placeholders = ", ".join("?" * len(results_loader.COLUMNS))
+        connection.executemany(
+            f"INSERT INTO runs VALUES ({placeholders})", run_records(df)
+        )
+        update_summaries(connection, first_rowid)
+        update_sketches(connection, df)
+        connection.execute("DELETE FROM source")
+        connection.execute(
+            "INSERT INTO source VALUES (?, ?, ?, ?, ?)",
+            (
+                STORE_VERSION,
+                new_offset,
+                rows + len(df),
+                results_loader.head_digest(results_path, new_offset),
+                aliases,
+            ),
+        )
+    return len(df)
+
+
+def load_store(results_path, host_aliases=None):
+    """Function to open the store of a results file and ingest its new runs"""
+    connection = open_store(store_path(results_path))
+    ingest(connection, results_path, host_aliases)
+    return connection
+
+
+def where_clause(filters):
+    """
+    Function to build the condition and parameters of a query for the given
+    key values, where None selects all values of a key. IS also matches the
+    missing Sort_Option of old results files.
+    """
+    conditions, parameters = [], []
+    for column, value in filters.items():
+        if column not in KEY_COLUMNS:
+            raise ValueError(f"Unknown key '{column}', choose one of {KEY_COLUMNS}")
+        if value is not None:
+            conditions.append(f"{column} IS ?")
+            parameters += key_values([value])
+    return ("WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+
+def query_runs(connection, columns=None, **filters):
+    """
+    Function to get the runs of a slice, e.g. query_runs(connection,
+    Sort_Option=1, Host_Name="ThinkPad", File_Seed=None) for all file seeds,
+    as a DataFrame with the schema of results_loader (in the order of the file)
+    """
+    where, parameters = where_clause(filters)
+    df = pd.read_sql_query(
+        f"SELECT * FROM runs {where} ORDER BY rowid", connection, params=parameters
+    )
+    df = results_loader.to_schema(df) if not df.empty else results_loader.empty_frame()
+    return df[columns] if columns is not None else df
+
+
+def query_sampled_runs(connection, group_by, size, **filters):
+    """
+    Function to get at most size runs of every group of a slice, evenly spaced
+    in the order of the file, like query_runs otherwise. The runs are only
+    counted and numbered in SQLite, so the returned runs do not grow with the
+    runs of the store.
+    """
+    where, parameters = where_clause(filters)
+    groups = ", ".join(group_by)
+    # Keep the runs at which Position * size / Group_Runs (an integer division)
+    # steps up, all runs of groups with at most size runs
+    df = pd.read_sql_query(
+        f"""
+        SELECT * FROM (
+            SELECT *, rowid AS Run_Id,
+                ROW_NUMBER() OVER (PARTITION BY {groups} ORDER BY rowid) AS Position,
+                COUNT(*) OVER (PARTITION BY {groups}) AS Group_Runs
+            FROM runs {where}
+        )
+        WHERE Position * ? / Group_Runs > (Position - 1) * ? / Group_Runs
+        ORDER BY Run_Id
+        """,
+        connection,
+        params=parameters + [int(size), int(size)],
+    ).drop(columns=["Run_Id", "Position", "Group_Runs"])
+    return (
+        results_loader.to_schema(df) if not df.empty else results_loader.empty_frame()
+    )
+
+
+def query_summaries(connection, group_by=KEY_COLUMNS, **filters):
+    """
+    Function to get the summaries of the configurations of a slice, merged over
+    the keys that are not in group_by (e.g. over all file seeds and hosts for
+    the global slices). Returns the number of runs and the count, mean,
+    standard deviation, minimum and maximum of every metric per group.
+    """
+    where, parameters = where_clause(filters)
+    aggregates = ["SUM(Runs) AS Runs"]
+    for metric in METRIC_COLUMNS:
+        count, total, squares, minimum, maximum = summary_columns(metric)
+        aggregates += [
+            f"SUM({count}) AS {count}",
+            f"SUM({total}) AS {total}",
+            f"SUM({squares}) AS {squares}",
+            f"MIN({minimum}) AS {minimum}",
+            f"MAX({maximum}) AS {maximum}",
+        ]
+    keys = ", ".join(group_by)
+    sums = pd.read_sql_query(
+        f"SELECT {keys}, {', '.join(aggregates)} FROM summaries {where} "
+        f"GROUP BY {keys} ORDER BY {keys}",
+        connection,
+        params=parameters,
+    )
+
+    summaries = sums[list(group_by) + ["Runs"]].copy()
+    for metric in METRIC_COLUMNS:
+        count, total, squares, minimum, maximum = summary_columns(metric)
+        n = sums[count].astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sums[total] / n
+            # Sample variance, clipped against the rounding of the sums
+            variance = ((sums[squares] - n * mean**2) / (n - 1)).clip(lower=0)
+        summaries[f"{metric}_Count"] = sums[count]
+        summaries[f"{metric}_Mean"] = mean
+        summaries[f"{metric}_Std"] = np.sqrt(variance)
+        summaries[f"{metric}_Min"] = sums[minimum]
+        summaries[f"{metric}_Max"] = sums[maximum]
+    return summaries
+
+
+def query_sketches(connection, metric, group_by=KEY_COLUMNS, **filters):
+    """
+    Function to get the quantile sketches of a metric for the configurations
+    of a slice, merged over the keys that are not in group_by. Returns a dict
+    from the group_by values of every group to its sketch.
+    """
+    where, parameters = where_clause(filters)
+    where = f"{where} AND Metric = ?" if where else "WHERE Metric = ?"
+    keys = ", ".join(group_by)
+    rows = connection.execute(
+        f"SELECT {keys}, Digest FROM sketches {where} ORDER BY {keys}",
+        parameters + [metric],
+    ).fetchall()
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[:-1], []).append(quantile_sketch.from_bytes(row[-1]))
+    return {
+        group: quantile_sketch.merge_digests(digests)
+        for group, digests in groups.items()
+    }
+
+
+def query_quantiles(
+    connection,
+    group_by,
+    metrics=SKETCH_COLUMNS,
+    quantiles=(0.25, 0.5, 0.75),
+    threshold=None,
+    **filters,
+):
+    """
+    Function to estimate quantiles of the metrics for all groups of a slice
+    from the merged sketches, in the layout of grouped_quantiles (e.g.
+    External_Wall_Clock_Time_median and _IQR). With a threshold, the outliers
+    are filtered by their MAD from the median and the inlier bounds are added
+    (e.g. External_Wall_Clock_Time_Lower_Bound).
+    """
+    names = [
+        f"{metric}_{part}"
+        for metric in metrics
+        for part in (["Lower_Bound", "Upper_Bound"] if threshold is not None else [])
+        + [grouped_quantiles.quantile_name(quantile) for quantile in quantiles]
+    ]
+    columns = {name: {} for name in names}
+    for metric in metrics:
+        for group, digest in query_sketches(
+            connection, metric, group_by, **filters
+        ).items():
+            if threshold is None:
+                estimates = quantile_sketch.quantiles(digest, quantiles)
+            else:
+                estimates = quantile_sketch.inlier_quantiles(
+                    digest, quantiles, threshold
+                )
+                low, high = quantile_sketch.inlier_bounds(digest, threshold)
+                columns[f"{metric}_Lower_Bound"][group] = low
+                columns[f"{metric}_Upper_Bound"][group] = high
+            for quantile, estimate in zip(quantiles, estimates):
+                name = f"{metric}_{grouped_quantiles.quantile_name(quantile)}"
+                columns[name][group] = estimate
+    summary = pd.DataFrame(columns, columns=names, dtype=np.float64)
+    summary.index = pd.MultiIndex.from_tuples(list(summary.index), names=group_by)
+    for metric in metrics:
+        if 0.25 in quantiles and 0.75 in quantiles:
+            summary[f"{metric}_IQR"] = summary[f"{metric}_q3"] - summary[f"{metric}_q1"]
+    return summary.sort_index()
+
+
+def distinct_keys(connection, columns):
+    """Function to get the distinct values of key columns from the summaries"""
+    keys = ", ".join(columns)
+    return connection.execute(
+        f"SELECT DISTINCT {keys} FROM summaries ORDER BY {keys}"
+    ).fetchall()
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else RESULTS_PATH
+    start = time.perf_counter()
+    store = load_store(path, results_loader.HOST_ALIASES)
+    print(f"Ingested {path} in {time.perf_counter() - start:.3f} s")
+    start = time.perf_counter()
+    print(
+        query_summaries(
+            store, group_by=["Sort_Option", "Host_Name", "Input_Size", "Block_Size"]
+        ).to_string(index=False)
+    )
+    print(f"Queried the summaries in {time.perf_counter() - start:.3f} s")
+    store.close()
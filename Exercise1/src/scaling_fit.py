@@ -0,0 +1,145 @@
+"""
+Module for fitting measured run times against many candidate scaling functions
+n^p * log(n)^q at once. The design matrices of all candidate functions and
+groups (e.g. block sizes) are stacked and solved in one batched least-squares
+computation.
+"""
+import numpy as np
+from scipy.stats import t as t_distribution
+
+# Input sizes are scaled by this value before the functions are evaluated
+INPUT_SCALE = 100000
+
+
+def stack_groups(df, metric, group_key):
+    """
+    Function to stack the input sizes and the metric of every group into arrays
+    of shape (groups, rows), sorted by input size and padded with NaN
+    """
+    df = df.dropna(subset=[metric]).sort_values([group_key, "Input_Size"])
+    groups = df[group_key].unique()
+    sizes = df.groupby(group_key, sort=False, observed=True).size().to_numpy()
+    rows = np.arange(len(df)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    codes = np.repeat(np.arange(len(groups)), sizes)
+
+    input_sizes = np.full((len(groups), sizes.max(initial=0)), np.nan)
+    observed = np.full_like(input_sizes, np.nan)
+    input_sizes[codes, rows] = df["Input_Size"].to_numpy(np.float64)
+    observed[codes, rows] = df[metric].to_numpy(np.float64)
+    return groups, input_sizes, observed
+
+
+def scaling_functions(input_sizes, powers, log_powers, input_scale=INPUT_SCALE):
+    """
+    Function to evaluate all functions (n / input_scale)^p * log(n / input_scale)^q
+    for all powers p and log powers q. Returns an array of shape
+    (powers, log powers, *input_sizes.shape).
+    """
+    scaled = input_sizes / input_scale
+    powers = np.asarray(powers, dtype=np.float64).reshape(-1, 1, *[1] * scaled.ndim)
+    log_powers = np.asarray(log_powers, dtype=np.float64).reshape(
+        1, -1, *[1] * scaled.ndim
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return scaled**powers * np.log(scaled) ** log_powers
+
+
+def batched_least_squares(design, observed):
+    """
+    Function to solve the least-squares problems of a stack of design matrices
+    (..., rows, columns) and observations (..., rows) at once. Padded rows must
+    be zero in both, so that they do not change the solution.
+    Returns the coefficients (..., columns) and the fitted values (..., rows).
+    """
+    coefficients = np.linalg.pinv(design) @ observed[..., None]
+    return coefficients[..., 0], (design @ coefficients)[..., 0]
+
+
+def scaling_fits(df, metric, group_key, powers, log_powers, input_scale=INPUT_SCALE):
+    """
+    Function to fit the metric of every group linearly (with intercept) against
+    every function n^p * log(n)^q. Returns a dict of arrays with the groups, the
+    powers and log powers, the input sizes (groups, rows), and for every power,
+    log power and group the intercept and coefficient, R squared, Pearson
+    correlation with its p-value and the residuals (NaN for padded rows).
+    """
+    groups, input_sizes, observed = stack_groups(df, metric, group_key)
+    features = scaling_functions(input_sizes, powers, log_powers, input_scale)
+    valid = ~np.isnan(observed) & np.isfinite(features)
+    x = np.where(valid, features, 0)
+    y = np.where(valid, observed, 0)
+    y = np.broadcast_to(y, x.shape)
+
+    design = np.stack([valid.astype(np.float64), x], axis=-1)
+    coefficients, fitted = batched_least_squares(design, y)
+    residuals = np.where(valid, y - fitted, np.nan)
+
+    counts = valid.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        y_mean = y.sum(axis=-1, keepdims=True) / counts[..., None]
+        x_mean = x.sum(axis=-1, keepdims=True) / counts[..., None]
+        y_centered = np.where(valid, y - y_mean, 0)
+        x_centered = np.where(valid, x - x_mean, 0)
+        total_squares = (y_centered**2).sum(axis=-1)
+        r_squared = 1 - np.nansum(residuals**2, axis=-1) / total_squares
+        correlation = (x_centered * y_centered).sum(axis=-1) / np.sqrt(
+            (x_centered**2).sum(axis=-1) * total_squares
+        )
+        correlation = np.clip(correlation, -1, 1)
+        # Functions that are constant on the input sizes only fit the intercept
+        constant = (x_centered**2).sum(axis=-1) == 0
+        coefficients[constant] = np.stack(
+            [y_mean[..., 0][constant], np.full(constant.sum(), np.nan)], axis=-1
+        )
+        dof = counts - 2
+        t_statistic = correlation * np.sqrt(dof / (1 - correlation**2))
+    p_value = 2 * t_distribution.sf(np.abs(t_statistic), dof)
+
+    return {
+        "groups": groups,
+        "powers": np.asarray(powers, dtype=np.float64),
+        "log_powers": np.asarray(log_powers, dtype=np.float64),
+        "input_sizes": input_sizes,
+        "intercepts": coefficients[..., 0],
+        "coefficients": coefficients[..., 1],
+        "r_squared": r_squared,
+        "correlation": correlation,
+        "p_value": p_value,
+        "residuals": residuals,
+    }
+
+
+def save_fits(fits, fit_path):
+    """
+    Function to store the fit arrays of one metric in a binary file. The
+    residuals of every fit are stored padded to the largest group (with NaN),
+    so every block size and power can be read by indexing.
+    """
+    np.savez(fit_path, **fits)
+
+
+def load_fits(fit_path):
+    """
+    Function to open the stored fit arrays of one metric (to be closed after
+    use, e.g. in a with statement). An array is read from the file every time
+    it is accessed.
+    """
+    return np.load(fit_path, allow_pickle=False)
+
+
+def fit_index(fits, block_size=None, power=None, log_power=None):
+    """
+    Function to get the indices of a block size, power and log power into the
+    stored fit arrays (a slice over all values where one is None), where fits
+    holds the powers, log powers and groups of the fits
+    """
+    return tuple(
+        slice(None)
+        if value is None
+        else int(np.flatnonzero(np.isclose(values, value))[0])
+        for values, value in [
+            (fits["powers"], power),
+            (fits["log_powers"], log_power),
+            (fits["groups"], block_size),
+        ]
+    )
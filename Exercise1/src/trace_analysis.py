@@ -0,0 +1,152 @@
+"""
+Module for analysing the per-phase traces of the External Memory Merge Sort
+algorithm written by main.c (one JSON line per phase of a run). It breaks the
+run times down by merge round and shows where the time of every setting goes in
+stacked charts across input sizes and block sizes.
+"""
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+TRACE_PATH = "../res/trace.jsonl"
+PLOT_PATH = "../vis/trace_phases.png"
+
+# Fields of main.c that identify a run, and a setting across runs
+RUN_KEYS = [
+    "Host_Name",
+    "Sort_Option",
+    "File_Seed",
+    "Input_Size",
+    "Block_Size",
+    "Run_Start",
+]
+SETTING_KEYS = ["Host_Name", "Sort_Option", "Input_Size", "Block_Size"]
+COUNTERS = ["Freads", "Fwrites", "Fseeks", "Bytes_Read", "Bytes_Written"]
+
+
+def load_trace(trace_path):
+    """
+    Function to load a trace file into a DataFrame with one row per phase of a
+    run, with the duration of the phase and its time off the CPU (waiting for
+    I/O or other processes)
+    """
+    trace = pd.read_json(trace_path, lines=True, dtype={"Host_Name": str})
+    if "Distribution" in trace:
+        trace["Distribution"] = trace["Distribution"].fillna("rand")
+    trace["Duration"] = trace["End"] - trace["Start"]
+    trace["Off_CPU"] = (trace["Duration"] - trace["CPU"]).clip(lower=0)
+    return trace
+
+
+def setting_keys(trace):
+    """Function to get the keys of a setting, with the distribution if traced"""
+    return SETTING_KEYS + (["Distribution"] if "Distribution" in trace else [])
+
+
+def round_breakdown(trace):
+    """
+    Function to compute the median duration, CPU and off-CPU time, I/O counters
+    and throughput of every phase and merge round of every setting over its
+    runs. The peak RSS of the trace is the peak of the process so far, not of
+    a phase, so it is left out.
+    """
+    keys = setting_keys(trace)
+    breakdown = (
+        trace.groupby(keys + ["Phase", "Round"], sort=True)[
+            ["Duration", "CPU", "Off_CPU", "Sort_CPU"] + COUNTERS
+        ]
+        .median()
+        .reset_index()
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        breakdown["MB_per_Second"] = (
+            (breakdown["Bytes_Read"] + breakdown["Bytes_Written"])
+            / 1e6
+            / breakdown["Duration"]
+        )
+    breakdown["Runs"] = (
+        trace.groupby(keys + ["Phase", "Round"], sort=True).size().to_numpy()
+    )
+    return breakdown
+
+
+def phase_components(trace):
+    """
+    Function to split the external run time of every setting (mean over its
+    runs) into components in the order they happen: the internal sort and the
+    I/O of the initial partition, every merge round and all truncations of
+    files (Clear_File). Returns one row per setting and one column per component.
+    """
+    trace = trace[trace["Phase"] != "Classical"]
+    run_keys = [key for key in RUN_KEYS if key in trace] + (
+        ["Distribution"] if "Distribution" in trace else []
+    )
+    partition = trace[trace["Phase"] == "Initial_Partition"].set_index(run_keys)
+    components = [
+        partition["Sort_CPU"].rename("Internal_Sort"),
+        (partition["Duration"] - partition["Sort_CPU"]).rename("Partition_IO"),
+    ]
+    rounds = trace[trace["Phase"] == "Merge_Round"].pivot_table(
+        index=run_keys, columns="Round", values="Duration", aggfunc="sum"
+    )
+    rounds.columns = [f"Merge_Round_{r}" for r in rounds.columns]
+    clear = trace[trace["Phase"] == "Clear_File"].groupby(run_keys)["Duration"].sum()
+    runs = pd.concat(components + [rounds, clear.rename("Clear_File")], axis=1)
+    return runs.groupby(setting_keys(trace), sort=True).mean()
+
+
+def plot_stacked_phases(components, output_path):
+    """
+    Function to plot the components of the run time of every setting as
+    horizontal stacked bars (one panel per input size, one bar per block size)
+    """
+    input_sizes = components.index.get_level_values("Input_Size").unique()
+    colors = dict(
+        zip(
+            components.columns,
+            plt.cm.viridis(np.linspace(0, 0.95, len(components.columns))),
+        )
+    )
+    colors["Internal_Sort"] = "tab:red"
+    colors["Clear_File"] = "tab:gray"
+
+    fig, axes = plt.subplots(
+        len(input_sizes), 1, figsize=(12, 2 + 2 * len(input_sizes)), squeeze=False
+    )
+    for ax, input_size in zip(axes[:, 0], input_sizes):
+        settings = components.xs(input_size, level="Input_Size")
+        labels = [
+            ", ".join(str(value) for value in key)
+            if isinstance(key, tuple)
+            else str(key)
+            for key in settings.index
+        ]
+        left = np.zeros(len(settings))
+        for component in settings.columns:
+            widths = settings[component].fillna(0).to_numpy()
+            ax.barh(
+                labels,
+                widths,
+                left=left,
+                color=colors[component],
+                edgecolor="white",
+                label=component,
+            )
+            left += widths
+        ax.set_title(f"Input Size {input_size}")
+        ax.set_xlabel("Time (s)")
+    settings_name = ", ".join(
+        name for name in components.index.names if name != "Input_Size"
+    )
+    axes[0, 0].set_ylabel(settings_name)
+    handles, labels = axes[0, 0].get_legend_handles_labels()
+    fig.legend(handles, labels, loc="center left", bbox_to_anchor=(1, 0.5))
+    plt.tight_layout()
+    plt.savefig(output_path, bbox_inches="tight")
+    plt.close()
+
+
+if __name__ == "__main__":
+    phase_trace = load_trace(TRACE_PATH)
+    print(round_breakdown(phase_trace).to_string(index=False))
+    plot_stacked_phases(phase_components(phase_trace), PLOT_PATH)
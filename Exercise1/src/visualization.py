@@ -1,19 +1,52 @@
 """
 Module for Python Plotly visualization of algorithm run times
 """
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
 import seaborn as sns
 from matplotlib.colors import rgb2hex
-from scipy.stats import zscore
-from sklearn.neighbors import KernelDensity
+
+import binned_kde
+import output_manifest
+import quantile_sketch
+import results_loader
+import results_store
 
 SHOW_SCATTER_ERROR = True
-LIMIT_STD_DEV = True
+# Filter out runs further than MAD_THRESHOLD scaled MADs from the median of
+# their block size and input size, estimated from the quantile sketches
+FILTER_OUTLIERS = True
+MAD_THRESHOLD = quantile_sketch.MAD_THRESHOLD
 KDE_BANDWIDTH = 0.03
+# Bandwidth rule of the matplotlib KDEs (seaborn's default)
+KDE_SVG_BANDWIDTH = "scott"
 RESULTS_PATH = "../res/results.txt"
+VIS_PATH = "../vis"
+MANIFEST_PATH = f"{VIS_PATH}/manifest.json"
+MARKER_SYMBOLS = {"External": "circle", "Classical": "square"}
+MEDIAN_COLUMNS = [
+    "Block_Size",
+    "N",
+    "External_Wall_Clock_Time_median",
+    "External_Wall_Clock_Time_IQR",
+    "Classical_Wall_Clock_Time_median",
+    "Classical_Wall_Clock_Time_IQR",
+]
+KDE_COLUMNS = ["External_Wall_Clock_Time", "Classical_Wall_Clock_Time"]
+KDE_GROUP_KEYS = ["Block_Size", "N", "Host_Name"]
+
+# Number of worker processes that render the slices (None means one per core,
+# 1 renders all slices in this process)
+RENDER_WORKERS = None
+
+# Results store and manifest of the last run shared by all slices that are
+# rendered in the same process
+store = None
+manifest = None
 
 
 def format_number(size):
@@ -24,439 +57,511 @@ def format_number(size):
     return format_number(size[:-3]) + "." + size[-3:]
 
 
-def truncated_kdeplot(input_data, data_label, plot_color):
-    """Function to plot the kernel density estimation of input data with a specified color"""
-    kde = sns.kdeplot(
-        input_data,
-        color=plot_color,
-        label=data_label,
-        warn_singular=False,
+def load_store():
+    """Function to open the results store after ingesting the new results"""
+    return results_store.load_store(RESULTS_PATH, results_loader.HOST_ALIASES)
+
+
+def plotting_parameters():
+    """Function to collect the parameters that every figure depends on"""
+    return {
+        "SHOW_SCATTER_ERROR": SHOW_SCATTER_ERROR,
+        "FILTER_OUTLIERS": FILTER_OUTLIERS,
+        "MAD_THRESHOLD": MAD_THRESHOLD,
+        "SKETCH_COMPRESSION": quantile_sketch.COMPRESSION,
+        "KDE_BANDWIDTH": KDE_BANDWIDTH,
+        "KDE_SVG_BANDWIDTH": KDE_SVG_BANDWIDTH,
+        "KDE_GRID_SIZE": binned_kde.GRID_SIZE,
+        "MARKER_SYMBOLS": MARKER_SYMBOLS,
+    }
+
+
+def slice_file_name(prefix, extension, sort_option, host_name, file_seed):
+    """
+    Function to get the output file name of a figure of a data slice, where -1
+    (or "-1") marks the global slices over all file seeds (or hosts)
+    """
+    file_seed_part = f"_file_seed_{file_seed}" if file_seed != -1 else ""
+    host_name_part = f"_host_name_{host_name}" if host_name != "-1" else ""
+    sort_option_part = f"_sort_option_{sort_option}" if sort_option != "-1" else ""
+    return (
+        f"{VIS_PATH}/{prefix}{file_seed_part}{host_name_part}{sort_option_part}"
+        f".{extension}"
     )
 
-    x, _ = kde.get_lines()[0].get_data()
 
-    plt.scatter(
-        input_data, np.zeros_like(input_data), color=color, alpha=0.2
-    )  # Scatter plot of data points
-    plt.xlim(0, max(x))  # Set x-axis limits from 0 to the maximum x value
-    return kde
-
-
-# Begin with loading the data
-df = pd.read_csv(RESULTS_PATH, delimiter=",", header=None, engine="python", skiprows=1)
-df.columns = [
-    "file_seed",
-    "N",
-    "Block_Size",
-    "N_MB",
-    "Block_Size_MB",
-    "External_Wall_Clock_Time",
-    "External_CPU_Time",
-    "Classical_Wall_Clock_Time",
-    "Classical_CPU_Time",
-    "Merge_Rounds",
-    "Classical_Rounds",
-    "Sort_Option",
-    "Host_Name",
-]
-
-# Process columns (except Host_Name and Sort_Option)
-for column in df.columns:
-    if column not in ("Host_Name", "Sort_Option"):
-        df[column] = df[column].apply(
-            lambda x: float(x.strip(" MB,").replace(",", ""))
-            if isinstance(x, str)
-            else x
+def slice_kdes(df_slice, bandwidth, cut, points):
+    """
+    Function to estimate the KDEs of both algorithms for all block size, input
+    size and host groups of a slice in one batched computation per algorithm
+    """
+    kdes = {}
+    for metric in KDE_COLUMNS:
+        groups, grid, density, _ = binned_kde.group_kdes(
+            df_slice, KDE_GROUP_KEYS, metric, bandwidth, cut, points
         )
+        kdes[metric] = {group: (grid[i], density[i]) for i, group in enumerate(groups)}
+    return kdes
 
-# Process Host_Name column to remove spaces
-df["Host_Name"] = (
-    df["Host_Name"].str.replace(" ", "").replace({"BookBook-Pro-2.local": "MacBook"})
-)
-
-file_seeds = df["file_seed"].unique()
-
-# Add -1 (columns values globality indicator) to plot data from all files in the same visualization
-file_seeds = np.append(file_seeds, -1)
 
-host_names = df["Host_Name"].unique()
-host_names = np.append(host_names, "-1")
+def truncated_kdeplot(input_data, kde, data_label, plot_color):
+    """
+    Function to plot the precomputed kernel density estimation of input data
+    with a specified color
+    """
+    kde_points, kde_values = kde
 
-internal_sort_options = df["Sort_Option"].unique()
+    # There is no KDE line for data without variance
+    if not np.isnan(kde_values).all():
+        plt.plot(kde_points, kde_values, color=plot_color, label=data_label)
 
-for sort_option in internal_sort_options:
-    df_host_host = df[df["Sort_Option"] == sort_option]
-    for host_name in host_names:
-        # Select specific or global data
-        df_host = df_host_host[df_host_host["Host_Name"] == host_name]
-        df_use = df_host if host_name != "-1" else df_host_host
-        for file_seed in file_seeds:
-            df_file_filtered = (
-                df_use[df_use["file_seed"] == file_seed] if file_seed != -1 else df_use
-            )
+    plt.scatter(
+        input_data, np.zeros_like(input_data), color=plot_color, alpha=0.2
+    )  # Scatter plot of data points
 
-            block_sizes = df_file_filtered["Block_Size"].unique()
-            input_sizes = df_file_filtered["N"].unique()
+    lines = plt.gca().get_lines()
+    if lines:
+        x = lines[0].get_xdata()
+        plt.xlim(0, max(x))  # Set x-axis limits from 0 to the maximum x value
 
-            if LIMIT_STD_DEV:
-                # Filter out outliers that have large Z-scores for the relevant metrics' columns
-                z_scores_external = zscore(df_file_filtered["External_Wall_Clock_Time"])
-                z_scores_classical = zscore(
-                    df_file_filtered["Classical_Wall_Clock_Time"]
-                )
 
-                # Set limit to 3 standard deviations
-                THRESHOLD = 3
-                outliers_mask_external = np.abs(z_scores_external) > THRESHOLD
-                outliers_mask_classical = np.abs(z_scores_classical) > THRESHOLD
-
-                # Filter out rows with outliers
-                df_file_filtered = df_file_filtered[
-                    ~(outliers_mask_external | outliers_mask_classical)
-                ]
-
-            palette = sns.color_palette("husl", n_colors=len(block_sizes))
-            hex_palette = [rgb2hex(color) for color in palette]
-            block_size_colors = {
-                size: color for size, color in zip(block_sizes, hex_palette)
-            }
-
-            # Use medians as a robust performance metric
-            medians_ext = (
-                df_file_filtered.groupby(["Block_Size", "N"])[
-                    "External_Wall_Clock_Time"
-                ]
-                .median()
-                .reset_index()
-            )
-            medians_class = (
-                df_file_filtered.groupby(["Block_Size", "N"])[
-                    "Classical_Wall_Clock_Time"
-                ]
-                .median()
-                .reset_index()
-            )
+def plotly_similar_kde(input_data, kde, data_label, plot_color, host):
+    """Function to prepare precomputed kernel density estimation traces for use in Plotly"""
+    input_data = input_data.dropna()  # Remove NaN values
+    kde_points, kde_values = kde
 
-            fig = go.Figure()
+    if input_data.empty:
+        return None
 
-            # Calculate IQR for External Wall Clock Time
-            q1_ext = (
-                df_file_filtered.groupby(["Block_Size", "N"])[
-                    "External_Wall_Clock_Time"
-                ]
-                .quantile(0.25)
-                .reset_index()
-            )
-            q3_ext = (
-                df_file_filtered.groupby(["Block_Size", "N"])[
-                    "External_Wall_Clock_Time"
-                ]
-                .quantile(0.75)
-                .reset_index()
-            )
-            iqr_ext = q3_ext.merge(
-                q1_ext, on=["Block_Size", "N"], suffixes=("_q3", "_q1")
-            )
-            iqr_ext["IQR"] = (
-                iqr_ext["External_Wall_Clock_Time_q3"]
-                - iqr_ext["External_Wall_Clock_Time_q1"]
-            )
+    kde_trace = go.Scatter(
+        x=kde_points,
+        y=kde_values,
+        mode="lines",
+        name=f"{data_label} ({host})",
+        line={"color": plot_color},
+    )
 
-            # Calculate IQR for Classical Wall Clock Time
-            q1_class = (
-                df_file_filtered.groupby(["Block_Size", "N"])[
-                    "Classical_Wall_Clock_Time"
-                ]
-                .quantile(0.25)
-                .reset_index()
-            )
-            q3_class = (
-                df_file_filtered.groupby(["Block_Size", "N"])[
-                    "Classical_Wall_Clock_Time"
-                ]
-                .quantile(0.75)
-                .reset_index()
-            )
-            iqr_class = q3_class.merge(
-                q1_class, on=["Block_Size", "N"], suffixes=("_q3", "_q1")
-            )
-            iqr_class["IQR"] = (
-                iqr_class["Classical_Wall_Clock_Time_q3"]
-                - iqr_class["Classical_Wall_Clock_Time_q1"]
-            )
+    data_trace = go.Scatter(
+        x=input_data,
+        y=np.zeros_like(input_data),
+        mode="markers",
+        name=f"{data_label} (Data) ({host})",
+        marker={
+            "size": 5,
+            "color": plot_color,
+            "symbol": "circle",
+        },
+    )
 
-            # Add scatter traces for Medians with error bars
-            for _, row in medians_ext.iterrows():
-                block_size = row["Block_Size"]
-                median_wall_clock_time = row["External_Wall_Clock_Time"]
-                color = block_size_colors[block_size]
-
-                scatter = go.Scatter(
-                    x=[row["N"]],
-                    y=[median_wall_clock_time],
-                    mode="markers",
-                    name=f"Block Size {format_number(block_size)} (External) ({host_name})",
-                    marker=dict(size=10, color=color),
-                    customdata=[format_number(block_size) + "<br>External"],
-                )
-                fig.add_trace(scatter)
-
-                iqr_row = iqr_ext[
-                    (iqr_ext["Block_Size"] == block_size) & (iqr_ext["N"] == row["N"])
-                ]
-                iqr_value = iqr_row["IQR"].iloc[0]
-                scatter_error = go.Scatter(
-                    x=[row["N"]],
-                    y=[median_wall_clock_time],
-                    mode="markers",
-                    marker=dict(size=10, color=color),
-                    error_y=dict(type="data", array=[iqr_value / 2], visible=True),
-                    customdata=[
-                        f"Block Size {format_number(block_size)} (External) ({host_name})"
-                    ],
+    return kde_trace, data_trace
+
+
+def add_median_traces(fig, summary, block_size_colors, host_name):
+    """
+    Function to add the medians with IQR error bars to a figure, using one trace
+    per block size and algorithm instead of one trace per point
+    """
+    for block_size, block_summary in summary.groupby("Block_Size"):
+        color = block_size_colors[block_size]
+        for ext_or_class in ["External", "Classical"]:
+            block_size_suffix = "*" if ext_or_class == "Classical" else ""
+            fig.add_trace(
+                go.Scatter(
+                    x=block_summary["N"],
+                    y=block_summary[f"{ext_or_class}_Wall_Clock_Time_median"],
+                    mode="lines+markers",
+                    name=f"Block Size {format_number(block_size)} ({ext_or_class}) ({host_name})",
+                    marker=dict(
+                        size=10, color=color, symbol=MARKER_SYMBOLS[ext_or_class]
+                    ),
+                    line={"color": color, "width": 2},
+                    error_y=dict(
+                        type="data",
+                        array=block_summary[f"{ext_or_class}_Wall_Clock_Time_IQR"] / 2,
+                        visible=True,
+                        color=color,
+                        thickness=1,
+                        # Without the scatter error, the error bars are plain lines
+                        width=4 if SHOW_SCATTER_ERROR else 0,
+                    ),
+                    customdata=np.full(
+                        len(block_summary),
+                        format_number(block_size)
+                        + block_size_suffix
+                        + f"<br>{ext_or_class}",
+                        dtype=object,
+                    ),
                 )
-                if SHOW_SCATTER_ERROR:
-                    fig.add_trace(scatter_error)
-
-            for _, row in medians_class.iterrows():
-                block_size = row["Block_Size"]
-                median_wall_clock_time = row["Classical_Wall_Clock_Time"]
-                color = block_size_colors[block_size]
-
-                scatter = go.Scatter(
-                    x=[row["N"]],
-                    y=[median_wall_clock_time],
-                    mode="markers",
-                    name=f"Block Size {format_number(block_size)} (Classical) ({host_name})",
-                    marker=dict(size=10, color=color, symbol="square"),
-                    customdata=[format_number(block_size) + "*" + "<br>Classical"],
-                )
-                fig.add_trace(scatter)
-
-                iqr_row = iqr_class[
-                    (iqr_class["Block_Size"] == block_size)
-                    & (iqr_class["N"] == row["N"])
-                ]
-                iqr_value = iqr_row["IQR"].iloc[0]
-                scatter_error = go.Scatter(
-                    x=[row["N"]],
-                    y=[median_wall_clock_time],
-                    mode="markers",
-                    marker=dict(size=10, color=color, symbol="square"),
-                    error_y=dict(type="data", array=[iqr_value / 2], visible=True),
-                    customdata=[
-                        f"Block Size {format_number(block_size)} (Classical) ({host_name})"
-                    ],
-                )
-                if SHOW_SCATTER_ERROR:
-                    fig.add_trace(scatter_error)
-
-            # Connect medians with lines
-            for block_size in df_file_filtered["Block_Size"].unique():
-                for ext_or_class in ["External", "Classical"]:
-                    color = block_size_colors[block_size]
-
-                    medians = (
-                        medians_ext if ext_or_class == "External" else medians_class
-                    )
-                    iqr_data = iqr_ext if ext_or_class == "External" else iqr_class
-
-                    filtered_medians = medians[medians["Block_Size"] == block_size]
-                    filtered_iqr = iqr_data[iqr_data["Block_Size"] == block_size]
-
-                    x_vals = filtered_medians["N"]
-                    y_vals = filtered_medians[f"{ext_or_class}_Wall_Clock_Time"]
-                    iqr_value = filtered_iqr["IQR"] / 2
-
-                    fig.add_trace(
-                        go.Scatter(
-                            x=x_vals,
-                            y=y_vals,
-                            mode="lines",
-                            name=f"Block Size {format_number(block_size)} ({ext_or_class})",
-                            line={"color": color, "width": 2},
-                        )
-                    )
-
-                    # Add error bars
-                    for x_val, y_val, error in zip(x_vals, y_vals, iqr_value):
-                        fig.add_trace(
-                            go.Scatter(
-                                x=[x_val, x_val],
-                                y=[y_val - error, y_val + error],
-                                mode="lines",
-                                line={"color": color, "width": 1},
-                                showlegend=False,
-                                customdata=[
-                                    format_number(block_size) + "<br>Classical"
-                                ],
-                            )
-                        )
-
-            # Use a log-log plot so that we can see differences (change scaling)
-            fig.update_layout(
-                title="Median Wall Clock Time vs. Input Size",
-                xaxis_title="Input Size",
-                yaxis_title="Median Wall Clock Time",
-                xaxis_type="log",
-                yaxis_type="log",
             )
 
-            fig.update_traces(
-                hovertemplate="Input Size: %{x}<br>"
-                + "Median Wall Clock Time: %{y:.6f}<br>"
-                + "Block Size: %{customdata}"
-            )
 
-            fig.write_html(
-                f"../vis/visualization{'_file_seed_' + str(file_seed) if file_seed != -1 else ''} \
-                    {'_host_name_' + host_name if host_name != '-1' else ''} \
-                    {'_sort_option_' + str(sort_option) if sort_option != '-1' else ''}.html"
-            )
-            fig.write_image(
-                f"../vis/visualization{'_file_seed_' + str(file_seed) if file_seed != -1 else ''} \
-                    {'_host_name_' + host_name if host_name != '-1' else ''} \
-                    {'_sort_option_' + str(sort_option) if sort_option != '-1' else ''}.png",
-                format="png",
-            )
+def slice_filters(sort_option, host_name, file_seed):
+    """Function to get the results store filters of a specific or global slice"""
+    return {
+        "Sort_Option": sort_option,
+        "Host_Name": host_name if host_name != "-1" else None,
+        "File_Seed": file_seed if file_seed != -1 else None,
+    }
+
+
+def select_slice(connection, sort_option, host_name, file_seed, max_runs=None):
+    """
+    Function to query the specific or global data of a slice from the results
+    store, with the column names used for plotting. With max_runs, at most
+    max_runs evenly spaced runs of every KDE group are selected.
+    """
+    filters = slice_filters(sort_option, host_name, file_seed)
+    if max_runs is None:
+        df_slice = results_store.query_runs(connection, **filters)
+    else:
+        df_slice = results_store.query_sampled_runs(
+            connection, ["Host_Name", "Input_Size", "Block_Size"], max_runs, **filters
+        )
+    return df_slice.rename(columns={"File_Seed": "file_seed", "Input_Size": "N"})
+
+
+def slice_summary(connection, sort_option, host_name, file_seed):
+    """
+    Function to estimate the quartiles of the wall clock times of a slice for
+    every block size and input size (and the inlier bounds when outliers are
+    filtered) from the quantile sketches of the configurations of the slice
+    """
+    return (
+        results_store.query_quantiles(
+            connection,
+            ["Block_Size", "Input_Size"],
+            KDE_COLUMNS,
+            threshold=MAD_THRESHOLD if FILTER_OUTLIERS else None,
+            **slice_filters(sort_option, host_name, file_seed),
+        )
+        .reset_index()
+        .rename(columns={"Input_Size": "N"})
+    )
 
-            # Kernel density estimation part {
 
-            labels = []
-            # Generate KDE plots for each combination
-            for (block_size, n, host_name), data in df_file_filtered.groupby(
-                ["Block_Size", "N", "Host_Name"]
-            ):
-                plt.figure(figsize=(8, 6))
+def filter_outliers(df_slice, summary):
+    """
+    Function to filter out the runs whose wall clock times lie outside of the
+    inlier bounds of their block size and input size in the slice summary
+    """
+    bounds = df_slice[["Block_Size", "N"]].merge(
+        summary, how="left", on=["Block_Size", "N"]
+    )
+    outliers = np.zeros(len(df_slice), dtype=bool)
+    for metric in KDE_COLUMNS:
+        values = df_slice[metric].to_numpy()
+        outliers |= (values < bounds[f"{metric}_Lower_Bound"].to_numpy()) | (
+            values > bounds[f"{metric}_Upper_Bound"].to_numpy()
+        )
+    return df_slice[~outliers]
+
+
+def block_size_palette(block_sizes, palette_name):
+    """Function to map block sizes to the hex colors of a seaborn palette"""
+    palette = sns.color_palette(palette_name, n_colors=len(block_sizes))
+    return {size: rgb2hex(color) for size, color in zip(block_sizes, palette)}
+
+
+def median_figure(summary, block_size_colors, host_name):
+    """
+    Function to build the Plotly figure of the median wall clock times vs.
+    input sizes of a slice from its summary
+    """
+    fig = go.Figure()
+    add_median_traces(fig, summary, block_size_colors, host_name)
+
+    # Use a log-log plot so that we can see differences (change scaling)
+    fig.update_layout(
+        title="Median Wall Clock Time vs. Input Size",
+        xaxis_title="Input Size",
+        yaxis_title="Median Wall Clock Time",
+        xaxis_type="log",
+        yaxis_type="log",
+    )
 
-                COLOR_EXTERNAL = "blue"
-                COLOR_CLASSICAL = "red"
+    fig.update_traces(
+        hovertemplate="Input Size: %{x}<br>"
+        + "Median Wall Clock Time: %{y:.6f}<br>"
+        + "Block Size: %{customdata}"
+    )
+    return fig
+
+
+def render_median_figure(summary, block_sizes, sort_option, host_name, file_seed):
+    """
+    Function to plot the median wall clock times vs. input sizes of a slice,
+    unless the figure was already built from the same inputs. Returns the
+    output paths with the hash of their inputs.
+    """
+    block_size_colors = block_size_palette(block_sizes, "husl")
+
+    paths = [
+        slice_file_name("visualization", extension, sort_option, host_name, file_seed)
+        for extension in ["html", "png"]
+    ]
+    key = output_manifest.digest(
+        summary[MEDIAN_COLUMNS],
+        plotting_parameters(),
+        list(block_size_colors.items()),
+        host_name,
+    )
+    if output_manifest.is_current(manifest, paths, key):
+        return dict.fromkeys(paths, key)
+
+    fig = median_figure(summary, block_size_colors, host_name)
+
+    # Reference one shared plotly.js file in ../vis instead of embedding it
+    fig.write_html(paths[0], include_plotlyjs="directory")
+    fig.write_image(paths[1], format="png")
+    return dict.fromkeys(paths, key)
+
+
+def render_kde_svgs(df_slice, sort_option, host_name, file_seed):
+    """
+    Function to plot one matplotlib KDE per block size, input size and host,
+    skipping the plots that were already built from the same inputs. Returns
+    the output paths with the hash of their inputs.
+    """
+    outputs = {}
+    kdes = None
+    for (block_size, n, group_host_name), data in df_slice.groupby(
+        KDE_GROUP_KEYS, observed=True
+    ):
+        # Global host slices hold the same block and input sizes for every host
+        group_host_part = f"_group_host_{group_host_name}" if host_name == "-1" else ""
+        path = slice_file_name(
+            f"kde_block_size_{block_size}_n_{n}{group_host_part}",
+            "svg",
+            sort_option,
+            host_name,
+            file_seed,
+        )
+        key = output_manifest.digest(
+            data[KDE_COLUMNS],
+            plotting_parameters(),
+            [int(block_size), int(n), group_host_name],
+        )
+        outputs[path] = key
+        if output_manifest.is_current(manifest, [path], key):
+            continue
+        if kdes is None:
+            kdes = slice_kdes(df_slice, KDE_SVG_BANDWIDTH, cut=3, points=200)
+
+        plt.figure(figsize=(8, 6))
+
+        color_external = "blue"
+        color_classical = "red"
+
+        truncated_kdeplot(
+            input_data=data["Classical_Wall_Clock_Time"],
+            kde=kdes["Classical_Wall_Clock_Time"][(block_size, n, group_host_name)],
+            data_label="Classical",
+            plot_color=color_classical,
+        )
+        truncated_kdeplot(
+            input_data=data["External_Wall_Clock_Time"],
+            kde=kdes["External_Wall_Clock_Time"][(block_size, n, group_host_name)],
+            data_label=f"External with Block Size {format_number(block_size)} "
+            f"({(int) (block_size / 250000)} MB)",
+            plot_color=color_external,
+        )
 
-                truncated_kdeplot(
-                    input_data=data["Classical_Wall_Clock_Time"],
-                    data_label="Classical",
-                    plot_color=COLOR_CLASSICAL,
-                )
-                truncated_kdeplot(
-                    input_data=data["External_Wall_Clock_Time"],
-                    data_label=f"External with Block Size {format_number(block_size)} \
-                        ({(int) (block_size / 250000)} MB)",
-                    plot_color=COLOR_EXTERNAL,
-                )
+        plt.title(
+            f"KDE for Wall Clock Time (Block Size {format_number(block_size)} "
+            f"({(int) (block_size / 250000)} MB), Input Size {format_number(n)} "
+            f"({(int) (n / 250000)} MB) ({group_host_name})"
+        )
+        plt.xlabel("Wall Clock Time")
+        plt.ylabel("Density")
+        plt.legend()
+
+        plt.savefig(path, format="svg")
+        plt.close()
+    return outputs
+
+
+def kde_figure(df_slice, block_size_red_shades, block_size_blue_shades):
+    """
+    Function to build the Plotly figure of the KDEs of all groups of a slice,
+    colored by block size
+    """
+    traces = []
+    kdes = slice_kdes(df_slice, KDE_BANDWIDTH, cut=0, points=1000)
+
+    # Generate KDE plots for each combination
+    for (block_size, n, group_host_name), data in df_slice.groupby(
+        KDE_GROUP_KEYS, observed=True
+    ):
+        colors = {
+            "External_Wall_Clock_Time": block_size_blue_shades[block_size],
+            "Classical_Wall_Clock_Time": block_size_red_shades[block_size],
+        }
+        labels = {
+            "External_Wall_Clock_Time": "External",
+            "Classical_Wall_Clock_Time": "Classical",
+        }
+
+        for mode in [
+            "External_Wall_Clock_Time",
+            "Classical_Wall_Clock_Time",
+        ]:
+            label = (
+                f"Block Size {format_number(block_size)} "
+                f"({labels[mode]}), Input Size {format_number(n)}"
+            )
 
-                plt.title(
-                    f"KDE for Wall Clock Time (Block Size {format_number(block_size)} \
-                        ({(int) (block_size / 250000)} MB), Input Size {format_number(n)} \
-                        ({(int) (n / 250000)} MB) ({host_name})"
-                )
-                plt.xlabel("Wall Clock Time")
-                plt.ylabel("Density")
-                plt.legend()
-
-                plt.savefig(
-                    f"../vis/kde_block_size_{block_size}_n_{n} \
-                        {'_file_seed_' + str(file_seed) if file_seed != -1 else ''} \
-                        {'_sort_option_' + str(sort_option) if sort_option != '-1' else ''}.svg",
-                    format="svg",
-                )
-                plt.close()
+            traces_kde_data = plotly_similar_kde(
+                input_data=data[mode],
+                kde=kdes[mode][(block_size, n, group_host_name)],
+                data_label=label,
+                plot_color=colors[mode],
+                host=group_host_name,
+            )
+            if traces_kde_data is not None:
+                trace_kde, trace_data = traces_kde_data
+                traces.extend([trace_kde, trace_data])
+
+    layout = go.Layout(
+        title="KDE for Wall Clock Time",
+        xaxis={"title": "Wall Clock Time"},
+        yaxis={"title": "Density", "overlaying": "y"},
+        legend={"orientation": "h"},
+    )
 
-            red_palette = sns.color_palette("Reds", n_colors=len(block_sizes))
-            blue_palette = sns.color_palette("Blues", n_colors=len(block_sizes))
-            hex_red_palette = [rgb2hex(color) for color in red_palette]
-            hex_blue_palette = [rgb2hex(color) for color in blue_palette]
+    return go.Figure(data=traces, layout=layout)
+
+
+def render_kde_figure(df_slice, block_sizes, sort_option, host_name, file_seed):
+    """
+    Function to plot the KDEs of all groups of a slice into one Plotly figure,
+    unless the figure was already built from the same inputs. Returns the
+    output paths with the hash of their inputs.
+    """
+    block_size_red_shades = block_size_palette(block_sizes, "Reds")
+    block_size_blue_shades = block_size_palette(block_sizes, "Blues")
+
+    paths = [
+        slice_file_name("kde_plot", extension, sort_option, host_name, file_seed)
+        for extension in ["html", "png"]
+    ]
+    key = output_manifest.digest(
+        df_slice[["Block_Size", "N", "Host_Name"] + KDE_COLUMNS],
+        plotting_parameters(),
+        list(block_size_red_shades.items()),
+        list(block_size_blue_shades.items()),
+    )
+    if output_manifest.is_current(manifest, paths, key):
+        return dict.fromkeys(paths, key)
 
-            block_size_red_shades = {
-                size: color for size, color in zip(block_sizes, hex_red_palette)
-            }
-            block_size_blue_shades = {
-                size: color for size, color in zip(block_sizes, hex_blue_palette)
-            }
+    fig = kde_figure(df_slice, block_size_red_shades, block_size_blue_shades)
 
-            def plotly_similar_kde(input_data, data_label, plot_color, host):
-                """Function to prepare kernel density estimation traces for use in Plotly"""
-                input_data = input_data.dropna()  # Remove NaN values
+    fig.write_html(paths[0])
+    fig.write_image(paths[1], format="png")
+    return dict.fromkeys(paths, key)
 
-                if input_data.empty:
-                    return None
 
-                kde = KernelDensity(kernel="gaussian", bandwidth=KDE_BANDWIDTH).fit(
-                    input_data.values.reshape(-1, 1)
-                )
-                kde_points = np.linspace(input_data.min(), input_data.max(), 1000)
-                kde_values = np.exp(kde.score_samples(kde_points.reshape(-1, 1)))
-
-                kde_trace = go.Scatter(
-                    x=kde_points,
-                    y=kde_values,
-                    mode="lines",
-                    name=f"{data_label} ({host})",
-                    line={"color": plot_color},
-                )
+def render_slice(sort_option, host_name, file_seed):
+    """
+    Function to render all figures of one sort option, host and file seed slice
+    whose inputs changed. Returns all output paths of the slice with the hash
+    of their inputs.
+    """
+    df_slice = select_slice(store, sort_option, host_name, file_seed)
 
-                data_trace = go.Scatter(
-                    x=input_data,
-                    y=np.zeros_like(input_data),
-                    mode="markers",
-                    name=f"{data_label} (Data) ({host})",
-                    marker={
-                        "size": 5,
-                        "color": plot_color,
-                        "symbol": "circle",
-                    },
-                )
+    block_sizes = df_slice["Block_Size"].unique()
 
-                return kde_trace, data_trace
-
-            traces = []
-
-            # Generate KDE plots for each combination
-            for (block_size, n, host_name), data in df_file_filtered.groupby(
-                ["Block_Size", "N", "Host_Name"]
-            ):
-                colors = {
-                    "External_Wall_Clock_Time": block_size_blue_shades[block_size],
-                    "Classical_Wall_Clock_Time": block_size_red_shades[block_size],
-                }
-                labels = {
-                    "External_Wall_Clock_Time": "External",
-                    "Classical_Wall_Clock_Time": "Classical",
-                }
-
-                for mode in [
-                    "External_Wall_Clock_Time",
-                    "Classical_Wall_Clock_Time",
-                ]:
-                    color = colors[mode]
-                    label = f"Block Size {format_number(block_size)} \
-                        ({labels[mode]}), Input Size {format_number(n)}"
-
-                    traces_kde_data = plotly_similar_kde(
-                        input_data=data[mode],
-                        data_label=label,
-                        plot_color=color,
-                        host=host_name,
-                    )
-                    if traces_kde_data is not None:
-                        trace_kde, trace_data = traces_kde_data
-                        traces.extend([trace_kde, trace_data])
-
-            layout = go.Layout(
-                title="KDE for Wall Clock Time",
-                xaxis={"title": "Wall Clock Time"},
-                yaxis={"title": "Density", "overlaying": "y"},
-                legend={"orientation": "h"},
-            )
+    # Use medians as a robust performance metric and IQRs for the error bars,
+    # estimated for both algorithms from the sketches instead of the runs
+    summary = slice_summary(store, sort_option, host_name, file_seed)
+    if FILTER_OUTLIERS:
+        df_slice = filter_outliers(df_slice, summary)
 
-            fig = go.Figure(data=traces, layout=layout)
+    outputs = render_median_figure(
+        summary, block_sizes, sort_option, host_name, file_seed
+    )
 
-            fig.write_html(
-                f"../vis/kde_plot{'_file_seed_' + str(file_seed) if file_seed != -1 else ''} \
-                    {'_sort_option_' + str(sort_option) if sort_option != '-1' else ''}.html"
-            )
-            fig.write_image(
-                f"../vis/kde_plot{'_file_seed_' + str(file_seed) if file_seed != -1 else ''} \
-                    {'_sort_option_' + str(sort_option) if sort_option != '-1' else ''}.png",
-                format="png",
-            )
-            # Kernel density estimation part }
+    # Kernel density estimation part {
+    outputs.update(render_kde_svgs(df_slice, sort_option, host_name, file_seed))
+    outputs.update(
+        render_kde_figure(df_slice, block_sizes, sort_option, host_name, file_seed)
+    )
+    # Kernel density estimation part }
+    return outputs
+
+
+def init_worker(worker_manifest):
+    """
+    Function to prepare a rendering worker process. Every worker opens its own
+    connection to the results store (a connection must not be shared with a
+    forked process), so the tasks only carry the slice keys and query their
+    slices. The manifest of the main process is passed on (it is empty when
+    rendering is forced), since a spawned worker does not inherit it. Since
+    the workers live until all slices are rendered, kaleido reuses its image
+    export process across tasks.
+    """
+    global store, manifest  # pylint: disable=global-statement
+    plt.switch_backend("Agg")
+    store = results_store.open_store(results_store.store_path(RESULTS_PATH))
+    manifest = worker_manifest
+
+
+def slice_keys(connection):
+    """
+    Function to list all sort option, host and file seed slices, including the
+    global "-1" host and -1 file seed slices over all hosts and files
+    """
+    sort_options = [
+        key[0] for key in results_store.distinct_keys(connection, ["Sort_Option"])
+    ]
+    file_seeds = [
+        int(key[0]) for key in results_store.distinct_keys(connection, ["File_Seed"])
+    ] + [-1]
+    host_names = [
+        str(key[0]) for key in results_store.distinct_keys(connection, ["Host_Name"])
+    ] + ["-1"]
+    return [
+        (sort_option, host_name, file_seed)
+        for sort_option in sort_options
+        for host_name in host_names
+        for file_seed in file_seeds
+    ]
+
+
+def render_all(workers=RENDER_WORKERS, force=False):
+    """
+    Function to render the figures of all slices whose inputs changed with a
+    pool of processes, record the hashes of their inputs in the manifest, and
+    list the outputs of earlier runs that are not produced anymore
+    """
+    global store, manifest  # pylint: disable=global-statement
+    store = load_store()
+    manifest = {} if force else output_manifest.load_manifest(MANIFEST_PATH)
+    keys = slice_keys(store)
+
+    if workers == 1:
+        slice_outputs = [render_slice(*key) for key in keys]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=init_worker,
+            initargs=(manifest,),
+        ) as executor:
+            slice_outputs = list(executor.map(render_slice, *zip(*keys)))
+
+    outputs = {}
+    for single_slice_outputs in slice_outputs:
+        outputs.update(single_slice_outputs)
+
+    # Keep stale outputs in the manifest until they are removed
+    stale = output_manifest.stale_outputs(manifest, outputs)
+    outputs.update({path: manifest[path] for path in stale})
+    output_manifest.save_manifest(MANIFEST_PATH, outputs)
+
+    if stale:
+        print("Stale outputs that are not produced anymore and can be removed:")
+        for path in stale:
+            print(path)
+
+
+if __name__ == "__main__":
+    render_all()
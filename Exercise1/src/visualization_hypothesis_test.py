@@ -6,17 +6,20 @@ import seaborn as sns
 
 import htest
 
-hypothesis_test_results = htest.perform_hypothesis_tests()
+# Recompute the hypothesis tests even if the stored ones are up to date
+REFRESH_TESTS = False
+
+hypothesis_test_results = htest.load_hypothesis_tests(refresh=REFRESH_TESTS)
 
 
 def get_rejection_counts(test_results, test_metric):
     """Function to calculate the number of rejections in a setting with many hypothesis tests"""
-    reject_count = sum(
-        1
-        for test in test_results
-        if test["Result"] == "Reject"
-        and test["Metric"] == test_metric
-        and test["File_Seed"] != "Global"
+    reject_count = int(
+        (
+            (test_results["Result"] == "Reject")
+            & (test_results["Metric"] == test_metric)
+            & (test_results["File_Seed"] != "Global")
+        ).sum()
     )
     return len(test_results) - reject_count, reject_count
 
@@ -58,20 +61,14 @@ def plot_kde(data, title, xlabel, vlines=None):
     plt.close()
 
 
-# Extract unique block sizes and metrics
-comparisons = set()
-metrics = set()
-
-for test in hypothesis_test_results:
-    block_size_comparison = test.get("Comparison")
-    if block_size_comparison:
-        comparisons.add(block_size_comparison)
-    metric = test.get("Metric")
-    if metric:
-        metrics.add(test.get("Metric"))
+# Index the test results for the lookups of every metric and block size comparison
+tests_by_metric = hypothesis_test_results.set_index("Metric", drop=False).sort_index()
+tests_by_comparison = hypothesis_test_results.set_index(
+    ["Metric", "Comparison"], drop=False
+).sort_index()
 
-comparisons = sorted(list(comparisons))
-metrics = sorted(list(metrics))
+comparisons = sorted(hypothesis_test_results["Comparison"].dropna().unique())
+metrics = sorted(hypothesis_test_results["Metric"].dropna().unique())
 
 for metric in metrics:
     # Get Global Rejection Counts
@@ -84,19 +81,16 @@ for metric in metrics:
     # Plot Bar Chart for Global Analysis
     plot_bar_chart(
         categories_global,
-        counts_global,
         f"T-test Results for {metric} (Global)",
+        counts_global,
     )
 
     # Loop through each block size comparison
     for comparison in comparisons:
-        # Filter test results for the specific block size comparison and metric
-        block_size_comparison_results = [
-            test
-            for test in hypothesis_test_results
-            if test.get("Comparison") == comparison and test.get("Metric") == metric
-        ]
-        print(block_size_comparison_results)
+        if (metric, comparison) not in tests_by_comparison.index:
+            continue
+        # Look up test results for the specific block size comparison and metric
+        block_size_comparison_results = tests_by_comparison.loc[[(metric, comparison)]]
         # Get rejection counts for block size comparison
         not_reject, reject = get_rejection_counts(block_size_comparison_results, metric)
         categories = [f"Not Reject ({comparison})", f"Reject ({comparison})"]
@@ -104,41 +98,36 @@ for metric in metrics:
         # Plot Bar Chart for Block Size Comparison
         plot_bar_chart(
             categories,
-            counts,
             f"T-test Results for {metric} (Block Size {comparison})",
+            counts,
         )
-        # Extract p-values and Cohen's d values for this block size comparison and metric
-        p_values = [test["p-value"] for test in block_size_comparison_results]
-        cohen_d_values = [test["cohen_d"] for test in block_size_comparison_results]
         # Plot KDE for p-values of block size comparison
         plot_kde(
-            p_values,
+            block_size_comparison_results["p-value"],
             f"KDE for p-values of {metric} (Block Size {comparison})",
             "p-value",
             vlines=[0.05],
         )
         # Plot KDE for Cohen's d values of block size comparison
         plot_kde(
-            cohen_d_values,
+            block_size_comparison_results["cohen_d"],
             f"KDE for Cohen's d values of {metric} (Block Size {comparison})",
             "Cohen's d",
             vlines=[-0.2, 0.2],
         )
 
-    # Filter test results for the specific metric
-    block_size_comparison_results = [
-        test for test in hypothesis_test_results if test.get("Metric") == metric
-    ]
-    # Extract p-values and Cohen's d values for this metric
-    p_values = [test["p-value"] for test in block_size_comparison_results]
-    cohen_d_values = [test["cohen_d"] for test in block_size_comparison_results]
+    # Look up test results for the specific metric
+    metric_results = tests_by_metric.loc[[metric]]
     # Plot KDE for p-values of All Tests for a metric
-    p_values = [test["p-value"] for test in block_size_comparison_results]
-    plot_kde(p_values, f"KDE for p-values of {metric}", "p-value", vlines=[0.05])
+    plot_kde(
+        metric_results["p-value"],
+        f"KDE for p-values of {metric}",
+        "p-value",
+        vlines=[0.05],
+    )
     # Plot KDE for Cohen's d values of All Tests for a metric
-    cohen_d_values = [test["cohen_d"] for test in block_size_comparison_results]
     plot_kde(
-        cohen_d_values,
+        metric_results["cohen_d"],
         f"KDE for Cohen's d of {metric}",
         "Cohen's d",
         vlines=[-0.2, 0.2],